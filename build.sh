@@ -2,10 +2,17 @@
 # exit on error
 set -o errexit
 
+# The web process (Procfile -> gunicorn.conf.py) serves ASGI with uvicorn workers
+# by default; SERVER_MODE=wsgi switches back to the sync WSGI workers
+echo "Server mode: ${SERVER_MODE:-asgi (default; set SERVER_MODE=wsgi for sync workers)}"
+
 # Install dependencies
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Responsive AVIF/WebP variants of the product images (skips unchanged images)
+python manage.py optimize_images || echo "Warning: Image optimization failed, serving original images"
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --no-input --clear
@@ -15,28 +22,14 @@ ls -la staticfiles/ || echo "staticfiles directory not found"
 # Run migrations
 python manage.py migrate --no-input
 
-# Load initial data if data.json exists
-if [ -f "data.json" ]; then
-  python -c "
-import json
-import os
-
-data_file = 'data.json'
-
-# Check if data already loaded or error occurred
-if os.path.exists(data_file):
-    with open(data_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        if data:  # If there's data to load
-            import subprocess
-            result = subprocess.run(['python', 'manage.py', 'loaddata', 'data.json'], capture_output=True, text=True)
-            if 'already loaded' in result.stderr or 'error occurred' not in result.stderr.lower():
-                print('Data loaded successfully or already exists')
-            else:
-                print('Warning: Data load had issues but continuing deployment')
-        else:
-            print('No data to load from data.json')
-"
+# Load initial data
+# data/ is the streamed NDJSON export (python manage.py export_data); it is
+# imported chunk by chunk; rows that already exist are skipped.
+# data.json is the legacy dumpdata export.
+if [ -f "data/manifest.json" ]; then
+  python manage.py import_data data || echo "Warning: Data import had issues but continuing deployment"
+elif [ -s "data.json" ]; then
+  python manage.py loaddata data.json || echo "Warning: Data load had issues but continuing deployment"
 fi
 
 # Create superuser (will skip if already exists)
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings (Procfile: gunicorn -c gunicorn.conf.py)
+
+SERVER_MODE=asgi (default): uvicorn workers serving Farm2Home.asgi. Async
+views (the Stripe API calls) wait on the network without blocking the
+worker; sync views run in a thread per request and take their database
+connection from a psycopg 3 pool (see DATABASES in settings.py).
+SERVER_MODE=wsgi: the classic sync workers serving Farm2Home.wsgi.
+
+Settings are read with decouple like Farm2Home/settings.py, so a value in
+.env picks the same mode for the workers and for DATABASES.
+"""
+from decouple import config
+
+
+SERVER_MODE = config('SERVER_MODE', default='asgi')
+
+bind = f"0.0.0.0:{config('PORT', default='8000')}"
+workers = config('WEB_CONCURRENCY', default=2, cast=int)
+timeout = 120
+max_requests = 1000
+errorlog = '-'
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'Farm2Home.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif SERVER_MODE == 'wsgi':
+    wsgi_app = 'Farm2Home.wsgi:application'
+    worker_class = 'sync'
+else:
+    raise ValueError(f'SERVER_MODE must be asgi or wsgi, not {SERVER_MODE!r}')
@@ -1,5 +1,39 @@
-from django.contrib import admin
-from .models import Customer, Product, Inventory, Order, OrderItem, Cart, Address
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Customer, Product, Inventory, Order, OrderItem, Cart, Address, EmailOutbox
+from .cache import batch_catalog_invalidation, bump_catalog_version
+from .utils import send_order_status_emails
+from .customer_stats import batch_stats_refresh, refresh_customer_stats
+
+
+def related_count(model, field):
+    """
+    Correlated COUNT of `model` rows pointing at the outer row through `field`
+    Evaluated only for the rows on the changelist page (no GROUP BY over the
+    whole table, and no join fan-out when several counts are annotated)
+    """
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class BatchedChangesMixin:
+    """
+    Changelist submissions (actions, list_editable saves, bulk deletes) change
+    many rows at once. They run in one transaction, and the catalog version
+    bump and CustomerStats refresh they trigger (from signals or explicitly)
+    happen once per submission instead of once per row.
+    """
+    
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST':
+            return super().changelist_view(request, extra_context)
+        with transaction.atomic(), batch_catalog_invalidation(), batch_stats_refresh():
+            return super().changelist_view(request, extra_context)
 
 
 # =====================================================
@@ -30,14 +64,24 @@ class CustomerAdmin(admin.ModelAdmin):
     # Ordering
     ordering = ['-customer_id']
     
+    # Override get_queryset to count orders/addresses in the changelist query
+    def get_queryset(self, request):
+        """Annotate counts so the list does not run two COUNT queries per row"""
+        queryset = super().get_queryset(request)
+        return queryset.annotate(
+            order_total=related_count(Order, 'customer'),
+            address_total=related_count(Address, 'customer'),
+        )
+    
     def order_count(self, obj):
         """Display number of orders for this customer"""
-        return obj.orders.count()
+        return obj.order_total
     order_count.short_description = 'Total Orders'
+    order_count.admin_order_field = 'order_total'
     
     def address_count(self, obj):
         """Display number of addresses for this customer"""
-        count = obj.addresses.count()
+        count = obj.address_total
         if count == 0:
             return '❌ No addresses'
         elif count == 1:
@@ -45,13 +89,14 @@ class CustomerAdmin(admin.ModelAdmin):
         else:
             return f'✓ {count} addresses'
     address_count.short_description = 'Addresses'
+    address_count.admin_order_field = 'address_total'
 
 
 # =====================================================
 # PRODUCT ADMIN
 # =====================================================
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(BatchedChangesMixin, admin.ModelAdmin):
     """Enhanced admin interface for Product model"""
     
     # List display columns
@@ -134,28 +179,38 @@ class ProductAdmin(admin.ModelAdmin):
             return '❓ No Inventory'
     stock_status.short_description = 'Stock Status'
     
+    # Override get_queryset to load stock with the product rows
+    def get_queryset(self, request):
+        """Join inventory so stock_status does not query per row"""
+        queryset = super().get_queryset(request)
+        return queryset.select_related('inventory')
+    
     # Custom admin actions
     def activate_products(self, request, queryset):
         """Activate selected products"""
         updated = queryset.update(is_active=True)
+        bump_catalog_version()  # update() bypasses post_save signals
         self.message_user(request, f'{updated} product(s) activated successfully.')
     activate_products.short_description = 'Activate selected products'
     
     def deactivate_products(self, request, queryset):
         """Deactivate selected products"""
         updated = queryset.update(is_active=False)
+        bump_catalog_version()  # update() bypasses post_save signals
         self.message_user(request, f'{updated} product(s) deactivated successfully.')
     deactivate_products.short_description = 'Deactivate selected products'
     
     def set_summer_season(self, request, queryset):
         """Set season to summer for selected products"""
         updated = queryset.update(season='SUMMER')
+        bump_catalog_version()  # update() bypasses post_save signals
         self.message_user(request, f'{updated} product(s) set to Summer season.')
     set_summer_season.short_description = 'Set season to Summer'
     
     def set_winter_season(self, request, queryset):
         """Set season to winter for selected products"""
         updated = queryset.update(season='WINTER')
+        bump_catalog_version()  # update() bypasses post_save signals
         self.message_user(request, f'{updated} product(s) set to Winter season.')
     set_winter_season.short_description = 'Set season to Winter'
 
@@ -164,7 +219,7 @@ class ProductAdmin(admin.ModelAdmin):
 # INVENTORY ADMIN
 # =====================================================
 @admin.register(Inventory)
-class InventoryAdmin(admin.ModelAdmin):
+class InventoryAdmin(BatchedChangesMixin, admin.ModelAdmin):
     """Enhanced admin interface for Inventory model"""
     
     # List display columns
@@ -224,18 +279,24 @@ class InventoryAdmin(admin.ModelAdmin):
             return '🔴 Out'
     stock_status_badge.short_description = 'Status'
     
+    # Override get_queryset to load products with the inventory rows
+    def get_queryset(self, request):
+        """Join product so name/category columns do not query per row"""
+        queryset = super().get_queryset(request)
+        return queryset.select_related('product')
+    
     # Custom actions
     def restock_items(self, request, queryset):
         """Add 50 units to selected items"""
-        for item in queryset:
-            item.stock_available += 50
-            item.save()
-        self.message_user(request, f'{queryset.count()} item(s) restocked with 50 units.')
+        updated = queryset.update(stock_available=F('stock_available') + 50)
+        bump_catalog_version()  # update() bypasses post_save signals
+        self.message_user(request, f'{updated} item(s) restocked with 50 units.')
     restock_items.short_description = 'Restock (+50 units)'
     
     def clear_stock(self, request, queryset):
         """Set stock to 0 for selected items"""
         updated = queryset.update(stock_available=0)
+        bump_catalog_version()  # update() bypasses post_save signals
         self.message_user(request, f'{updated} item(s) stock cleared.')
     clear_stock.short_description = 'Clear stock (set to 0)'
 
@@ -262,7 +323,7 @@ class OrderItemInline(admin.TabularInline):
 # ORDER ADMIN
 # =====================================================
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(BatchedChangesMixin, admin.ModelAdmin):
     """Enhanced admin interface for Order model"""
     
     # List display columns
@@ -344,32 +405,61 @@ class OrderAdmin(admin.ModelAdmin):
     
     def item_count(self, obj):
         """Display number of items in order"""
-        return obj.order_items.count()
+        return obj.line_count
     item_count.short_description = 'Items'
+    item_count.admin_order_field = 'line_count'
+    
+    # Override get_queryset to optimize database queries
+    def get_queryset(self, request):
+        """
+        Join the customer and read the stored item count
+        Orders without a stored summary are counted in the same query
+        """
+        queryset = super().get_queryset(request)
+        return queryset.select_related('customer').annotate(
+            line_count=Coalesce('items_count', related_count(OrderItem, 'order')),
+        )
     
     # Custom actions for order status
+    def change_status(self, queryset, status):
+        """
+        Move the selected orders to `status` with one UPDATE
+        Returns the orders that actually changed; orders already in `status`
+        are skipped so nobody is notified twice. The selection is read before
+        the UPDATE because a status-filtered changelist queryset would no
+        longer match the rows afterwards.
+        """
+        changed = list(queryset.exclude(status=status).select_related('customer'))
+        if changed:
+            Order.objects.filter(pk__in=[order.pk for order in changed]).update(status=status)
+            # update() bypasses post_save signals
+            refresh_customer_stats({order.customer_id for order in changed})
+        return changed
+    
     def mark_confirmed(self, request, queryset):
         """Mark orders as confirmed"""
-        updated = queryset.update(status='CONFIRMED')
-        self.message_user(request, f'{updated} order(s) marked as CONFIRMED.')
+        changed = self.change_status(queryset, 'CONFIRMED')
+        self.message_user(request, f'{len(changed)} order(s) marked as CONFIRMED.')
     mark_confirmed.short_description = 'Mark as CONFIRMED'
     
     def mark_shipped(self, request, queryset):
-        """Mark orders as shipped"""
-        updated = queryset.update(status='SHIPPED')
-        self.message_user(request, f'{updated} order(s) marked as SHIPPED.')
+        """Mark orders as shipped and queue shipping notifications in one batch"""
+        changed = self.change_status(queryset, 'SHIPPED')
+        queued = send_order_status_emails(changed, 'SHIPPED')
+        self.message_user(request, f'{len(changed)} order(s) marked as SHIPPED. {queued} notification email(s) queued.')
     mark_shipped.short_description = 'Mark as SHIPPED'
     
     def mark_delivered(self, request, queryset):
-        """Mark orders as delivered"""
-        updated = queryset.update(status='DELIVERED')
-        self.message_user(request, f'{updated} order(s) marked as DELIVERED.')
+        """Mark orders as delivered and queue delivery notifications in one batch"""
+        changed = self.change_status(queryset, 'DELIVERED')
+        queued = send_order_status_emails(changed, 'DELIVERED')
+        self.message_user(request, f'{len(changed)} order(s) marked as DELIVERED. {queued} notification email(s) queued.')
     mark_delivered.short_description = 'Mark as DELIVERED'
     
     def mark_cancelled(self, request, queryset):
         """Mark orders as cancelled"""
-        updated = queryset.update(status='CANCELLED')
-        self.message_user(request, f'{updated} order(s) marked as CANCELLED.')
+        changed = self.change_status(queryset, 'CANCELLED')
+        self.message_user(request, f'{len(changed)} order(s) marked as CANCELLED.')
     mark_cancelled.short_description = 'Mark as CANCELLED'
 
 
@@ -432,6 +522,12 @@ class OrderItemAdmin(admin.ModelAdmin):
         """Display calculated subtotal"""
         return f'Rs. {obj.quantity * obj.price:.2f}'
     subtotal_display.short_description = 'Subtotal'
+    
+    # Override get_queryset to optimize database queries
+    def get_queryset(self, request):
+        """Join order and product so each row renders without extra queries"""
+        queryset = super().get_queryset(request)
+        return queryset.select_related('order', 'product')
 
 
 # =====================================================
@@ -510,23 +606,32 @@ class CartAdmin(admin.ModelAdmin):
     
     def subtotal_display(self, obj):
         """Display calculated subtotal"""
-        return f'Rs. {obj.quantity * obj.product.price:.2f}'
+        return f'Rs. {obj.subtotal:.2f}'
     subtotal_display.short_description = 'Subtotal'
+    subtotal_display.admin_order_field = 'subtotal'
+    
+    # Override get_queryset to optimize database queries
+    def get_queryset(self, request):
+        """Join customer and product and compute subtotals in the changelist query"""
+        queryset = super().get_queryset(request)
+        return queryset.select_related('customer', 'product').annotate(
+            subtotal=ExpressionWrapper(
+                F('quantity') * F('product__price'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
     
     # Custom actions
     def clear_carts(self, request, queryset):
         """Remove selected cart items"""
-        count = queryset.count()
-        queryset.delete()
+        count = queryset.delete()[0]
         self.message_user(request, f'{count} cart item(s) removed.')
     clear_carts.short_description = 'Remove selected cart items'
     
     def increase_quantity(self, request, queryset):
-        """Increase quantity by 1 for selected items"""
-        for item in queryset:
-            item.quantity += 1
-            item.save()
-        self.message_user(request, f'{queryset.count()} item(s) quantity increased.')
+        """Increase quantity by 1 for selected items (one UPDATE)"""
+        updated = queryset.update(quantity=F('quantity') + 1)
+        self.message_user(request, f'{updated} item(s) quantity increased.')
     increase_quantity.short_description = 'Increase quantity (+1)'
 
 
@@ -669,25 +774,30 @@ class AddressAdmin(admin.ModelAdmin):
     
     # Custom admin actions
     def set_as_default(self, request, queryset):
-        """Set selected addresses as default (only one per customer)"""
-        updated = 0
-        customers_updated = set()
+        """
+        Set selected addresses as default (only one per customer)
+        Two UPDATEs however many addresses are selected; when several addresses
+        of one customer are selected, the first one in the list wins
+        """
+        chosen = {}
+        for address_id, customer_id, customer_name in queryset.values_list(
+            'address_id', 'customer_id', 'customer__name'
+        ):
+            chosen.setdefault(customer_id, (address_id, customer_name))
+        address_ids = [address_id for address_id, _ in chosen.values()]
+        now = timezone.now()  # update() skips auto_now
         
-        for address in queryset:
-            # First, remove default from all addresses of this customer
+        with transaction.atomic():
+            # First, remove default from the other addresses of these customers
             Address.objects.filter(
-                customer=address.customer,
+                customer_id__in=chosen,
                 is_default=True
-            ).update(is_default=False)
+            ).exclude(address_id__in=address_ids).update(is_default=False, updated_at=now)
             
-            # Then set this address as default
-            address.is_default = True
-            address.save()
-            
-            updated += 1
-            customers_updated.add(address.customer.name)
+            # Then set the chosen addresses as default
+            updated = Address.objects.filter(address_id__in=address_ids).update(is_default=True, updated_at=now)
         
-        customers_list = ', '.join(customers_updated)
+        customers_list = ', '.join(sorted(name for _, name in chosen.values()))
         self.message_user(
             request,
             f'{updated} address(es) set as default for: {customers_list}'
@@ -742,6 +852,51 @@ class AddressAdmin(admin.ModelAdmin):
         verbose_name_plural = 'Delivery Addresses'
 
 
+# =====================================================
+# EMAIL OUTBOX ADMIN
+# =====================================================
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Queued emails waiting for (or processed by) run_email_worker"""
+    
+    # List display columns
+    list_display = ['email_id', 'to_email', 'subject', 'category', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    
+    # Search functionality
+    search_fields = ['to_email', 'subject']
+    
+    # Filters in right sidebar
+    list_filter = ['status', 'category', 'created_at']
+    
+    # Read-only fields (the worker owns delivery state)
+    readonly_fields = ['email_id', 'attempts', 'last_error', 'created_at', 'sent_at']
+    
+    # Number of items per page
+    list_per_page = 50
+    
+    # Custom actions
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        """
+        Queue failed/pending emails for immediate delivery
+        SENDING rows are only requeued once their lease (next_attempt_at) has
+        expired; before that a worker may be sending them right now
+        """
+        now = timezone.now()
+        retryable = queryset.filter(
+            Q(status__in=['FAILED', 'PENDING']) | Q(status='SENDING', next_attempt_at__lte=now)
+        )
+        updated = retryable.update(status='PENDING', attempts=0, next_attempt_at=now)
+        self.message_user(request, f'{updated} email(s) queued for immediate delivery.')
+        skipped = queryset.filter(status='SENDING', next_attempt_at__gt=now).count()
+        if skipped:
+            self.message_user(
+                request, f'{skipped} email(s) are being sent right now and were left alone.', messages.WARNING
+            )
+    retry_now.short_description = '🔁 Retry now'
+
+
 # =====================================================
 # ADMIN SITE CUSTOMIZATION
 # =====================================================
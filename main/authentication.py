@@ -0,0 +1,176 @@
+"""
+Signed customer tokens (stateless API authentication)
+
+api_login / api_signup return a bearer token; the frontend sends it as
+
+    Authorization: Bearer <token>
+
+The token is "<customer_id>:<token version>" signed with HMAC
+(django.core.signing, keyed by SECRET_KEY) plus a timestamp, so verifying
+it needs no database access. The Customer it names (the "principal") is
+kept in a small per-worker LRU:
+
+- a request with a valid token and a cached principal runs no query for
+  authentication at all
+- entries expire after PRINCIPAL_TTL seconds and are dropped when the
+  customer is saved/deleted in this worker (signals.py)
+- the token version must match the principal's Customer.token_version.
+  Changing or resetting the password bumps it (revoke_tokens), which
+  revokes every token issued before; rehashing the same password under a
+  new hash policy does not
+
+Views call get_request_customer(); requests without a token fall back to
+the customer_id parameter older clients still send.
+"""
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .cache import LRUCache
+from .models import Customer
+
+
+TOKEN_SALT = 'main.customer-token'
+TOKEN_KEYWORD = 'Bearer'
+TOKEN_MAX_AGE = settings.CUSTOMER_TOKEN_MAX_AGE
+PRINCIPAL_TTL = 60  # Seconds a cached principal is trusted (changes made by other workers)
+
+# Customer fields kept per principal (the password hash itself is not cached)
+PRINCIPAL_FIELDS = ('customer_id', 'name', 'email', 'phone', 'token_version')
+
+_signer = signing.TimestampSigner(salt=TOKEN_SALT)
+_principals = LRUCache(maxsize=2048)
+
+
+def revoke_tokens(customer):
+    """Invalidate every token issued to `customer` so far (saved with the customer's next save())"""
+    customer.token_version += 1
+
+
+def issue_token(customer):
+    """Signed bearer token for a customer (also warms this worker's principal cache)"""
+    remember_principal(customer)
+    return _signer.sign(f'{customer.customer_id}:{customer.token_version}')
+
+
+def read_token(token):
+    """
+    (customer_id, token_version) of a valid token
+    Raises signing.BadSignature (incl. SignatureExpired) for invalid/expired tokens
+    and ValueError for tokens of the old password-fingerprint format
+    """
+    value = _signer.unsign(token, max_age=TOKEN_MAX_AGE)
+    customer_id, version = value.split(':', 1)
+    return int(customer_id), int(version)
+
+
+# ==================== PRINCIPAL CACHE ====================
+
+def remember_principal(customer):
+    values = tuple(getattr(customer, name) for name in PRINCIPAL_FIELDS)
+    _principals.set(customer.customer_id, (time.monotonic() + PRINCIPAL_TTL, values, customer.token_version))
+
+
+def forget_principal(customer_id):
+    _principals.delete(customer_id)
+
+
+def _load_principal(customer_id):
+    """Fetch a principal from the database into the cache; None if the customer is gone"""
+    try:
+        customer = Customer.objects.only(*PRINCIPAL_FIELDS).get(customer_id=customer_id)
+    except Customer.DoesNotExist:
+        forget_principal(customer_id)
+        return None
+    remember_principal(customer)
+    return _principals.get(customer_id)
+
+
+def _principal_customer(values):
+    """
+    A fresh Customer instance for one request, built from cached values
+    (never shared between requests; password is a deferred field)
+    """
+    return Customer.from_db(DEFAULT_DB_ALIAS, PRINCIPAL_FIELDS, values)
+
+
+def resolve_principal(customer_id, token_version):
+    """Customer for a verified token, or None when the customer is gone or the token revoked"""
+    entry = _principals.get(customer_id)
+    if entry is None or entry[0] < time.monotonic() or entry[2] != token_version:
+        # Missing, expired, or possibly stale (tokens revoked in another worker)
+        entry = _load_principal(customer_id)
+    if entry is None or entry[2] != token_version:
+        return None
+    return _principal_customer(entry[1])
+
+
+# ==================== DRF ====================
+
+class CustomerTokenAuthentication(BaseAuthentication):
+    """
+    DRF authentication for `Authorization: Bearer <token>`
+    Sets request.user to the Customer and request.auth to the token.
+    Requests without a bearer token are left to the next authentication class.
+    """
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != TOKEN_KEYWORD.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+
+        try:
+            customer_id, token_version = read_token(auth[1].decode('ascii'))
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token expired, please log in again')
+        except (signing.BadSignature, UnicodeError, ValueError):
+            raise exceptions.AuthenticationFailed('Invalid token')
+
+        customer = resolve_principal(customer_id, token_version)
+        if customer is None:
+            raise exceptions.AuthenticationFailed('Token is no longer valid, please log in again')
+        return customer, auth[1].decode('ascii')
+
+    def authenticate_header(self, request):
+        return TOKEN_KEYWORD
+
+
+def token_customer(request):
+    """The Customer authenticated by a bearer token, or None"""
+    user = getattr(request, 'user', None)
+    return user if isinstance(user, Customer) else None
+
+
+def get_request_customer_id(request, customer_id=None):
+    """
+    Customer ID for a request without touching the database
+    The token principal wins; a customer_id parameter that names someone
+    else is rejected. Without a token the parameter is returned as is.
+    """
+    customer = token_customer(request)
+    if customer is None:
+        return customer_id or None
+    if customer_id not in (None, '') and str(customer_id) != str(customer.customer_id):
+        raise exceptions.PermissionDenied('customer_id does not match the authenticated customer')
+    return customer.customer_id
+
+
+def get_request_customer(request, customer_id=None, queryset=None):
+    """
+    Customer for a request: the token principal (no query) or, for clients
+    without a token, the customer_id parameter loaded from `queryset`
+    Returns None when neither is given; raises Customer.DoesNotExist
+    """
+    customer = token_customer(request)
+    if customer is not None:
+        get_request_customer_id(request, customer_id)  # Reject a mismatching customer_id
+        return customer
+    if customer_id in (None, ''):
+        return None
+    return (queryset if queryset is not None else Customer.objects).get(customer_id=customer_id)
@@ -0,0 +1,279 @@
+"""
+Catalog caching helpers
+
+The catalog only changes when admins edit products or stock, so responses are
+cached against a catalog version counter (the single CatalogVersion row).
+Every catalog change bumps the counter, which makes all older entries
+unreachable without having to delete them one by one. The counter lives in
+the database, not the cache, so bumps from other workers and from management
+commands are seen even when each worker has its own local-memory cache; each
+worker re-reads it at most every CATALOG_VERSION_TTL seconds.
+
+Two tiers are used:
+- a small per-worker LRU (no network hop, no unpickling)
+- the shared Django cache backend (shared by all gunicorn workers)
+
+Bulk edits (admin actions, list_editable saves, bulk deletes) run inside
+batch_catalog_invalidation(), which collapses the per-row signal bumps
+into a single bump once the batch is done.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+CATALOG_VERSION_ROW = 1  # Primary key of the single CatalogVersion row
+CATALOG_RESPONSE_PREFIX = 'catalog:response'
+CATALOG_RESPONSE_TIMEOUT = 60 * 60 * 24  # Versioned keys never go stale, this only bounds memory
+
+# Query parameters that change the catalog response (everything else is ignored)
+CATALOG_QUERY_PARAMS = ('category', 'season', 'in_stock', 'search', 'price_min', 'price_max', 'sort')
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache used as the per-worker tier
+    Keeps at most `maxsize` entries, evicting the least recently used one
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Per-worker tier for serialized catalog responses
+_local_catalog_cache = LRUCache(maxsize=256)
+
+# This worker's last read of the CatalogVersion row: (expires, (version, changed_at))
+_version_memo = (0.0, None)
+
+
+def _load_catalog_version():
+    """Read (version, changed_at) from the database, creating the row if it is missing"""
+    global _version_memo
+    from .models import CatalogVersion
+
+    row = CatalogVersion.objects.filter(pk=CATALOG_VERSION_ROW).values_list('version', 'changed_at').first()
+    if row is None:
+        created, _ = CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ROW)
+        row = (created.version, created.changed_at)
+    _version_memo = (time.monotonic() + settings.CATALOG_VERSION_TTL, row)
+    return row
+
+
+def _catalog_version_row():
+    expires, row = _version_memo
+    if time.monotonic() < expires:
+        return row
+    return _load_catalog_version()
+
+
+def _forget_catalog_version():
+    global _version_memo
+    _version_memo = (0.0, None)
+
+
+def get_catalog_version():
+    """
+    Return the current catalog version
+    Read from the database at most once per CATALOG_VERSION_TTL seconds per worker
+    """
+    return _catalog_version_row()[0]
+
+
+_batch = threading.local()
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog response
+    Called from Product/Inventory signals, admin bulk actions (queryset.update()
+    does not send post_save signals) and the catalog management commands
+    Inside batch_catalog_invalidation() the bump is deferred to the end of the batch
+    The counter is updated in the caller's transaction, so other workers only
+    see the new version together with the change itself
+    """
+    if getattr(_batch, 'depth', 0):
+        _batch.pending = True
+        return None
+
+    from .models import CatalogVersion
+
+    # Admin bulk actions do not touch Product.updated_at, so remember the change time here
+    changed_at = timezone.now().replace(microsecond=0)
+    updated = CatalogVersion.objects.filter(pk=CATALOG_VERSION_ROW).update(
+        version=F('version') + 1, changed_at=changed_at,
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ROW, defaults={'changed_at': changed_at})
+
+    _local_catalog_cache.clear()
+    _forget_catalog_version()
+    # Other threads of this worker may have read the old version meanwhile
+    transaction.on_commit(_forget_catalog_version)
+
+
+def bump_catalog_version_on_commit():
+    """
+    bump_catalog_version() once the surrounding transaction commits
+    For hot paths (checkout) that should not hold the version row's lock
+    until they commit; inside batch_catalog_invalidation() it is collapsed
+    into the batch's single bump like any other
+    """
+    if getattr(_batch, 'depth', 0):
+        _batch.pending = True
+    else:
+        transaction.on_commit(bump_catalog_version)
+
+
+@contextmanager
+def batch_catalog_invalidation():
+    """
+    Collapse every bump_catalog_version() call in the block into one
+    The bump happens after the surrounding transaction commits, so other
+    workers never cache the pre-commit catalog under the new version
+    """
+    _batch.depth = getattr(_batch, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+        if not _batch.depth and getattr(_batch, 'pending', False):
+            _batch.pending = False
+            transaction.on_commit(bump_catalog_version)
+
+
+def get_catalog_last_modified():
+    """
+    Return when the catalog last changed
+    Falls back to the newest Product.updated_at until the first bump
+    """
+    last_modified = _catalog_version_row()[1]
+    if last_modified is None:
+        from .models import Product
+
+        last_modified = Product.objects.aggregate(latest=Max('updated_at'))['latest']
+        if last_modified is None:
+            return None
+        last_modified = last_modified.replace(microsecond=0)
+    return last_modified
+
+
+def normalize_catalog_query(query_params):
+    """
+    Build a canonical query string from the catalog filter/sort parameters
+    Equivalent requests (parameter order, letter case, blank values) share one key
+    """
+    normalized = []
+    for param in CATALOG_QUERY_PARAMS:
+        value = (query_params.get(param) or '').strip()
+        if not value:
+            continue
+        if param != 'search':
+            value = value.lower()
+        normalized.append((param, value))
+    return urlencode(normalized)
+
+
+def _catalog_response_key(version, query_string):
+    # Current month is part of the key because inSeasonNow depends on it
+    month = timezone.now().month
+    return f'{CATALOG_RESPONSE_PREFIX}:v{version}:m{month}:{query_string}'
+
+
+def get_cached_catalog_response(query_params):
+    """
+    Look up a cached catalog response for the given query parameters
+    Returns (cache_key, data) - data is None on a miss
+    """
+    key = _catalog_response_key(get_catalog_version(), normalize_catalog_query(query_params))
+
+    data = _local_catalog_cache.get(key)
+    if data is not None:
+        return key, data
+
+    data = cache.get(key)
+    if data is not None:
+        _local_catalog_cache.set(key, data)
+    return key, data
+
+
+def set_cached_catalog_response(key, data):
+    """Store a serialized catalog response in both cache tiers"""
+    _local_catalog_cache.set(key, data)
+    cache.set(key, data, timeout=CATALOG_RESPONSE_TIMEOUT)
+
+
+# ==================== CONDITIONAL GET ====================
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Strong ETag for catalog/product responses
+    Changes whenever the catalog version (products or inventory) changes, and
+    differs per URL, query string and current month (inSeasonNow)
+    """
+    query_string = urlencode(sorted(request.GET.items()))
+    raw = f'{get_catalog_version()}|{timezone.now().month}|{request.path}|{query_string}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    """Last-Modified for catalog/product responses"""
+    return get_catalog_last_modified()
+
+
+def catalog_conditional(view_func):
+    """
+    Add ETag/Last-Modified headers to a catalog view
+    Matching If-None-Match/If-Modified-Since requests get a 304 before the view
+    runs, so nothing is queried or serialized. Responses are marked no-cache so
+    browsers always revalidate instead of reusing a stale copy.
+    """
+    conditional_view = condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapper
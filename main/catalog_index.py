@@ -0,0 +1,239 @@
+"""
+In-memory catalog index
+
+Holds every active product as compact column arrays so catalog queries
+(category, season, stock, price range, sorting) are answered in-process
+instead of issuing a filtered SQL query per request. The whole catalog is
+a few KB, so each worker keeps its own copy and rebuilds it whenever the
+catalog version changes (see main/cache.py).
+
+Filters are evaluated as bitmasks: bit i of a mask is set when row i
+matches. Masks for categories, seasons and stock are precomputed, price
+ranges are resolved with a binary search over a price-sorted permutation,
+and every sort order is a precomputed row permutation. Name and category
+sorts use ranks computed by the database in build(), so they follow its
+collation exactly like the ORDER BY they replace. Text search is delegated
+to a ProductSearchIndex built over the same rows (main/search.py).
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.db.models import F, Window
+from django.db.models.functions import DenseRank, RowNumber
+
+from .cache import LRUCache, get_catalog_version
+from .models import Product, Inventory
+from .search import ProductSearchIndex
+
+
+def _mask_from_rows(rows, size):
+    """Build an integer bitmask with the bits of `rows` set"""
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class CatalogIndex:
+    """
+    Column-oriented snapshot of the active catalog
+    Build with CatalogIndex.build(); use get_catalog_index() in views
+    """
+
+    def __init__(self, products, version=None):
+        self.version = version
+        self.products = list(products)
+        size = len(self.products)
+        self.size = size
+        self.all_mask = (1 << size) - 1
+
+        # ===== COLUMNS =====
+        self.ids = array('q')
+        self.prices = array('d')
+        self.discounts = array('d')
+        self.category_codes = array('B')
+        self.season_codes = array('B')
+        self.stock = array('q')
+        self.names = []
+        self.local_names = []
+
+        self.category_lookup = {}  # lowercase category -> code
+        self.season_lookup = {}    # DB season value -> code
+
+        for product in self.products:
+            category_code = self.category_lookup.setdefault(product.category.lower(), len(self.category_lookup))
+            season_code = self.season_lookup.setdefault(product.season, len(self.season_lookup))
+
+            try:
+                stock = product.inventory.stock_available
+            except Inventory.DoesNotExist:
+                stock = 0
+
+            self.ids.append(product.product_id)
+            self.prices.append(float(product.price))
+            self.discounts.append(float(product.discount))
+            self.category_codes.append(category_code)
+            self.season_codes.append(season_code)
+            self.stock.append(stock)
+            self.names.append(product.name.lower())
+            self.local_names.append((product.local_name or '').lower())
+
+        self.row_by_id = {product_id: row for row, product_id in enumerate(self.ids)}
+
+        # ===== PRECOMPUTED MASKS =====
+        self.category_masks = {
+            code: _mask_from_rows((row for row in range(size) if self.category_codes[row] == code), size)
+            for code in self.category_lookup.values()
+        }
+        self.season_masks = {
+            code: _mask_from_rows((row for row in range(size) if self.season_codes[row] == code), size)
+            for code in self.season_lookup.values()
+        }
+        self.in_stock_mask = _mask_from_rows((row for row in range(size) if self.stock[row] > 0), size)
+
+        # ===== PRECOMPUTED PERMUTATIONS =====
+        rows = range(size)
+        names = [product.name for product in self.products]
+        if all(hasattr(product, 'name_rank') for product in self.products):
+            # Collation order from the database (build())
+            name_keys = [product.name_rank for product in self.products]
+            category_keys = [product.category_rank for product in self.products]
+        else:
+            name_keys = [name.casefold() for name in names]
+            category_keys = [product.category.casefold() for product in self.products]
+        self._price_order = sorted(rows, key=lambda row: self.prices[row])
+        self._sorted_prices = [self.prices[row] for row in self._price_order]
+        self.orders = {
+            'featured': sorted(rows, key=lambda row: (category_keys[row], name_keys[row])),
+            'price_low': sorted(rows, key=lambda row: (self.prices[row], name_keys[row])),
+            'price_high': sorted(rows, key=lambda row: (-self.prices[row], name_keys[row])),
+            'name_asc': sorted(rows, key=lambda row: name_keys[row]),
+            'name_desc': sorted(rows, key=lambda row: name_keys[row], reverse=True),
+            'date_new': sorted(rows, key=lambda row: -self.ids[row]),
+        }
+
+        # ===== SEARCH =====
+        self.search_index = ProductSearchIndex(names, [product.local_name for product in self.products])
+        self._search_results = LRUCache(maxsize=128)
+
+    @classmethod
+    def build(cls, version=None):
+        """
+        Load all active products (with inventory) in a single query
+        The name/category ranks come from window functions, so text sorts
+        follow the database collation
+        """
+        products = Product.objects.filter(is_active=True).select_related('inventory').annotate(
+            name_rank=Window(RowNumber(), order_by=[F('name').asc(), F('product_id').asc()]),
+            category_rank=Window(DenseRank(), order_by=F('category').asc()),
+        ).order_by('product_id')
+        return cls(products, version=version)
+
+    # ==================== FILTERING ====================
+
+    def category_mask(self, category):
+        """Rows in a category (case-insensitive, like category__iexact)"""
+        code = self.category_lookup.get(category.lower())
+        return self.category_masks[code] if code is not None else 0
+
+    def season_mask(self, season):
+        """Rows in a season (DB value: SUMMER, WINTER, ALL_YEAR)"""
+        code = self.season_lookup.get(season)
+        return self.season_masks[code] if code is not None else 0
+
+    def price_mask(self, price_min=None, price_max=None):
+        """Rows with price_min <= price <= price_max (either bound optional)"""
+        low = bisect_left(self._sorted_prices, price_min) if price_min is not None else 0
+        high = bisect_right(self._sorted_prices, price_max) if price_max is not None else self.size
+        if low >= high:
+            return 0
+        return _mask_from_rows(self._price_order[low:high], self.size)
+
+    def search(self, term):
+        """Ranked search results as a list of (row, score), best first"""
+        term = term.strip()
+        results = self._search_results.get(term)
+        if results is None:
+            results = self.search_index.search(term)
+            self._search_results.set(term, results)
+        return results
+
+    def search_mask(self, term):
+        """Rows matching `term` by name or local name (substring, prefix or fuzzy)"""
+        if not term.strip():
+            return self.all_mask
+        return _mask_from_rows((row for row, _ in self.search(term)), self.size)
+
+    def suggest(self, prefix, limit=8):
+        """Autocomplete suggestions as Product instances"""
+        return [self.products[row] for row in self.search_index.suggest(prefix, limit=limit)]
+
+    def filter(self, category=None, season=None, in_stock=False, search=None, price_min=None, price_max=None):
+        """
+        Combine the given filters into a single bitmask
+        Arguments left as None (or False) do not filter
+        """
+        mask = self.all_mask
+        if category:
+            mask &= self.category_mask(category)
+        if season:
+            mask &= self.season_mask(season)
+        if in_stock:
+            mask &= self.in_stock_mask
+        if price_min is not None or price_max is not None:
+            mask &= self.price_mask(price_min, price_max)
+        if search and mask:
+            mask &= self.search_mask(search)
+        return mask
+
+    # ==================== RESULTS ====================
+
+    def rows(self, mask, sort='featured', search=None):
+        """
+        Matching rows in the requested sort order
+        sort='relevance' orders by search rank (requires `search`)
+        """
+        if sort == 'relevance' and search:
+            order = [row for row, _ in self.search(search)]
+        else:
+            order = self.orders.get(sort, self.orders['featured'])
+        if mask == self.all_mask:
+            return list(order)
+        return [row for row in order if mask >> row & 1]
+
+    def products_for(self, mask, sort='featured', search=None):
+        """Matching Product instances (inventory already loaded) in sort order"""
+        products = self.products
+        return [products[row] for row in self.rows(mask, sort, search)]
+
+    def ids_for(self, mask, sort='featured', search=None):
+        """Matching product IDs in sort order"""
+        ids = self.ids
+        return [ids[row] for row in self.rows(mask, sort, search)]
+
+    @staticmethod
+    def count(mask):
+        """Number of rows in a mask"""
+        return mask.bit_count()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_catalog_index():
+    """
+    Return this worker's catalog index, rebuilding it if the catalog changed
+    Only one thread rebuilds at a time; the others wait for the new index
+    """
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = CatalogIndex.build(version=version)
+        return _index
@@ -0,0 +1,307 @@
+"""
+Catalog sync: idempotent bulk upsert of products from a feed
+
+A feed is a CSV file (header row), a JSON array or NDJSON (one object per
+line) with product rows:
+
+    name,local_name,category,price,discount,season,image,is_active,stock,slug
+    Tomato,Tamatar,vegetables,120,0,SUMMER,images/vegetables/tomato.png,1,100,
+
+Products are matched on slug (slugified name when the feed has no slug),
+so re-running a feed never creates duplicates. Rows are processed in
+chunks; per chunk:
+
+- one SELECT loads the existing products + stock for the chunk's slugs
+- rows are diffed against them: created / updated (with the changed
+  fields) / unchanged; unchanged rows are not written at all
+- one bulk_create(update_conflicts=True, unique_fields=['slug']) upserts
+  the products and one more upserts their Inventory rows on product_id
+
+Only the columns present in a row are written. Without a stock column the
+current stock is kept (new products start with DEFAULT_STOCK). bulk_create
+sends no signals, so callers bump the catalog cache version once at the end.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .data_transfer import chunked
+from .models import Inventory, Product
+
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_STOCK = 100  # Same default stock populate_products has always used
+
+# Product columns a feed may set (slug is the match key)
+SYNC_FIELDS = ['name', 'local_name', 'category', 'price', 'discount', 'season', 'image', 'is_active']
+
+_CATEGORIES = {value for value, label in Product.CATEGORY_CHOICES}
+_SEASONS = {value for value, label in Product.SEASON_CHOICES}
+_TRUE = {'1', 'true', 'yes', 'y', 'on'}
+_FALSE = {'0', 'false', 'no', 'n', 'off'}
+_CENTS = Decimal('0.01')
+
+
+class FeedError(ValueError):
+    """A feed (or feed row) that cannot be synced"""
+
+
+@dataclass
+class SyncReport:
+    """Diff of one sync run"""
+    created: list = field(default_factory=list)      # slugs
+    updated: dict = field(default_factory=dict)      # slug -> {field: [old, new]}
+    unchanged: int = 0
+    duplicates: list = field(default_factory=list)   # [line, slug] already seen earlier in the feed
+    errors: list = field(default_factory=list)       # [line, message]
+    missing: list = field(default_factory=list)      # slugs in the database but not in the feed
+    deactivated: int = 0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'duplicates': self.duplicates,
+            'errors': self.errors,
+            'missing': self.missing,
+            'deactivated': self.deactivated,
+        }
+
+
+# ==================== FEED READING ====================
+
+def read_feed(path):
+    """Yield (line number, row dict) from a .csv, .json or .ndjson/.jsonl feed"""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    elif extension in ('.ndjson', '.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+    elif extension == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('products', [])
+        yield from enumerate(data, start=1)
+    else:
+        raise FeedError(f'Unsupported feed format: {path} (use .csv, .json, .ndjson or .jsonl)')
+
+
+def _decimal(value, name):
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise FeedError(f'{name} is not a number: {value!r}')
+    if number < 0:
+        raise FeedError(f'{name} cannot be negative: {value!r}')
+    return number.quantize(_CENTS)
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise FeedError(f'is_active is not a boolean: {value!r}')
+
+
+def normalize_row(row):
+    """
+    Validate one feed row
+    Returns (slug, product field values, stock or None). Empty cells count as
+    missing columns, so a sparse CSV does not blank out existing values.
+    """
+    row = {
+        key.strip().lower(): value.strip() if isinstance(value, str) else value
+        for key, value in row.items()
+        if key and value not in (None, '')
+    }
+
+    values = {}
+    if 'name' in row:
+        values['name'] = str(row['name'])[:100]
+    if 'local_name' in row:
+        values['local_name'] = str(row['local_name'])[:100]
+    if 'category' in row:
+        category = str(row['category']).lower()
+        if category not in _CATEGORIES:
+            raise FeedError(f"Unknown category {row['category']!r}")
+        values['category'] = category
+    if 'price' in row:
+        values['price'] = _decimal(row['price'], 'price')
+    if 'discount' in row:
+        values['discount'] = _decimal(row['discount'], 'discount')
+        if values['discount'] > 100:
+            raise FeedError(f"discount must be 0-100: {row['discount']!r}")
+    if 'season' in row:
+        season = str(row['season']).upper()
+        if season not in _SEASONS:
+            raise FeedError(f"Unknown season {row['season']!r}")
+        values['season'] = season
+    if 'image' in row:
+        values['image'] = str(row['image'])[:255]
+    if 'is_active' in row:
+        values['is_active'] = _boolean(row['is_active'])
+
+    slug = slugify(row.get('slug') or values.get('name', ''))[:150]
+    if not slug:
+        raise FeedError('Row has neither a slug nor a name')
+
+    stock = None
+    if 'stock' in row:
+        try:
+            stock = int(row['stock'])
+        except (TypeError, ValueError):
+            raise FeedError(f"stock is not a whole number: {row['stock']!r}")
+        if stock < 0:
+            raise FeedError(f"stock cannot be negative: {row['stock']!r}")
+
+    return slug, values, stock
+
+
+# ==================== SYNC ====================
+
+def _json_value(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+
+def sync_chunk(rows, report, dry_run=False):
+    """
+    Upsert one chunk of normalized (line, slug, values, stock) rows
+    Slugs are unique within a chunk (sync_products drops feed duplicates).
+    """
+    slugs = [slug for line, slug, values, stock in rows]
+    existing = {
+        current['slug']: current
+        for current in Product.objects.filter(slug__in=slugs).values(
+            'product_id', 'slug', 'inventory__stock_available', *SYNC_FIELDS
+        )
+    }
+
+    # Rows to write, grouped by the columns they set (bulk_create needs one
+    # update_fields list per statement; a feed normally has a single group)
+    product_groups = {}
+    stock_rows = []  # (slug, stock) for Inventory upserts
+
+    for line, slug, values, stock in rows:
+        current = existing.get(slug)
+        if current is None:
+            if 'name' not in values:
+                report.errors.append([line, f'New product {slug!r} needs a name'])
+                continue
+            report.created.append(slug)
+            product_groups.setdefault(frozenset(values), []).append(Product(slug=slug, **values))
+            stock_rows.append((slug, DEFAULT_STOCK if stock is None else stock))
+            continue
+
+        changes = {
+            name: [_json_value(current[name]), _json_value(value)]
+            for name, value in values.items()
+            if current[name] != value
+        }
+        current_stock = current['inventory__stock_available']
+        if current_stock is None or (stock is not None and stock != current_stock):
+            new_stock = DEFAULT_STOCK if stock is None else stock
+            changes['stock'] = [current_stock, new_stock]
+            stock_rows.append((slug, new_stock))
+
+        if not changes:
+            report.unchanged += 1
+            continue
+        report.updated[slug] = changes
+        changed_fields = frozenset(name for name in changes if name != 'stock')
+        if changed_fields:
+            product_groups.setdefault(changed_fields, []).append(
+                Product(slug=slug, **{name: values[name] for name in changed_fields})
+            )
+
+    if dry_run or not (product_groups or stock_rows):
+        return
+
+    with transaction.atomic():
+        for fields, products in product_groups.items():
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=sorted(fields) + ['updated_at'],
+            )
+
+        if stock_rows:
+            # Primary keys of products created just now (not every backend
+            # returns them from an upsert)
+            product_ids = {slug: current['product_id'] for slug, current in existing.items()}
+            new_slugs = [slug for slug, stock in stock_rows if slug not in product_ids]
+            if new_slugs:
+                product_ids.update(Product.objects.filter(slug__in=new_slugs).values_list('slug', 'product_id'))
+
+            Inventory.objects.bulk_create(
+                [Inventory(product_id=product_ids[slug], stock_available=stock) for slug, stock in stock_rows],
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['stock_available'],
+            )
+
+
+def sync_products(rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, deactivate_missing=False, progress=None):
+    """
+    Sync an iterable of (line number, raw row dict) into the catalog
+    The first row for a slug wins; later ones are reported as duplicates.
+    Returns a SyncReport.
+    """
+    report = SyncReport()
+    seen = set()
+
+    def normalized(rows):
+        for line, row in rows:
+            try:
+                slug, values, stock = normalize_row(row)
+            except FeedError as e:
+                report.errors.append([line, str(e)])
+                continue
+            if slug in seen:
+                report.duplicates.append([line, slug])
+                continue
+            seen.add(slug)
+            yield line, slug, values, stock
+
+    processed = 0
+    for chunk in chunked(normalized(rows), chunk_size):
+        sync_chunk(chunk, report, dry_run=dry_run)
+        processed += len(chunk)
+        if progress:
+            progress(processed)
+
+    # Products the feed no longer lists (compared in Python: the feed can be
+    # far larger than what fits into one NOT IN (...) clause)
+    missing_ids = []
+    for product_id, slug, is_active in Product.objects.values_list('product_id', 'slug', 'is_active').iterator():
+        if slug not in seen:
+            report.missing.append(slug or f'#{product_id}')
+            if is_active:
+                missing_ids.append(product_id)
+
+    if deactivate_missing and missing_ids and not dry_run:
+        for ids in chunked(missing_ids, chunk_size):
+            report.deactivated += Product.objects.filter(product_id__in=ids).update(
+                is_active=False, updated_at=timezone.now(),
+            )
+
+    return report
@@ -0,0 +1,150 @@
+"""
+Customer order statistics
+
+The account page shows total orders, total spent and a 30-day spending
+trend. Lifetime totals come from the CustomerStats rollup:
+
+- a new order increments the customer's row with F() expressions
+  (post_save signal, no read-modify-write)
+- edited/deleted orders and admin bulk status changes recompute the
+  affected customers with one grouped aggregate
+- customers without a row yet are backfilled on first profile visit
+- inside batch_stats_refresh() (admin bulk edits) refreshes are collected
+  and run once, for all affected customers, when the batch ends
+
+The spending trend only needs the last 60 days, which are summed in the
+same query as the profile lookup through a date-filtered join.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db.models import Count, DecimalField, F, FilteredRelation, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Customer, CustomerStats
+
+
+_ZERO = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def profile_queryset(now=None):
+    """
+    Customers with their CustomerStats row and 30-day spending windows
+    Each customer is one row: stats are a one-to-one join and only orders
+    from the last 60 days are joined for the windowed sums
+    """
+    now = now or timezone.now()
+    last_30_days = now - timedelta(days=30)
+    last_60_days = now - timedelta(days=60)
+
+    return Customer.objects.select_related('stats').annotate(
+        recent_orders=FilteredRelation('orders', condition=Q(orders__order_date__gte=last_60_days)),
+    ).annotate(
+        recent_spent=Coalesce(
+            Sum('recent_orders__total_amount', filter=Q(recent_orders__order_date__gte=last_30_days)), _ZERO
+        ),
+        previous_spent=Coalesce(
+            Sum('recent_orders__total_amount', filter=Q(recent_orders__order_date__lt=last_30_days)), _ZERO
+        ),
+    )
+
+
+def _aggregate_stats(customer_ids):
+    """Compute lifetime totals for the given customers in one grouped query"""
+    return Customer.objects.filter(customer_id__in=customer_ids).annotate(
+        order_count=Count('orders'),
+        spent=Coalesce(Sum('orders__total_amount'), _ZERO),
+        cancelled=Count('orders', filter=Q(orders__status='CANCELLED')),
+    ).values_list('customer_id', 'order_count', 'spent', 'cancelled')
+
+
+_batch = threading.local()
+
+
+def refresh_customer_stats(customer_ids):
+    """
+    Recompute CustomerStats for the given customers and upsert the rows
+    Returns the refreshed CustomerStats objects (nothing while batched)
+    """
+    customer_ids = set(customer_ids)
+    if not customer_ids:
+        return []
+
+    if getattr(_batch, 'depth', 0):
+        _batch.customer_ids.update(customer_ids)
+        return []
+
+    now = timezone.now()
+    rows = [
+        CustomerStats(
+            customer_id=customer_id,
+            total_orders=order_count,
+            total_spent=spent,
+            cancelled_orders=cancelled,
+            updated_at=now,
+        )
+        for customer_id, order_count, spent, cancelled in _aggregate_stats(customer_ids)
+    ]
+    CustomerStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=['total_orders', 'total_spent', 'cancelled_orders', 'updated_at'],
+    )
+    return rows
+
+
+@contextmanager
+def batch_stats_refresh():
+    """Collect refresh_customer_stats() calls in the block into one refresh at the end"""
+    if not getattr(_batch, 'depth', 0):
+        _batch.customer_ids = set()
+    _batch.depth = getattr(_batch, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+    # Not reached when the block raised (its transaction is rolled back anyway)
+    if not _batch.depth:
+        refresh_customer_stats(_batch.customer_ids)
+
+
+def get_customer_stats(customer):
+    """CustomerStats for a customer, backfilling the row if it does not exist yet"""
+    try:
+        return customer.stats
+    except CustomerStats.DoesNotExist:
+        stats = refresh_customer_stats([customer.customer_id])
+        stats = stats[0] if stats else CustomerStats(customer=customer)
+        customer.stats = stats  # Cache on the instance for the other fields
+        return stats
+
+
+def record_new_order(order):
+    """
+    Add a newly created order to its customer's rollup
+    Customers without a row are skipped; their row is built from the
+    orders table (including this order) on first use
+    """
+    CustomerStats.objects.filter(customer_id=order.customer_id).update(
+        total_orders=F('total_orders') + 1,
+        total_spent=F('total_spent') + order.total_amount,
+        cancelled_orders=F('cancelled_orders') + (1 if order.status == 'CANCELLED' else 0),
+        updated_at=timezone.now(),
+    )
+
+
+def growth_percentage(recent_spent, previous_spent):
+    """
+    Spending change of the last 30 days vs the 30 days before, in percent
+    100.0 when spending only started recently, 0.0 when there was none
+    """
+    if previous_spent > 0:
+        growth = ((recent_spent - previous_spent) / previous_spent) * 100
+        return round(growth, 1)
+    elif recent_spent > 0:
+        return 100.0  # 100% growth if spending started in last 30 days
+    else:
+        return 0.0  # No growth if no spending in either period
@@ -0,0 +1,250 @@
+"""
+Streaming data export/import (NDJSON)
+
+Replaces `dumpdata`/`loaddata` of one big data.json, which holds the whole
+dataset in memory on both ends. The export is a directory with one file
+per model plus a manifest:
+
+    data/
+      manifest.json                 models in load order, row counts, compression
+      main.customer.ndjson.gz       one serialized object per line
+      main.order.ndjson.gz
+      ...
+
+- export_model() iterates the table with .iterator(chunk_size=...) and
+  writes each row as one JSON line, so memory stays flat
+- import_model() reads lines back in chunks and inserts each chunk with
+  one bulk_create in its own transaction, recording progress in
+  .import-progress.json; a re-run skips the chunks that already completed
+- files can be gzip- or zstd-compressed (zstd needs the `zstandard` package)
+
+Rows are inserted raw, like loaddata: primary keys are kept, no signals are
+sent and auto_now/auto_now_add fields keep their exported values.
+"""
+import datetime
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+
+# Load order (foreign keys first). Password reset tokens and the email outbox
+# are short-lived and are not exported.
+EXPORT_MODELS = [
+    'main.customer',
+    'main.product',
+    'main.inventory',
+    'main.order',
+    'main.orderitem',
+    'main.customerstats',
+    'main.cart',
+    'main.address',
+]
+
+MANIFEST_FILE = 'manifest.json'
+PROGRESS_FILE = '.import-progress.json'
+DEFAULT_CHUNK_SIZE = 2000
+
+COMPRESSION_SUFFIXES = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that keeps microseconds (it truncates datetimes to milliseconds)"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+# ==================== FILES ====================
+
+def data_filename(label, compression):
+    return f'{label}.ndjson{COMPRESSION_SUFFIXES[compression]}'
+
+
+def open_data_file(path, mode, compression):
+    """Open an NDJSON file for text reading ('r') or writing ('w') with optional compression"""
+    if compression == 'gzip':
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('zstd compression needs the zstandard package (pip install zstandard)')
+        return zstandard.open(path, f'{mode}t', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    """Write a small JSON file atomically (temp file + rename)"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ==================== EXPORT ====================
+
+def export_model(label, directory, compression='gzip', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream every row of a model into <directory>/<label>.ndjson[.gz|.zst]
+    Returns the number of rows written
+    """
+    model = apps.get_model(label)
+    path = os.path.join(directory, data_filename(label, compression))
+    tmp_path = f'{path}.tmp'
+    rows = model._base_manager.order_by('pk').iterator(chunk_size=chunk_size)
+
+    count = 0
+    with open_data_file(tmp_path, 'w', compression) as f:
+        for chunk in chunked(rows, chunk_size):
+            for obj in serializers.serialize('python', chunk):
+                f.write(json.dumps(obj, cls=ExportEncoder, ensure_ascii=False))
+                f.write('\n')
+            count += len(chunk)
+    os.replace(tmp_path, path)  # A half-written export never replaces a complete one
+    return count
+
+
+def export_all(directory, compression='gzip', chunk_size=DEFAULT_CHUNK_SIZE, models=EXPORT_MODELS, progress=None):
+    """Export every model in `models` and write the manifest; returns the manifest"""
+    os.makedirs(directory, exist_ok=True)
+
+    # Progress of importing an earlier export would skip rows of this one
+    progress_path = os.path.join(directory, PROGRESS_FILE)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    manifest = {'format': 'ndjson', 'compression': compression, 'models': []}
+
+    for label in models:
+        count = export_model(label, directory, compression, chunk_size)
+        manifest['models'].append({'model': label, 'file': data_filename(label, compression), 'count': count})
+        if progress:
+            progress(label, count)
+
+    write_json(os.path.join(directory, MANIFEST_FILE), manifest)
+    return manifest
+
+
+# ==================== IMPORT ====================
+
+@contextmanager
+def raw_timestamps(model):
+    """
+    Keep exported values of auto_now/auto_now_add fields during bulk_create
+    (loaddata does the same by saving with raw=True)
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def import_model(entry, directory, compression, chunk_size=DEFAULT_CHUNK_SIZE, done=0, on_chunk=None):
+    """
+    Load one model's NDJSON file with a bulk_create per chunk
+    `done` rows (completed chunks of an earlier run) are skipped. on_chunk(rows_done)
+    is called after each committed chunk. Returns the number of rows inserted now
+    (rows whose primary key already exists are left alone and not counted).
+    """
+    model = apps.get_model(entry['model'])
+    path = os.path.join(directory, entry['file'])
+
+    processed = inserted = 0
+    with open_data_file(path, 'r', compression) as f, raw_timestamps(model):
+        lines = islice(f, done, None)
+        for chunk in chunked(lines, chunk_size):
+            objects = [
+                deserialized.object
+                for deserialized in serializers.deserialize('python', [json.loads(line) for line in chunk])
+            ]
+            with transaction.atomic():
+                # ignore_conflicts: rows that already exist (e.g. a re-run without
+                # progress file) are skipped instead of failing the whole chunk.
+                # bulk_create cannot say how many it skipped, so count them first.
+                existing = model._base_manager.filter(pk__in=[obj.pk for obj in objects]).count()
+                model._base_manager.bulk_create(objects, ignore_conflicts=True)
+            processed += len(objects)
+            inserted += len(objects) - existing
+            if on_chunk:
+                on_chunk(done + processed)
+    return inserted
+
+
+def reset_sequences(labels):
+    """Move auto-increment sequences past the imported primary keys (PostgreSQL)"""
+    models = [apps.get_model(label) for label in labels]
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def import_all(directory, chunk_size=DEFAULT_CHUNK_SIZE, restart=False, progress=None):
+    """
+    Import an export directory, resuming after the last completed chunk
+    Returns {model label: rows inserted by this run}
+    """
+    manifest = read_json(os.path.join(directory, MANIFEST_FILE))
+    if manifest is None:
+        raise FileNotFoundError(f'No {MANIFEST_FILE} in {directory}')
+
+    progress_path = os.path.join(directory, PROGRESS_FILE)
+    state = {} if restart else read_json(progress_path, {})
+
+    def save_state(label, rows_done):
+        state[label] = rows_done
+        write_json(progress_path, state)
+
+    loaded = {}
+    for entry in manifest['models']:
+        label = entry['model']
+        done = state.get(label, 0)
+        if done >= entry['count']:
+            loaded[label] = 0
+            continue
+
+        loaded[label] = import_model(
+            entry, directory, manifest['compression'], chunk_size, done=done,
+            on_chunk=lambda rows_done, label=label: save_state(label, rows_done),
+        )
+        if progress:
+            progress(label, loaded[label], entry['count'])
+
+    reset_sequences([entry['model'] for entry in manifest['models']])
+    return loaded
@@ -0,0 +1,251 @@
+"""
+Email outbox
+
+Emails are never sent inside a request. enqueue_email() stores the rendered
+message in the EmailOutbox table (inside the caller's transaction, so an
+order that rolls back never emails anyone) and returns immediately. The
+run_email_worker management command drains the table in the background:
+
+- due rows are claimed in batches; claiming sets status SENDING and pushes
+  next_attempt_at forward by a lease, so a crashed worker's rows are picked
+  up again once the lease expires
+- on PostgreSQL rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED,
+  so several workers can run side by side
+- messages in a batch are sent concurrently from a thread pool; transports
+  with send_batch() (Resend's batch API) get up to 100 messages per call
+- failures are retried with exponential backoff until max_attempts
+
+Delivery goes through a pluggable transport (EMAIL_OUTBOX_TRANSPORT):
+ResendTransport in production, ConsoleTransport/FileTransport locally
+and in tests.
+"""
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+from . import http_client
+from .models import EmailOutbox
+
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30          # 30s, 1m, 2m, 4m, ...
+BACKOFF_MAX_SECONDS = 60 * 60      # Never wait more than an hour between attempts
+SENDING_LEASE_SECONDS = 5 * 60     # A claimed row is retried if not finished by then
+
+
+# ==================== TRANSPORTS ====================
+
+class ResendTransport:
+    """
+    Send through the Resend API (raises on failure)
+    The resend SDK opens a new connection (and TLS handshake) per call; its
+    requests are sent through the pooled client in http_client.py instead
+    """
+
+    # Resend accepts up to 100 messages per batch request
+    batch_size = 100
+
+    def __init__(self):
+        import resend
+
+        resend.api_key = settings.RESEND_API_KEY
+        self.resend = resend
+
+    def _post(self, path, params):
+        """resend.Request(...).perform() (response/error handling) over the pooled client"""
+        request = self.resend.Request(path=path, params=params, verb='post')
+        request.make_request = partial(self._make_request, params)
+        return request.perform()
+
+    def _make_request(self, params, url):
+        return http_client.request('POST', url, json=params, headers={
+            'Accept': 'application/json',
+            'Authorization': f'Bearer {self.resend.api_key}',
+            'User-Agent': f'resend-python:{self.resend.get_version()}',
+        })
+
+    def _params(self, email):
+        return {
+            "from": settings.DEFAULT_FROM_EMAIL,
+            "to": [email.to_email],
+            "subject": email.subject,
+            "html": email.html_content,
+        }
+
+    def send(self, email):
+        return self._post('/emails', self._params(email))
+
+    def send_batch(self, emails):
+        """Send up to batch_size emails in one API call (all succeed or all fail)"""
+        return self._post('/emails/batch', [self._params(email) for email in emails])
+
+
+class ConsoleTransport:
+    """Print emails instead of sending them (development)"""
+
+    def send(self, email):
+        print(f"📧 [{email.category or 'email'}] To: {email.to_email} | Subject: {email.subject}")
+
+
+class FileTransport:
+    """Write each email as an .html file to EMAIL_OUTBOX_FILE_PATH (tests, local debugging)"""
+
+    def __init__(self):
+        self.path = getattr(settings, 'EMAIL_OUTBOX_FILE_PATH', os.path.join(settings.BASE_DIR, 'sent_emails'))
+        os.makedirs(self.path, exist_ok=True)
+
+    def send(self, email):
+        filename = f"{email.email_id}-{slugify(email.category or 'email')}.html"
+        with open(os.path.join(self.path, filename), 'w', encoding='utf-8') as f:
+            f.write(f"<!-- To: {email.to_email} -->\n<!-- Subject: {email.subject} -->\n")
+            f.write(email.html_content)
+
+
+def get_email_transport():
+    """Instantiate the transport configured in EMAIL_OUTBOX_TRANSPORT"""
+    transport_path = getattr(settings, 'EMAIL_OUTBOX_TRANSPORT', 'main.email_outbox.ResendTransport')
+    return import_string(transport_path)()
+
+
+# ==================== ENQUEUE ====================
+
+def enqueue_email(to_email, subject, html_content, category=''):
+    """Queue an email for the background worker and return the EmailOutbox row"""
+    return EmailOutbox.objects.create(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        category=category,
+    )
+
+
+def enqueue_emails(messages, category=''):
+    """
+    Queue many emails with a single INSERT
+    `messages` is an iterable of (to_email, subject, html_content)
+    """
+    return EmailOutbox.objects.bulk_create([
+        EmailOutbox(to_email=to_email, subject=subject, html_content=html_content, category=category)
+        for to_email, subject, html_content in messages
+    ])
+
+
+# ==================== WORKER ====================
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next attempt (exponential, with jitter)"""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def due_emails(now):
+    """Outbox rows ready to send at `now`, oldest first"""
+    return EmailOutbox.objects.filter(
+        status__in=['PENDING', 'SENDING'],  # SENDING rows here have an expired lease
+        next_attempt_at__lte=now,
+    ).order_by('next_attempt_at')
+
+
+def claim_due_emails(batch_size=50):
+    """
+    Claim up to `batch_size` due emails for this worker
+    Returns the claimed rows (status SENDING, attempts already incremented)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = due_emails(now)
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+
+        emails = list(due[:batch_size])
+        if not emails:
+            return []
+
+        lease_until = now + timedelta(seconds=SENDING_LEASE_SECONDS)
+        for email in emails:
+            email.status = 'SENDING'
+            email.attempts += 1
+            email.next_attempt_at = lease_until
+        EmailOutbox.objects.bulk_update(emails, ['status', 'attempts', 'next_attempt_at'])
+    return emails
+
+
+def _send(transport, emails):
+    """
+    Send a chunk of emails, returning one error message (or None) per email
+    Runs in the thread pool. Transports with send_batch() get the whole chunk
+    in one call; others are called once per email. A failed batch is sent
+    again one email at a time, so one bad message does not fail (or retry)
+    the whole chunk and every row gets its own result. If the provider is
+    down, the circuit breaker in http_client.py makes those calls fail fast.
+    """
+    if hasattr(transport, 'send_batch') and len(emails) > 1:
+        try:
+            transport.send_batch(emails)
+            return [None] * len(emails)
+        except Exception as e:
+            print(f"⚠️ Batch of {len(emails)} emails failed, sending them one by one: {str(e) or e.__class__.__name__}")
+
+    errors = []
+    for email in emails:
+        try:
+            transport.send(email)
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e) or e.__class__.__name__)
+    return errors
+
+
+def drain_outbox(transport=None, workers=4, batch_size=50, max_attempts=None):
+    """
+    Send every email that is currently due
+    Returns a dict with the number of emails sent, retried and failed
+    """
+    transport = transport or get_email_transport()
+    max_attempts = max_attempts or getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            emails = claim_due_emails(batch_size)
+            if not emails:
+                break
+
+            # Batch-capable transports get chunks of batch_size; others one email per task
+            chunk_size = getattr(transport, 'batch_size', 1) if hasattr(transport, 'send_batch') else 1
+            chunks = [emails[i:i + chunk_size] for i in range(0, len(emails), chunk_size)]
+
+            # Only the network calls run in threads; status updates stay on this connection
+            errors = [error for chunk_errors in pool.map(lambda chunk: _send(transport, chunk), chunks)
+                      for error in chunk_errors]
+
+            now = timezone.now()
+            for email, error in zip(emails, errors):
+                if error is None:
+                    email.status = 'SENT'
+                    email.sent_at = now
+                    email.last_error = ''
+                    stats['sent'] += 1
+                elif email.attempts >= max_attempts:
+                    email.status = 'FAILED'
+                    email.last_error = error
+                    stats['failed'] += 1
+                    print(f"❌ Giving up on email #{email.email_id} to {email.to_email}: {error}")
+                else:
+                    email.status = 'PENDING'
+                    email.next_attempt_at = now + timedelta(seconds=backoff_delay(email.attempts))
+                    email.last_error = error
+                    stats['retried'] += 1
+                    print(f"⚠️ Email #{email.email_id} failed (attempt {email.attempts}), retrying: {error}")
+
+            EmailOutbox.objects.bulk_update(emails, ['status', 'sent_at', 'next_attempt_at', 'last_error'])
+
+    return stats
@@ -0,0 +1,109 @@
+"""
+Email rendering
+
+render_to_string() looks the template up through every loader and builds a
+fresh Context for each message. The renderer below keeps the compiled
+templates from templates/emails/ in memory and renders straight into a
+reusable Context, which is what batch sends (e.g. shipping notifications
+for a whole admin selection) need.
+
+Short notification emails (order shipped/delivered) only contain a body;
+they are wrapped in emails/layout.html, whose header and footer are
+rendered once per process and then simply concatenated around each body.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.template import Context, engines
+from django.utils.safestring import mark_safe
+
+
+EMAIL_TEMPLATE_DIR = 'emails'
+LAYOUT_TEMPLATE = 'emails/layout.html'
+_BODY_MARKER = '<!--email-body-->'
+
+
+class EmailRenderer:
+    """
+    Cache of compiled email templates and the pre-rendered layout
+    Use the module-level email_renderer instance
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._layout = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        return engines['django'].engine
+
+    def get_template(self, name):
+        """Compiled template for `name` (compiled once per process)"""
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = self.engine.get_template(name)
+                    self._templates[name] = template
+        return template
+
+    def preload(self):
+        """Compile every template in templates/emails/ (called when the email worker starts)"""
+        for template_dir in settings.TEMPLATES[0]['DIRS']:
+            email_dir = os.path.join(template_dir, EMAIL_TEMPLATE_DIR)
+            if not os.path.isdir(email_dir):
+                continue
+            for filename in sorted(os.listdir(email_dir)):
+                if filename.endswith('.html'):
+                    self.get_template(f'{EMAIL_TEMPLATE_DIR}/{filename}')
+        self.layout()
+        return len(self._templates)
+
+    def layout(self):
+        """(header, footer) of the shared layout, rendered once"""
+        if self._layout is None:
+            html = self.get_template(LAYOUT_TEMPLATE).render(Context({'body': mark_safe(_BODY_MARKER)}))
+            header, footer = html.split(_BODY_MARKER, 1)
+            self._layout = (header, footer)
+        return self._layout
+
+    def render(self, name, context, layout=False):
+        """Render one email; layout=True wraps a body-only template in the shared layout"""
+        return self.render_batch(name, [context], layout=layout)[0]
+
+    def render_batch(self, name, contexts, layout=False):
+        """
+        Render the same template for many contexts
+        One compiled template and one Context are reused for the whole batch
+        """
+        template = self.get_template(name)
+        header, footer = self.layout() if layout else ('', '')
+        context = Context(autoescape=self.engine.autoescape)
+
+        rendered = []
+        for values in contexts:
+            with context.push(values):
+                body = template.render(context)
+            rendered.append(f'{header}{body}{footer}' if layout else body)
+        return rendered
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._layout = None
+
+
+email_renderer = EmailRenderer()
+
+
+def render_email(name, context, layout=False):
+    """Render a single email template"""
+    return email_renderer.render(name, context, layout=layout)
+
+
+def render_email_batch(name, contexts, layout=False):
+    """Render one email template for a list of contexts"""
+    return email_renderer.render_batch(name, contexts, layout=layout)
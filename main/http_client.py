@@ -0,0 +1,244 @@
+"""
+Outbound HTTP (Stripe, Resend)
+
+Every call to a third-party API goes through one pooled httpx client per
+process, so repeated calls reuse warm keep-alive connections instead of
+paying a TCP + TLS handshake each time:
+
+    response = http_client.request('POST', url, json=payload, headers=headers)
+    response = await http_client.arequest('GET', url)
+
+Per host (settings.OUTBOUND_HTTP, 'default' for hosts not listed):
+- max_concurrency: requests in flight at once; extra callers wait up to
+  connect_timeout for a slot, then get httpx.PoolTimeout
+- connect_timeout / timeout: connect and read/write timeouts (seconds)
+- failure_threshold / reset_timeout: circuit breaker. After that many
+  consecutive failures (connection errors, timeouts, 5xx) the host is
+  skipped for reset_timeout seconds: calls fail fast with CircuitOpenError
+  instead of tying up workers. One trial call then decides whether it closes
+
+The sync client is shared by all threads of a process (the email worker's
+send pool). httpx's AsyncClient belongs to one event loop, so async callers
+get one per loop (uvicorn: one per worker; runserver: one per request).
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+
+KEEPALIVE_EXPIRY = 55          # Seconds an idle connection is kept (providers drop them after ~60s)
+MAX_KEEPALIVE_CONNECTIONS = 20  # Per process, all hosts
+RETRYABLE_STATUS = 500         # Responses >= this count as failures for the circuit breaker
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The host failed repeatedly; calls are refused until its reset_timeout passes"""
+
+
+def host_policy(host):
+    """Effective settings for a host ('default' merged with the host's overrides)"""
+    policies = settings.OUTBOUND_HTTP
+    return {**policies['default'], **policies.get(host, {})}
+
+
+def _timeout(policy):
+    return httpx.Timeout(policy['timeout'], connect=policy['connect_timeout'], pool=policy['connect_timeout'])
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one host
+    closed -> (failure_threshold failures) -> open -> (reset_timeout) -> half-open
+    -> one trial call: success closes it, failure opens it again
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def before_call(self, host):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return
+            self.rejected += 1
+        retry_in = max(self.reset_timeout - (time.monotonic() - self.opened_at), 0)
+        raise CircuitOpenError(f'{host} is failing, not calling it for another {retry_in:.0f}s')
+
+    def cancel_trial(self):
+        """A half-open trial that never reached the host (e.g. no free slot)"""
+        with self._lock:
+            self.trial_running = False
+
+    def record(self, success):
+        with self._lock:
+            self.trial_running = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+# ==================== PER-PROCESS STATE ====================
+
+_lock = threading.Lock()
+_client = None
+_breakers = {}
+_slots = {}
+_loop_state = {}  # event loop -> (AsyncClient, {host: asyncio.Semaphore})
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=None,  # Bounded per host by max_concurrency
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def get_client():
+    """The process-wide sync client (created on first use, i.e. after gunicorn forks)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(limits=_limits())
+    return _client
+
+
+def _breaker(host):
+    breaker = _breakers.get(host)
+    if breaker is None:
+        policy = host_policy(host)
+        with _lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(policy['failure_threshold'], policy['reset_timeout']))
+    return breaker
+
+
+def _slot(host):
+    slot = _slots.get(host)
+    if slot is None:
+        with _lock:
+            slot = _slots.setdefault(host, threading.BoundedSemaphore(host_policy(host)['max_concurrency']))
+    return slot
+
+
+def _async_state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        # Forget the clients of finished loops (their connections died with the loop)
+        for old_loop in [old for old in _loop_state if old.is_closed()]:
+            _loop_state.pop(old_loop, None)
+        state = _loop_state[loop] = (httpx.AsyncClient(limits=_limits()), {})
+    return state
+
+
+def _failed(response):
+    return response.status_code >= RETRYABLE_STATUS
+
+
+# ==================== REQUESTS ====================
+
+def request(method, url, **kwargs):
+    """
+    Send a request through the pooled client (same arguments as httpx.request)
+    Raises CircuitOpenError, httpx.PoolTimeout when the host has no free slot,
+    and httpx transport errors; HTTP error statuses are returned, not raised
+    """
+    host = httpx.URL(url).host
+    policy = host_policy(host)
+    breaker = _breaker(host)
+    breaker.before_call(host)
+
+    slot = _slot(host)
+    if not slot.acquire(timeout=policy['connect_timeout']):
+        breaker.cancel_trial()  # Busy is not broken
+        raise httpx.PoolTimeout(f'All {policy["max_concurrency"]} connections to {host} are busy')
+    try:
+        response = get_client().request(method, url, timeout=_timeout(policy), **kwargs)
+    except httpx.TransportError:
+        breaker.record(False)
+        raise
+    except BaseException:
+        breaker.cancel_trial()  # Cancelled or a bad argument: says nothing about the host
+        raise
+    finally:
+        slot.release()
+    breaker.record(not _failed(response))
+    return response
+
+
+async def arequest(method, url, **kwargs):
+    """request() for async views, on this event loop's client"""
+    host = httpx.URL(url).host
+    policy = host_policy(host)
+    breaker = _breaker(host)
+    breaker.before_call(host)
+
+    client, slots = _async_state()
+    slot = slots.get(host)
+    if slot is None:
+        slot = slots[host] = asyncio.Semaphore(policy['max_concurrency'])
+    try:
+        await asyncio.wait_for(slot.acquire(), timeout=policy['connect_timeout'])
+    except asyncio.TimeoutError:
+        breaker.cancel_trial()
+        raise httpx.PoolTimeout(f'All {policy["max_concurrency"]} connections to {host} are busy')
+    try:
+        response = await client.request(method, url, timeout=_timeout(policy), **kwargs)
+    except httpx.TransportError:
+        breaker.record(False)
+        raise
+    except BaseException:
+        breaker.cancel_trial()  # Cancelled or a bad argument: says nothing about the host
+        raise
+    finally:
+        slot.release()
+    breaker.record(not _failed(response))
+    return response
+
+
+def outbound_stats():
+    """Circuit breaker state per host contacted by this process"""
+    return {
+        host: {'state': breaker.state, 'failures': breaker.failures, 'rejected': breaker.rejected}
+        for host, breaker in list(_breakers.items())
+    }
+
+
+def reset_outbound_state():
+    """Close the pooled clients and forget breakers/limits (tests, settings changes)"""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _breakers.clear()
+        _slots.clear()
+        _loop_state.clear()
@@ -0,0 +1,260 @@
+"""
+Responsive product images
+
+optimize_images (management command) turns every product photo under
+static/images/{vegetables,fruits,herbs} into resized AVIF and WebP variants:
+
+    static/images/optimized/
+      manifest.json
+      vegetables/tomato.3f9a1c2e.320.webp
+      vegetables/tomato.3f9a1c2e.320.avif
+      ...
+
+- files are processed in parallel with a process pool (Pillow work is CPU bound)
+- variant names contain the source's content hash, so they can be cached forever
+- the manifest records each source's mtime, size and hash; unchanged files
+  are skipped on the next run (mtime/size first, hash when those differ)
+- AVIF is written when Pillow has an AVIF encoder (Pillow 11.2+ or the
+  pillow-avif-plugin package), WebP otherwise only
+
+The catalog API reads the manifest (no Pillow needed at runtime) and returns
+each product image as a srcset-ready structure, see responsive_image().
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+
+STATIC_DIR = str(settings.STATICFILES_DIRS[0])
+SOURCE_DIRS = ['images/vegetables', 'images/fruits', 'images/herbs']
+OUTPUT_DIR = 'images/optimized'
+MANIFEST_FILE = 'manifest.json'
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+WIDTHS = (160, 320, 480)            # Catalog images are 120-150 CSS px: 1x, 2x and 3x screens
+FORMATS = ('avif', 'webp')          # Preferred first
+QUALITY = {'avif': 55, 'webp': 78}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+CATALOG_IMAGE_SIZES = '150px'      # Largest rendered size (list view); cards render at 120px
+
+
+# ==================== ENCODING (worker processes) ====================
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def available_formats(formats=FORMATS):
+    """Formats this Pillow build can encode (AVIF needs libavif)"""
+    from PIL import features
+
+    supported = []
+    for fmt in formats:
+        if fmt == 'avif' and not features.check('avif'):
+            try:
+                import pillow_avif  # noqa: F401  (registers the AVIF plugin)
+            except ImportError:
+                continue
+        supported.append(fmt)
+    return supported
+
+
+def encode_variants(source, relative_path, digest, formats, widths, output_root):
+    """
+    Write every width/format variant of one source image
+    Runs in a worker process; returns the manifest entry
+    """
+    from PIL import Image, ImageOps
+
+    category = os.path.basename(os.path.dirname(relative_path))
+    stem = os.path.splitext(os.path.basename(relative_path))[0]
+    output_dir = os.path.join(output_root, category)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+        width, height = img.size
+
+        # Never upscale: widths above the original collapse into the original width
+        targets = sorted({min(target, width) for target in widths})
+        variants = {fmt: [] for fmt in formats}
+        for target in targets:
+            resized = img if target == width else img.resize(
+                (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS
+            )
+            for fmt in formats:
+                name = f'{stem}.{digest[:8]}.{target}.{fmt}'
+                resized.save(os.path.join(output_dir, name), fmt.upper(), quality=QUALITY[fmt])
+                variants[fmt].append([target, f'{OUTPUT_DIR}/{category}/{name}'])
+
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+def _process(job):
+    """Pool entry point: (relative path, source path, hash, formats, widths, output root)"""
+    relative_path, source, digest, formats, widths, output_root = job
+    return relative_path, encode_variants(source, relative_path, digest, formats, widths, output_root)
+
+
+# ==================== PIPELINE ====================
+
+def manifest_path(static_dir=STATIC_DIR):
+    return os.path.join(static_dir, OUTPUT_DIR, MANIFEST_FILE)
+
+
+def find_sources(static_dir=STATIC_DIR):
+    """Relative paths (as stored in Product.image) of every source image"""
+    for source_dir in SOURCE_DIRS:
+        directory = os.path.join(static_dir, source_dir)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(SOURCE_EXTENSIONS):
+                yield f'{source_dir}/{name}'
+
+
+def _remove_variants(entry, static_dir):
+    for variants in entry.get('variants', {}).values():
+        for width, path in variants:
+            try:
+                os.remove(os.path.join(static_dir, path))
+            except FileNotFoundError:
+                pass
+
+
+def build_variants(static_dir=STATIC_DIR, workers=None, force=False, formats=FORMATS, widths=WIDTHS, progress=None):
+    """
+    Generate missing/outdated variants and rewrite the manifest
+    Returns {'processed': [...], 'skipped': n, 'removed': [...], 'formats': [...]}
+    """
+    formats = available_formats(formats)
+    if not formats:
+        raise RuntimeError('This Pillow build cannot encode any of the requested formats')
+
+    output_root = os.path.join(static_dir, OUTPUT_DIR)
+    path = manifest_path(static_dir)
+    manifest = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f).get('images', {})
+
+    settings_key = {'formats': list(formats), 'widths': list(widths)}
+    jobs = []
+    skipped = 0
+    sources = list(find_sources(static_dir))
+
+    for relative_path in sources:
+        source = os.path.join(static_dir, relative_path)
+        stat = os.stat(source)
+        entry = manifest.get(relative_path)
+        up_to_date = (
+            entry is not None and not force and 'variants' in entry
+            and entry.get('settings') == settings_key
+            and all(os.path.exists(os.path.join(static_dir, p)) for v in entry['variants'].values() for w, p in v)
+        )
+        if up_to_date and (entry['mtime'], entry['size']) == (stat.st_mtime, stat.st_size):
+            skipped += 1
+            continue
+
+        digest = file_hash(source)
+        if up_to_date and entry['hash'] == digest:
+            # Touched but not changed (e.g. fresh checkout): only the stat info moves
+            entry.update(mtime=stat.st_mtime, size=stat.st_size)
+            skipped += 1
+            continue
+
+        if entry:
+            _remove_variants(entry, static_dir)
+        manifest[relative_path] = {'hash': digest, 'mtime': stat.st_mtime, 'size': stat.st_size, 'settings': settings_key}
+        jobs.append((relative_path, source, digest, formats, widths, output_root))
+
+    processed = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process, job) for job in jobs]
+            for future in as_completed(futures):
+                relative_path, result = future.result()
+                manifest[relative_path].update(result)
+                processed.append(relative_path)
+                if progress:
+                    progress(relative_path, result)
+
+    # Sources that were deleted since the last run
+    removed = sorted(set(manifest) - set(sources))
+    for relative_path in removed:
+        _remove_variants(manifest.pop(relative_path), static_dir)
+
+    os.makedirs(output_root, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'images': dict(sorted(manifest.items()))}, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
+    _manifest_cache.clear()
+
+    return {'processed': sorted(processed), 'skipped': skipped, 'removed': removed, 'formats': formats}
+
+
+# ==================== SERVING ====================
+
+_manifest_cache = {}
+
+
+def image_manifest(static_dir=STATIC_DIR):
+    """
+    The variants manifest ({} when optimize_images has not run)
+    Re-read only when the file changes on disk
+    """
+    path = manifest_path(static_dir)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding='utf-8') as f:
+            cached = (mtime, json.load(f).get('images', {}))
+        _manifest_cache[path] = cached
+    return cached[1]
+
+
+def responsive_image(image, category, manifest=None):
+    """
+    srcset-ready image structure for a Product.image value
+
+        {'src': 'images/vegetables/tomato.png',          # original (unchanged field value)
+         'width': 500, 'height': 500,
+         'sizes': '150px',
+         'sources': [{'type': 'image/avif', 'srcset': '/static/...320.avif 320w, ...'},
+                     {'type': 'image/webp', 'srcset': '...'}]}
+
+    sources is empty (plain <img src>) for images without variants
+    """
+    src = image or f'/static/images/{category}/default.png'
+    entry = (image_manifest() if manifest is None else manifest).get(image) if image else None
+    if not entry or 'variants' not in entry:
+        return {'src': src, 'width': None, 'height': None, 'sizes': CATALOG_IMAGE_SIZES, 'sources': []}
+
+    return {
+        'src': src,
+        'width': entry['width'],
+        'height': entry['height'],
+        'sizes': CATALOG_IMAGE_SIZES,
+        'sources': [
+            {
+                'type': MIME_TYPES[fmt],
+                'srcset': ', '.join(f'{settings.STATIC_URL}{path} {width}w' for width, path in entry['variants'][fmt]),
+            }
+            for fmt in FORMATS
+            if entry['variants'].get(fmt)
+        ],
+    }
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from main.models import Order
+from main.order_summary import refresh_order_summaries
+
+
+class Command(BaseCommand):
+    help = 'Fill the stored items_count/product_names_preview columns on orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Orders summarized per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every order, not only the ones without a summary',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        orders = Order.objects.order_by('order_id')
+        if not options['all']:
+            orders = orders.filter(items_count__isnull=True)
+        order_ids = list(orders.values_list('order_id', flat=True))
+
+        updated = 0
+        for start in range(0, len(order_ids), chunk_size):
+            updated += refresh_order_summaries(order_ids[start:start + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Summarized {updated} order(s)'))
@@ -0,0 +1,148 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+
+from main.models import Product, Inventory
+from main.serializers import ProductCatalogSerializer
+
+
+class BaselineProductCatalogSerializer(serializers.ModelSerializer):
+    """
+    ProductCatalogSerializer as it was before the bulk fast path, kept verbatim
+    so the benchmark times the code that was replaced
+    """
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    variety = serializers.CharField(source='local_name')
+    image = serializers.SerializerMethodField()
+    inStock = serializers.SerializerMethodField()
+    inSeasonNow = serializers.SerializerMethodField()
+    stock_available = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'variety', 'price', 'image', 'category', 'season',
+            'inStock', 'inSeasonNow', 'stock_available', 'discount', 'slug',
+        ]
+        read_only_fields = ['id', 'slug']
+
+    def get_image(self, obj):
+        if obj.image:
+            return obj.image
+        return f'/static/images/{obj.category}/default.png'
+
+    def get_inStock(self, obj):
+        try:
+            return obj.inventory.stock_available > 0
+        except Inventory.DoesNotExist:
+            return False
+
+    def get_inSeasonNow(self, obj):
+        current_month = datetime.datetime.now().month
+        is_summer = current_month in [5, 6, 7, 8, 9]
+
+        if obj.season == 'ALL_YEAR':
+            return True
+        elif obj.season == 'SUMMER':
+            return is_summer
+        elif obj.season == 'WINTER':
+            return not is_summer
+
+        return False
+
+    def get_stock_available(self, obj):
+        try:
+            return obj.inventory.stock_available
+        except Inventory.DoesNotExist:
+            return 0
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        season_mapping = {
+            'SUMMER': 'summer',
+            'WINTER': 'winter',
+            'ALL_YEAR': 'year-round'
+        }
+        data['season'] = season_mapping.get(data['season'], 'year-round')
+
+        return data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark catalog serialization: baseline ProductCatalogSerializer(many=True) vs the bulk fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Number of in-memory products to serialize (default: 10000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per path; the best run is reported (default: 3)',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = max(options['repeat'], 1)
+
+        # Build unsaved products with inventory attached, so no database is involved
+        categories = [choice[0] for choice in Product.CATEGORY_CHOICES]
+        seasons = [choice[0] for choice in Product.SEASON_CHOICES]
+        products = []
+        for i in range(rows):
+            product = Product(
+                product_id=i + 1,
+                name=f'Product {i}',
+                local_name=f'Local {i}',
+                category=random.choice(categories),
+                price=Decimal(random.randint(50, 900)),
+                discount=Decimal(random.choice([0, 5, 10])),
+                season=random.choice(seasons),
+                image=f'images/vegetables/product-{i}.png',
+                slug=f'product-{i}',
+            )
+            product.inventory = Inventory(product_id=i + 1, stock_available=random.randint(0, 100))
+            products.append(product)
+
+        self.stdout.write(f'Serializing {rows} products ({repeat} runs each)...\n')
+
+        # Before: the baseline serializer through DRF's default ListSerializer
+        def baseline():
+            return BaselineProductCatalogSerializer(products, many=True).data
+
+        # After: ProductCatalogListSerializer (season once, bulk stock, flat dict rows)
+        def fast_path():
+            return ProductCatalogSerializer(products, many=True).data
+
+        before = self._best_time(baseline, repeat)
+        after = self._best_time(fast_path, repeat)
+
+        # image changed shape since the baseline (srcset structure), so compare the rest
+        def without_image(rows_data):
+            return [{key: value for key, value in row.items() if key != 'image'} for row in rows_data]
+
+        if without_image(baseline()) != without_image(fast_path()):
+            self.stdout.write(self.style.ERROR('Output mismatch between the two paths!'))
+
+        self.stdout.write(f'Baseline serializer: {rows / before:>12,.0f} rows/sec ({before * 1000:.1f} ms)')
+        self.stdout.write(f'Fast path:           {rows / after:>12,.0f} rows/sec ({after * 1000:.1f} ms)')
+        self.stdout.write(self.style.SUCCESS(f'\nSpeedup: {before / after:.1f}x'))
+
+    @staticmethod
+    def _best_time(func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
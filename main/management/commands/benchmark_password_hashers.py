@@ -0,0 +1,114 @@
+"""
+Benchmark password hashing cost settings on this machine
+Run: python manage.py benchmark_password_hashers
+     python manage.py benchmark_password_hashers --algorithm scrypt --threads 4
+Pick the strongest setting whose latency fits the login budget, then set it
+with PASSWORD_HASH_ALGORITHM and the matching cost variables (see settings.py).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.passwords import HASHERS
+
+# Candidate settings per algorithm (the configured one is always added)
+CANDIDATES = {
+    'argon2': [
+        {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1},
+        {'time_cost': 3, 'memory_cost': 65536, 'parallelism': 1},
+        {'time_cost': 2, 'memory_cost': 102400, 'parallelism': 8},  # Django's default
+    ],
+    'scrypt': [
+        {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 5},  # Django's default
+        {'work_factor': 2 ** 15, 'block_size': 8, 'parallelism': 1},
+        {'work_factor': 2 ** 16, 'block_size': 8, 'parallelism': 1},
+        {'work_factor': 2 ** 17, 'block_size': 8, 'parallelism': 1},
+    ],
+    'pbkdf2': [
+        {'iterations': 600000},
+        {'iterations': 1000000},  # Django's default
+    ],
+}
+
+COST_SETTINGS = {
+    'argon2': {'time_cost': 'argon2_time_cost', 'memory_cost': 'argon2_memory_cost', 'parallelism': 'argon2_parallelism'},
+    'scrypt': {'work_factor': 'scrypt_work_factor', 'block_size': 'scrypt_block_size', 'parallelism': 'scrypt_parallelism'},
+    'pbkdf2': {'iterations': 'pbkdf2_iterations'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure hashes/sec and latency for each password hashing algorithm and cost setting'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--algorithm',
+            choices=sorted(HASHERS),
+            action='append',
+            help='Only benchmark this algorithm (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--hashes',
+            type=int,
+            default=8,
+            help='Hashes per setting and mode (default: 8)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.PASSWORD_HASH_WORKERS,
+            help=f'Concurrent hashes for the throughput run (default: PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS})',
+        )
+
+    def handle(self, *args, **options):
+        hashes = max(options['hashes'], 1)
+        threads = max(options['threads'], 1)
+        algorithms = options['algorithm'] or list(HASHERS)
+
+        self.stdout.write(f'Hashing {hashes} passwords per setting; throughput with {threads} thread(s)\n')
+        self.stdout.write(f'{"setting":<60} {"ms/hash":>9} {"hashes/s":>9} {f"x{threads} hashes/s":>14}')
+        self.stdout.write('-' * 95)
+
+        for algorithm in algorithms:
+            if algorithm == 'argon2':
+                try:
+                    import argon2  # noqa: F401
+                except ImportError:
+                    self.stdout.write(self.style.WARNING('argon2: skipped (pip install argon2-cffi)'))
+                    continue
+
+            configured = {
+                attr: settings.PASSWORD_HASH_COST[key] for attr, key in COST_SETTINGS[algorithm].items()
+            }
+            candidates = CANDIDATES[algorithm] + ([configured] if configured not in CANDIDATES[algorithm] else [])
+            for cost in candidates:
+                # Class attributes shadow the settings-backed properties
+                hasher = type('BenchmarkHasher', (HASHERS[algorithm],), dict(cost))()
+                try:
+                    latency = self._time(hasher, hashes, 1)
+                    throughput = self._time(hasher, hashes * threads, threads)
+                except (ValueError, MemoryError) as e:
+                    raise CommandError(f'{algorithm} {cost}: {e}')
+
+                label = f'{algorithm} ' + ' '.join(f'{k}={v}' for k, v in cost.items())
+                if cost == configured and algorithm == settings.PASSWORD_HASH_ALGORITHM:
+                    label += ' (current)'
+                self.stdout.write(
+                    f'{label:<60} {latency * 1000:>9.1f} {1 / latency:>9.1f} {1 / throughput:>14.1f}'
+                )
+
+        self.stdout.write('-' * 95)
+        self.stdout.write(self.style.SUCCESS(
+            'Aim for ~100-250 ms/hash; "x N hashes/s" is the login capacity of one worker process'
+        ))
+
+    @staticmethod
+    def _time(hasher, count, threads):
+        """Seconds per hash when `count` hashes run on `threads` threads"""
+        salt = hasher.salt()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda i: hasher.encode(f'benchmark-{i}', salt), range(count)))
+        return (time.perf_counter() - start) / count
@@ -1,44 +1,58 @@
-from django.core.management.base import BaseCommand
-from django.core.management import call_command
-import os
+"""
+Export the main app's data as streamed NDJSON files (one per model)
+Run: python manage.py export_data                      (data/, gzip)
+     python manage.py export_data --compress zstd --chunk-size 5000
+Load it again with: python manage.py import_data data
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from main.data_transfer import COMPRESSION_SUFFIXES, DEFAULT_CHUNK_SIZE, export_all
 
 
 class Command(BaseCommand):
-    help = 'Export all data to data.json file for Railway deployment'
+    help = 'Export all data to NDJSON files in data/ for Railway deployment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='data',
+            help='Directory to write the export to (default: data)',
+        )
+        parser.add_argument(
+            '--compress',
+            choices=sorted(COMPRESSION_SUFFIXES),
+            default='gzip',
+            help='Compression for the NDJSON files (default: gzip)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows fetched per database round trip (default: {DEFAULT_CHUNK_SIZE})',
+        )
 
     def handle(self, *args, **options):
+        output = options['output']
+        self.stdout.write(f'Exporting data to {output}/ ...')
+
+        def progress(label, count):
+            self.stdout.write(f'  ✓ {label}: {count} row(s)')
+
         try:
-            # Export all data using natural foreign keys for better portability
-            output_file = 'data.json'
-            
-            self.stdout.write('Exporting data to data.json...')
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                call_command(
-                    'dumpdata',
-                    'main',  # Only export main app data
-                    '--natural-foreign',
-                    '--natural-primary',
-                    '--indent', '2',
-                    stdout=f
-                )
-            
-            # Check file size
-            file_size = os.path.getsize(output_file)
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully exported data to {output_file} ({file_size} bytes)'
-                )
-            )
-            
-            self.stdout.write(
-                self.style.WARNING(
-                    '\nIMPORTANT: Commit this data.json file to your repository '
-                    'so it can be loaded automatically on Railway deployment!'
-                )
+            manifest = export_all(
+                output,
+                compression=options['compress'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
             )
-            
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Error exporting data: {str(e)}')
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        total = sum(entry['count'] for entry in manifest['models'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully exported {total} row(s) to {output}/'))
+        self.stdout.write(
+            self.style.WARNING(
+                f'\nIMPORTANT: Commit the {output}/ directory to your repository '
+                'so it can be loaded automatically on Railway deployment!'
             )
+        )
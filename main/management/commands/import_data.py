@@ -0,0 +1,58 @@
+"""
+Load an export written by export_data, in constant memory
+Run: python manage.py import_data data
+     python manage.py import_data data --restart     (ignore progress of an earlier run)
+An interrupted import continues after the last completed chunk when re-run.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from main.cache import bump_catalog_version
+from main.data_transfer import DEFAULT_CHUNK_SIZE, import_all
+
+
+class Command(BaseCommand):
+    help = 'Import NDJSON data exported with export_data (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory',
+            nargs='?',
+            default='data',
+            help='Export directory containing manifest.json (default: data)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows inserted per bulk_create / transaction (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Start from the beginning instead of resuming',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+
+        def progress(label, inserted, total):
+            self.stdout.write(f'  ✓ {label}: {inserted} row(s) inserted ({total} in export)')
+
+        try:
+            loaded = import_all(
+                directory,
+                chunk_size=options['chunk_size'],
+                restart=options['restart'],
+                progress=progress,
+            )
+        except (FileNotFoundError, ImportError) as e:
+            raise CommandError(str(e))
+
+        # bulk_create sends no signals
+        bump_catalog_version()
+
+        total = sum(loaded.values())
+        if total:
+            self.stdout.write(self.style.SUCCESS(f'Successfully imported {total} row(s) from {directory}/'))
+        else:
+            self.stdout.write('Data already loaded, no new rows inserted')
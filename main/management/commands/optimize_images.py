@@ -0,0 +1,83 @@
+"""
+Generate responsive AVIF/WebP variants of the product images
+Run: python manage.py optimize_images
+     python manage.py optimize_images --workers 4 --force
+Unchanged images are skipped, so re-running (e.g. on every deploy) is cheap.
+Needs Pillow; AVIF needs Pillow 11.2+ or pillow-avif-plugin.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.image_variants import FORMATS, STATIC_DIR, WIDTHS, build_variants
+
+
+class Command(BaseCommand):
+    help = 'Resize product images into AVIF/WebP width variants in parallel (incremental)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-encode every image even if it is unchanged',
+        )
+        parser.add_argument(
+            '--formats',
+            default=','.join(FORMATS),
+            help=f'Comma-separated output formats (default: {",".join(FORMATS)})',
+        )
+        parser.add_argument(
+            '--widths',
+            default=','.join(str(width) for width in WIDTHS),
+            help=f'Comma-separated variant widths in px (default: {",".join(str(w) for w in WIDTHS)})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            widths = tuple(sorted({int(width) for width in options['widths'].split(',')}))
+        except ValueError:
+            raise CommandError('--widths must be comma-separated integers')
+        formats = tuple(fmt.strip().lower() for fmt in options['formats'].split(',') if fmt.strip())
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise CommandError(f'Unsupported format(s): {", ".join(sorted(unknown))}')
+
+        def progress(relative_path, result):
+            paths = [path for variants in result['variants'].values() for width, path in variants]
+            variant_kb = sum(os.path.getsize(os.path.join(STATIC_DIR, path)) for path in paths) / 1024
+            original_kb = os.path.getsize(os.path.join(STATIC_DIR, relative_path)) / 1024
+            self.stdout.write(
+                f'  ✓ {relative_path}: {original_kb:.1f} KB → {len(paths)} variants, {variant_kb:.1f} KB total'
+            )
+
+        try:
+            summary = build_variants(
+                workers=options['workers'],
+                force=options['force'],
+                formats=formats,
+                widths=widths,
+                progress=progress,
+            )
+        except ImportError:
+            raise CommandError('optimize_images needs Pillow (pip install Pillow)')
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        missing = set(formats) - set(summary['formats'])
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Skipped {", ".join(sorted(missing))}: no encoder in this Pillow build'
+            ))
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'Processed: {len(summary["processed"])} image(s)'))
+        self.stdout.write(f'Unchanged: {summary["skipped"]} image(s)')
+        if summary['removed']:
+            self.stdout.write(f'Removed:   {len(summary["removed"])} deleted source(s)')
+        self.stdout.write('=' * 60)
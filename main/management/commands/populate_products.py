@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
+from main.cache import bump_catalog_version
+from main.catalog_sync import sync_products
 from main.models import Product, Inventory
-from django.utils.text import slugify
 
 
 class Command(BaseCommand):
@@ -114,41 +115,28 @@ class Command(BaseCommand):
             {'name': 'Thyme', 'local_name': 'Thyme', 'category': 'herbs', 'price': 140, 'season': 'ALL_YEAR', 'image': 'images/herbs/thyme.png'},
         ]
         
-        created_count = 0
-        updated_count = 0
-        
-        for product_data in products_data:
-            slug = slugify(product_data['name'])
-            product, created = Product.objects.update_or_create(
-                slug=slug,
-                defaults={
-                    'name': product_data['name'],
-                    'local_name': product_data['local_name'],
-                    'category': product_data['category'],
-                    'price': product_data['price'],
-                    'season': product_data['season'],
-                    'image': product_data['image'],
-                    'discount': 0.00,
-                    'is_active': True,
-                }
-            )
-            
-            # Create inventory with stock
-            inventory, inv_created = Inventory.objects.get_or_create(
-                product=product,
-                defaults={'stock_available': 100}  # Default stock
-            )
-            
-            if created:
-                created_count += 1
-                self.stdout.write(self.style.SUCCESS(f'✓ Created: {product.name} ({product.local_name})'))
-            else:
-                updated_count += 1
-                self.stdout.write(self.style.WARNING(f'↻ Updated: {product.name} ({product.local_name})'))
-        
+        # Upsert through the catalog sync (matched on slug, so re-runs never
+        # create duplicates); discount/is_active are reset like before and
+        # existing stock is kept
+        report = sync_products(
+            enumerate(({**product_data, 'discount': 0, 'is_active': True} for product_data in products_data), start=1)
+        )
+        bump_catalog_version()  # bulk_create sends no signals
+
+        for slug in report.created:
+            self.stdout.write(self.style.SUCCESS(f'✓ Created: {slug}'))
+        for slug in report.updated:
+            self.stdout.write(self.style.WARNING(f'↻ Updated: {slug}'))
+        for line, message in report.errors:
+            self.stdout.write(self.style.ERROR(f'✗ Product {line}: {message}'))
+
+        created_count = len(report.created)
+        updated_count = len(report.updated)
+
         self.stdout.write(self.style.SUCCESS(f'\n{"="*60}'))
         self.stdout.write(self.style.SUCCESS(f'Successfully populated products!'))
         self.stdout.write(self.style.SUCCESS(f'Created: {created_count} products'))
         self.stdout.write(self.style.SUCCESS(f'Updated: {updated_count} products'))
-        self.stdout.write(self.style.SUCCESS(f'Total: {created_count + updated_count} products'))
+        self.stdout.write(self.style.SUCCESS(f'Unchanged: {report.unchanged} products'))
+        self.stdout.write(self.style.SUCCESS(f'Total: {created_count + updated_count + report.unchanged} products'))
         self.stdout.write(self.style.SUCCESS(f'{"="*60}\n'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main.customer_stats import refresh_customer_stats
+from main.models import Customer
+
+
+class Command(BaseCommand):
+    help = 'Recompute the CustomerStats rollup (order count, total spent) for every customer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Customers aggregated per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        customer_ids = list(Customer.objects.order_by('customer_id').values_list('customer_id', flat=True))
+
+        rebuilt = 0
+        for start in range(0, len(customer_ids), chunk_size):
+            rebuilt += len(refresh_customer_stats(customer_ids[start:start + chunk_size]))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt stats for {rebuilt} customer(s)'))
@@ -0,0 +1,61 @@
+"""
+EXPLAIN the ORM queries behind the hot views and report sequential scans
+Run: python manage.py report_seq_scans
+     python manage.py report_seq_scans --force-index   (PostgreSQL: would an index be used at all?)
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from main.query_plans import HOT_QUERIES, disable_seq_scans, find_seq_scans
+
+
+class Command(BaseCommand):
+    help = 'Report which hot-path ORM queries are answered with sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force-index',
+            action='store_true',
+            help='Disable seq scans (PostgreSQL) so only queries without a usable index are reported',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan of every query',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('='*60)
+        self.stdout.write(f'QUERY PLANS ({connection.vendor})')
+        self.stdout.write('='*60)
+
+        seq_scans = 0
+        with transaction.atomic():
+            if options['force_index']:
+                disable_seq_scans()
+
+            for label, expected_index, make_queryset in HOT_QUERIES:
+                plan = make_queryset().explain()
+                tables = find_seq_scans(plan)
+
+                if not plan:
+                    # e.g. the catalog index matched no products, so no SQL is sent
+                    self.stdout.write(f'➖ {label}: no query (empty result, load some data)')
+                elif tables:
+                    seq_scans += 1
+                    self.stdout.write(self.style.WARNING(f"⚠️  {label}: sequential scan on {', '.join(tables)}"))
+                elif expected_index and expected_index not in plan:
+                    self.stdout.write(f'🔄 {label}: uses another index (expected {expected_index})')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'✅ {label}'))
+
+                if options['verbose_plans']:
+                    self.stdout.write(f'{plan}\n')
+
+        self.stdout.write('='*60)
+        if seq_scans:
+            self.stdout.write(self.style.WARNING(f'{seq_scans} of {len(HOT_QUERIES)} queries use a sequential scan'))
+            if connection.vendor == 'postgresql' and not options['force_index']:
+                self.stdout.write('Small tables are always seq-scanned; rerun with --force-index to check index coverage')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'All {len(HOT_QUERIES)} queries use an index'))
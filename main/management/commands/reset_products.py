@@ -1,4 +1,8 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.cache import batch_catalog_invalidation
+from main.customer_stats import batch_stats_refresh
 from main.models import Product, Inventory, Cart, OrderItem, Order
 
 
@@ -26,32 +30,36 @@ class Command(BaseCommand):
         self.stdout.write('='*70)
         self.stdout.write(self.style.WARNING('RESETTING DATABASE...'))
         
-        # Delete in correct order (respecting foreign keys)
-        cart_count = Cart.objects.count()
-        Cart.objects.all().delete()
-        self.stdout.write(f'✓ Deleted {cart_count} cart items')
+        # One transaction; per-row delete signals are collected into a single
+        # catalog cache bump and one customer stats refresh
+        with transaction.atomic(), batch_catalog_invalidation(), batch_stats_refresh():
+            # Delete in correct order (respecting foreign keys)
+            cart_count = Cart.objects.count()
+            Cart.objects.all().delete()
+            self.stdout.write(f'✓ Deleted {cart_count} cart items')
         
-        order_item_count = OrderItem.objects.count()
-        OrderItem.objects.all().delete()
-        self.stdout.write(f'✓ Deleted {order_item_count} order items')
+            order_item_count = OrderItem.objects.count()
+            OrderItem.objects.all().delete()
+            self.stdout.write(f'✓ Deleted {order_item_count} order items')
         
-        order_count = Order.objects.count()
-        Order.objects.all().delete()
-        self.stdout.write(f'✓ Deleted {order_count} orders')
+            order_count = Order.objects.count()
+            Order.objects.all().delete()
+            self.stdout.write(f'✓ Deleted {order_count} orders')
         
-        inventory_count = Inventory.objects.count()
-        Inventory.objects.all().delete()
-        self.stdout.write(f'✓ Deleted {inventory_count} inventory records')
+            inventory_count = Inventory.objects.count()
+            Inventory.objects.all().delete()
+            self.stdout.write(f'✓ Deleted {inventory_count} inventory records')
         
-        product_count = Product.objects.count()
-        Product.objects.all().delete()
-        self.stdout.write(f'✓ Deleted {product_count} products')
+            product_count = Product.objects.count()
+            Product.objects.all().delete()
+            self.stdout.write(f'✓ Deleted {product_count} products')
         
         self.stdout.write('='*70)
         self.stdout.write(
             self.style.SUCCESS(
                 '\n✓ Database reset complete!\n'
                 'Run: python manage.py populate_products\n'
+                '  or: python manage.py sync_catalog <feed.csv>\n'
                 'To repopulate with fresh data.\n'
             )
         )
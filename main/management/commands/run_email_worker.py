@@ -0,0 +1,75 @@
+"""
+Background worker that delivers queued emails from the EmailOutbox table
+Run: python manage.py run_email_worker            (keeps polling)
+     python manage.py run_email_worker --once     (drain what is due, then exit)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main.email_outbox import drain_outbox, get_email_transport
+from main.email_rendering import email_renderer
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox with retries and exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send everything that is due and exit instead of polling',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent sends (default: 4)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Emails claimed per batch (default: 50)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when the outbox is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=None,
+            help='Attempts before an email is marked FAILED (default: EMAIL_OUTBOX_MAX_ATTEMPTS)',
+        )
+
+    def handle(self, *args, **options):
+        transport = get_email_transport()
+        # Compile the email templates once, before the first batch
+        email_renderer.preload()
+        self.stdout.write(self.style.SUCCESS(
+            f"📬 Email worker started ({transport.__class__.__name__}, {options['workers']} threads)"
+        ))
+
+        try:
+            while True:
+                close_old_connections()
+                stats = drain_outbox(
+                    transport=transport,
+                    workers=options['workers'],
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                )
+                if any(stats.values()):
+                    self.stdout.write(
+                        f"✅ Sent: {stats['sent']}  🔁 Retrying: {stats['retried']}  ❌ Failed: {stats['failed']}"
+                    )
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\n👋 Email worker stopped')
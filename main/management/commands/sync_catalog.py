@@ -0,0 +1,90 @@
+"""
+Sync the product catalog from a CSV/JSON feed (idempotent bulk upsert)
+Run: python manage.py sync_catalog feed.csv
+     python manage.py sync_catalog feed.ndjson --dry-run --report diff.json
+     python manage.py sync_catalog feed.json --deactivate-missing
+Products are matched on slug, so running the same feed twice never creates
+duplicates (the second run reports every row as unchanged).
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.cache import bump_catalog_version
+from main.catalog_sync import DEFAULT_CHUNK_SIZE, FeedError, read_feed, sync_products
+
+
+class Command(BaseCommand):
+    help = 'Upsert products and stock from a CSV/JSON/NDJSON feed and report the diff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help='Path to a .csv, .json, .ndjson or .jsonl product feed')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows upserted per bulk_create / transaction (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would change',
+        )
+        parser.add_argument(
+            '--deactivate-missing',
+            action='store_true',
+            help='Set is_active=False on products that are not in the feed',
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the full diff (created/updated/missing slugs, errors) to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        def progress(rows):
+            self.stdout.write(f'  … {rows} row(s) processed')
+
+        try:
+            report = sync_products(
+                read_feed(options['feed']),
+                chunk_size=options['chunk_size'],
+                dry_run=dry_run,
+                deactivate_missing=options['deactivate_missing'],
+                progress=progress if options['verbosity'] > 1 else None,
+            )
+        except (FeedError, OSError, json.JSONDecodeError) as e:
+            raise CommandError(str(e))
+
+        # bulk_create/update send no signals: invalidate the catalog cache once
+        if not dry_run and (report.created or report.updated or report.deactivated):
+            bump_catalog_version()
+
+        if options['verbosity'] > 1:
+            for slug, changes in report.updated.items():
+                fields = ', '.join(f'{name}: {old} → {new}' for name, (old, new) in changes.items())
+                self.stdout.write(f'  ↻ {slug}: {fields}')
+        for line, message in report.errors:
+            self.stdout.write(self.style.ERROR(f'  ✗ line {line}: {message}'))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report.as_dict(), f, indent=2, ensure_ascii=False)
+                f.write('\n')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.WARNING('DRY RUN - nothing was written') if dry_run else 'Catalog sync complete')
+        self.stdout.write(self.style.SUCCESS(f'Created:   {len(report.created)}'))
+        self.stdout.write(self.style.SUCCESS(f'Updated:   {len(report.updated)}'))
+        self.stdout.write(f'Unchanged: {report.unchanged}')
+        if report.duplicates:
+            self.stdout.write(self.style.WARNING(f'Duplicate rows skipped: {len(report.duplicates)}'))
+        if report.errors:
+            self.stdout.write(self.style.ERROR(f'Invalid rows skipped: {len(report.errors)}'))
+        if report.missing:
+            self.stdout.write(self.style.WARNING(
+                f'Not in feed: {len(report.missing)}'
+                + (f' ({report.deactivated} deactivated)' if options['deactivate_missing'] else '')
+            ))
+        self.stdout.write('=' * 60)
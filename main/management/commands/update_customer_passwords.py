@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
-from django.contrib.auth.hashers import make_password
+from django.db.models import Q
+from django.db.models.functions import Length
 from main.models import Customer
+from main.passwords import make_password
 
 class Command(BaseCommand):
     help = 'Updates existing customers with hashed passwords (user123 for all)'
@@ -8,37 +10,30 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.WARNING('Updating customer passwords...'))
         
-        # Get all customers
-        customers = Customer.objects.all()
+        total = Customer.objects.count()
         
-        if not customers.exists():
+        if not total:
             self.stdout.write(self.style.ERROR('No customers found in database!'))
             return
         
-        # Update each customer with hashed password
-        updated_count = 0
+        # Only customers whose password is empty or not hashed (hashed passwords are much longer)
+        unhashed = Customer.objects.annotate(password_length=Length('password')).filter(
+            Q(password__isnull=True) | Q(password_length__lt=50)
+        )
+        
+        # One hash, one UPDATE for all of them
         password = 'user123'
         hashed_password = make_password(password)
-        
-        for customer in customers:
-            # Only update if password is empty or not hashed
-            if not customer.password or len(customer.password) < 50:  # Hashed passwords are much longer
-                customer.password = hashed_password
-                customer.save()
-                updated_count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(f'✓ Updated password for: {customer.name} ({customer.email})')
-                )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f'⊗ Skipped (already has password): {customer.name} ({customer.email})')
-                )
+        updated_count = Customer.objects.filter(pk__in=unhashed.values('pk')).update(password=hashed_password)
         
         self.stdout.write(
             self.style.SUCCESS(f'\n✓ Successfully updated {updated_count} customer(s)')
         )
         self.stdout.write(
-            self.style.SUCCESS(f'✓ Total customers in database: {customers.count()}')
+            self.style.WARNING(f'⊗ Skipped (already has password): {total - updated_count} customer(s)')
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Total customers in database: {total}')
         )
         self.stdout.write(
             self.style.SUCCESS(f'✓ Default password for all: {password}')
@@ -0,0 +1,39 @@
+"""
+Async-capable middleware
+
+WhiteNoise's middleware is sync only. Under ASGI a single sync middleware
+makes Django run every request through a thread and call the async views
+(Stripe) back through async_to_sync, so a slow Stripe call pins a thread
+again. This subclass keeps the whole middleware chain async.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise static file serving for both sync (WSGI) and async (ASGI) handlers"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Development: looks the file up on disk
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # The file body is streamed by Django's ASGI handler
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_customerstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', '-order_date', '-order_id'], name='main_order_cust_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_order_customer_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='product_names_preview',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:05
+
+import main.models
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    CatalogVersion = apps.get_model('main', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1, defaults={'version': main.models.catalog_version_seed()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=main.models.catalog_version_seed)),
+                ('changed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
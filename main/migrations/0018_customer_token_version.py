@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 import uuid
 from datetime import timedelta
 from django.utils import timezone
@@ -9,6 +10,15 @@ class Customer(models.Model):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15)
     password = models.CharField(max_length=128)  # Stores hashed password
+    token_version = models.PositiveIntegerField(default=0)  # Bumped to revoke all bearer tokens (main/authentication.py)
+
+    class Meta:
+        indexes = [
+            # email__iexact (login, signup, password reset) compares UPPER(email)
+            models.Index(Upper('email'), name='main_customer_email_upper_idx'),
+            # Duplicate phone check on signup
+            models.Index(fields=['phone'], name='main_customer_phone_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -74,6 +84,17 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     payment = models.CharField(max_length=100, blank=True, null=True)
+    # Line summary for list views (main/order_summary.py); NULL until summarized
+    items_count = models.PositiveIntegerField(blank=True, null=True)
+    product_names_preview = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a customer's order history (main/pagination.py)
+            models.Index(fields=['customer', '-order_date', '-order_id'], name='main_order_cust_date_idx'),
+            # Status filter in the admin and status-based bulk actions
+            models.Index(fields=['status'], name='main_order_status_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.order_id} - {self.customer.name}"
@@ -89,6 +110,30 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.product.name} (x{self.quantity})"
 
+    @property
+    def subtotal(self):
+        return self.quantity * self.price
+
+
+class CustomerStats(models.Model):
+    """
+    Denormalized order totals per customer (see main/customer_stats.py)
+    Kept up to date incrementally when orders are created and recomputed
+    when orders change status, so the profile page never scans all orders
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    total_orders = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Customer Stats'
+        verbose_name_plural = 'Customer Stats'
+    
+    def __str__(self):
+        return f"{self.customer_id}: {self.total_orders} orders, Rs. {self.total_spent}"
+
 
 class Cart(models.Model):
     cart_id = models.AutoField(primary_key=True)
@@ -164,3 +209,59 @@ class PasswordResetToken(models.Model):
         self.is_used = True
         self.save()
 
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email waiting to be delivered
+    Request handlers only insert rows here (see main/email_outbox.py);
+    the run_email_worker management command sends them in the background
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    email_id = models.AutoField(primary_key=True)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html_content = models.TextField()
+    category = models.CharField(max_length=50, blank=True)  # e.g. welcome, order_confirmation
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Retry time, or lease expiry while SENDING
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Outgoing Email'
+        verbose_name_plural = 'Email Outbox'
+        ordering = ['-created_at']
+        indexes = [
+            # The worker polls for due rows in this order
+            models.Index(fields=['status', 'next_attempt_at'], name='main_outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+def catalog_version_seed():
+    """Starting catalog version: microseconds, so a recreated row never reuses cached versions"""
+    return int(timezone.now().timestamp() * 1_000_000)
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row catalog version counter (see main/cache.py)
+    Kept in the database rather than the cache so a bump from any worker,
+    the email worker or a management command reaches every web worker
+    """
+    version = models.BigIntegerField(default=catalog_version_seed)
+    changed_at = models.DateTimeField(null=True, blank=True)  # Last bump; Last-Modified of catalog responses
+    
+    def __str__(self):
+        return f"Catalog v{self.version}"
@@ -0,0 +1,64 @@
+"""
+Stored order line summary
+
+List views (account overview, order history cards) only show how many
+lines an order has and the first two product names. Both are stored on
+the Order row (items_count, product_names_preview) so those views never
+load OrderItem/Product rows:
+
+- orders created through the API fill the columns from the products that
+  are already in memory, before the single INSERT
+- OrderItem edits (admin inline) recompute the affected orders
+- backfill_order_summaries fills rows created before the columns existed
+
+A NULL items_count means "not summarized yet"; serializers then fall back
+to reading the order items.
+"""
+from collections import defaultdict
+
+from .models import Order, OrderItem
+
+
+PREVIEW_NAMES = 2
+
+
+def format_product_names(names):
+    """
+    'Tomato, Spinach, +3 more' for a list of product names in line order
+    Returns 'No items' for an empty order
+    """
+    if not names:
+        return "No items"
+
+    preview = list(names[:PREVIEW_NAMES])
+    remaining = len(names) - PREVIEW_NAMES
+    if remaining > 0:
+        preview.append(f"+{remaining} more")
+    return ", ".join(preview)
+
+
+def line_summary(names):
+    """Field values for an order whose lines have these product names"""
+    return {
+        'items_count': len(names),
+        'product_names_preview': format_product_names(names),
+    }
+
+
+def refresh_order_summaries(order_ids):
+    """
+    Recompute items_count/product_names_preview for the given orders
+    One query for the lines, one bulk UPDATE for the orders
+    """
+    order_ids = set(order_ids)
+    if not order_ids:
+        return 0
+
+    names = defaultdict(list)
+    lines = OrderItem.objects.filter(order_id__in=order_ids).order_by('order_id', 'item_id')
+    for order_id, product_name in lines.values_list('order_id', 'product__name'):
+        names[order_id].append(product_name)
+
+    orders = [Order(order_id=order_id, **line_summary(names[order_id])) for order_id in order_ids]
+    Order.objects.bulk_update(orders, ['items_count', 'product_names_preview'])
+    return len(orders)
@@ -0,0 +1,123 @@
+"""
+Keyset (cursor) pagination for order history
+
+Orders are listed newest first by (order_date, order_id). Instead of
+OFFSET, each page continues after the last row of the previous page:
+
+    WHERE order_date < :date OR (order_date = :date AND order_id < :id)
+    ORDER BY order_date DESC, order_id DESC
+    LIMIT :page_size + 1
+
+so page 500 costs the same as page 1 (served by the composite
+Order(customer, -order_date, -order_id) index). The cursor is an opaque
+base64 token of the last row's (order_date, order_id).
+
+Responses are {"next", "next_cursor", "results"}. Unlike the old
+PageNumberPagination body there is no "count" (it would cost a COUNT(*)
+on every page; the per-customer total lives in CustomerStats) and no
+"previous" (keyset pages only walk forward; clients keep the pages they
+already have).
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class OrderCursorPagination(BasePagination):
+    """
+    Keyset pagination over Order querysets, newest first
+    Query parameters: ?cursor=<token>&limit=<page size>
+    """
+    page_size = 100  # Same as the old PAGE_SIZE; clients pass ?limit= for smaller pages
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # ==================== CURSOR ENCODING ====================
+
+    @staticmethod
+    def encode_cursor(order):
+        raw = f'{order.order_date.isoformat()}|{order.order_id}'
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, token):
+        """Return (order_date, order_id) for a cursor token, or None when no cursor is given"""
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+            order_date, order_id = raw.rsplit('|', 1)
+            return datetime.fromisoformat(order_date), int(order_id)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # ==================== PAGINATION ====================
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    @staticmethod
+    def page_queryset(queryset, position=None):
+        """Orders after `position` ((order_date, order_id) of the previous page's last row), newest first"""
+        queryset = queryset.order_by('-order_date', '-order_id')
+        if position:
+            order_date, order_id = position
+            queryset = queryset.filter(
+                Q(order_date__lt=order_date) | Q(order_date=order_date, order_id__lt=order_id)
+            )
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the rows of the requested page (prefetches run on this slice only)"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        queryset = self.page_queryset(queryset, position)
+
+        # One extra row tells whether there is a next page without a COUNT
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.get_next_cursor(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,134 @@
+"""
+Password hashing policy
+
+The algorithm and its cost come from settings (PASSWORD_HASH_ALGORITHM,
+PASSWORD_HASH_COST), so the cost can be tuned per deployment with
+`python manage.py benchmark_password_hashers` instead of living with
+Django's defaults:
+
+- argon2 (needs argon2-cffi), scrypt (standard library) or pbkdf2
+- the hashers below keep Django's algorithm names, so existing hashes keep
+  verifying; a hash made with another algorithm or cost is replaced on the
+  next successful login (check_password's setter, see api_login)
+- hashing runs in a bounded thread pool (PASSWORD_HASH_WORKERS threads per
+  process). scrypt/argon2/pbkdf2 release the GIL while hashing, so a login
+  burst uses at most that many cores per worker and queues the rest
+
+A rehash only changes the stored hash: bearer tokens are tied to
+Customer.token_version (main/authentication.py), which only a password
+change or reset bumps, so a policy change logs nobody out.
+"""
+import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# ==================== HASHERS ====================
+
+class Argon2Hasher(hashers.Argon2PasswordHasher):
+    """Argon2id with time/memory/parallelism from PASSWORD_HASH_COST"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASH_COST['argon2_time_cost']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASH_COST['argon2_memory_cost']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASH_COST['argon2_parallelism']
+
+
+class ScryptHasher(hashers.ScryptPasswordHasher):
+    """scrypt with N/r/p from PASSWORD_HASH_COST"""
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_HASH_COST['scrypt_work_factor']
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_HASH_COST['scrypt_block_size']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASH_COST['scrypt_parallelism']
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Same as Django's, but with maxmem sized for n/r: OpenSSL's 32 MiB
+        # default rejects N=2**15, r=8 and above
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=scrypt_memory(n, r),
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+def scrypt_memory(n, r):
+    """Bytes scrypt needs for N/r (128 * N * r), plus headroom"""
+    return 128 * n * r + (8 << 20)
+
+
+class PBKDF2Hasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count from PASSWORD_HASH_COST"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_COST['pbkdf2_iterations']
+
+
+HASHERS = {
+    'argon2': Argon2Hasher,
+    'scrypt': ScryptHasher,
+    'pbkdf2': PBKDF2Hasher,
+}
+
+
+# ==================== HASHING POOL ====================
+
+_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix='password-hash',
+)
+
+
+def make_password(password, hasher='default'):
+    """make_password() on the hashing pool"""
+    return _pool.submit(hashers.make_password, password, None, hasher).result()
+
+
+def check_password(password, encoded, setter=None):
+    """
+    check_password() on the hashing pool
+    `setter(password)` is called after a successful check when the stored
+    hash uses another algorithm or cost than the current policy. It runs in
+    the calling thread (it usually saves the model), see rehash_customer_password
+    """
+    outdated = []
+    valid = _pool.submit(hashers.check_password, password, encoded, outdated.append).result()
+    if valid and outdated and setter:
+        setter(password)
+    return valid
+
+
+def rehash_customer_password(customer):
+    """check_password setter: store the customer's password under the current policy"""
+    def setter(raw_password):
+        customer.password = make_password(raw_password)
+        customer.save(update_fields=['password'])
+    return setter
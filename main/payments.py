@@ -0,0 +1,68 @@
+"""
+Stripe client setup
+
+The Stripe views (views.py) are async and call stripe's *_async methods.
+Under ASGI (gunicorn.conf.py, SERVER_MODE=asgi) a slow Stripe call then
+parks a coroutine instead of holding a worker, so a few hanging requests
+can no longer exhaust the worker pool.
+
+Both sync and async Stripe calls go through main/http_client.py: pooled
+keep-alive connections (no TLS handshake per checkout call), the
+api.stripe.com concurrency limit and timeouts from OUTBOUND_HTTP, and its
+circuit breaker.
+"""
+import asyncio
+import textwrap
+
+import httpx
+import stripe
+from django.conf import settings
+
+from . import http_client
+
+
+class StripeHTTPClient(stripe.HTTPClient):
+    """stripe HTTP client backed by the shared outbound client"""
+
+    name = 'farm2home-httpx'
+
+    def _raise_connection_error(self, e):
+        # Same wording as stripe's own clients; an open circuit is not retried
+        msg = textwrap.fill(
+            'Unexpected error communicating with Stripe. If this '
+            'problem persists, let us know at support@stripe.com.'
+        )
+        raise stripe.APIConnectionError(
+            f'{msg}\n\n(Network error: {e})',
+            should_retry=not isinstance(e, http_client.CircuitOpenError),
+        ) from e
+
+    def request(self, method, url, headers, post_data=None):
+        try:
+            response = http_client.request(method, url, headers=headers, content=post_data)
+        except httpx.TransportError as e:
+            self._raise_connection_error(e)
+        return response.content, response.status_code, response.headers
+
+    async def request_async(self, method, url, headers, post_data=None):
+        try:
+            response = await http_client.arequest(method, url, headers=headers, content=post_data)
+        except httpx.TransportError as e:
+            self._raise_connection_error(e)
+        return response.content, response.status_code, response.headers
+
+    def sleep_async(self, secs):
+        return asyncio.sleep(secs)
+
+    def close(self):
+        pass  # The pooled client outlives any one SDK client
+
+    async def close_async(self):
+        pass
+
+
+def configure_stripe():
+    """Point the stripe library at our key and HTTP client (called once, from views.py)"""
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = StripeHTTPClient()
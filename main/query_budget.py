@@ -0,0 +1,180 @@
+"""
+Query budgets per endpoint
+
+EndpointRecorder measures one request: number of SQL queries, time spent
+in the database and time spent in DRF serializers (`.data`). Budgets live
+in main/query_budgets.json, keyed by route name:
+
+    {"customer_orders_api": {"queries": 4, "sql_ms": 250, "serializer_ms": 400}}
+
+The route harness in main/tests.py (QueryBudgetTests) calls every route in
+main/urls.py against a realistically sized dataset and fails when a route
+goes over its query budget. Refresh the query counts after an intended
+change with
+
+    QUERY_BUDGET_UPDATE=1 python manage.py test main.tests.QueryBudgetTests
+
+Query counts are deterministic and always enforced. Wall-clock times depend
+on the machine and its load, so they are only reported, unless the run
+opts in with QUERY_BUDGET_TIMING=1 (e.g. on a dedicated benchmark runner).
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from rest_framework.serializers import BaseSerializer
+
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+METRICS = ('queries', 'sql_ms', 'serializer_ms')
+TIME_METRICS = ('sql_ms', 'serializer_ms')
+TIME_HEADROOM = 3       # Time budgets allow 3x the recorded time (CI machines vary)
+TIME_ROUNDING_MS = 50
+
+
+# ==================== SERIALIZER TIMING ====================
+
+_serializer_timing = threading.local()
+_original_data = BaseSerializer.data
+
+
+def _timed_data(self):
+    """BaseSerializer.data that adds its run time to the active recorder"""
+    recorder = getattr(_serializer_timing, 'recorder', None)
+    if recorder is None or getattr(_serializer_timing, 'depth', 0):
+        return _original_data.fget(self)
+
+    # Nested .data calls (ListSerializer -> child) are counted once, at the top
+    _serializer_timing.depth = 1
+    start = time.perf_counter()
+    try:
+        return _original_data.fget(self)
+    finally:
+        recorder.serializer_ms += (time.perf_counter() - start) * 1000
+        _serializer_timing.depth = 0
+
+
+@contextmanager
+def _serializer_timer(recorder):
+    _serializer_timing.recorder = recorder
+    BaseSerializer.data = property(_timed_data)
+    try:
+        yield
+    finally:
+        BaseSerializer.data = _original_data
+        _serializer_timing.recorder = None
+
+
+# ==================== RECORDER ====================
+
+class EndpointRecorder:
+    """
+    Record queries, SQL time and serializer time for the duration of a with-block
+    Serializer time includes queries the serializer triggers (lazy relations)
+    """
+
+    def __init__(self, using=None):
+        self.connection = connection if using is None else using
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.serializer_ms = 0.0
+        self.statements = []
+
+    def _execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_ms += (time.perf_counter() - start) * 1000
+            self.statements.append(sql)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self._execute)
+        self._wrapper.__enter__()
+        self._timer = _serializer_timer(self)
+        self._timer.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._timer.__exit__(*exc_info)
+        self._wrapper.__exit__(*exc_info)
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql_ms, 1),
+            'serializer_ms': round(self.serializer_ms, 1),
+        }
+
+
+# ==================== BUDGETS ====================
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_budgets(budgets, path=BUDGET_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(budgets.items())), f, indent=2)
+        f.write('\n')
+
+
+def budget_from_measurement(measured, previous=None):
+    """
+    Budget entry for a recorded measurement
+    Query counts are exact; times get headroom and are rounded up. A previous
+    time budget is kept while the measurement still fits, so reruns do not
+    churn the file with timing noise.
+    """
+    previous = previous or {}
+
+    def time_budget(metric):
+        if metric in previous and measured[metric] <= previous[metric]:
+            return previous[metric]
+        return math.ceil(measured[metric] * TIME_HEADROOM / TIME_ROUNDING_MS) * TIME_ROUNDING_MS or TIME_ROUNDING_MS
+
+    return {
+        'queries': measured['queries'],
+        'sql_ms': time_budget('sql_ms'),
+        'serializer_ms': time_budget('serializer_ms'),
+    }
+
+
+def enforced_metrics():
+    """Metrics that fail the run: query counts, plus times with QUERY_BUDGET_TIMING=1"""
+    if os.environ.get('QUERY_BUDGET_TIMING'):
+        return METRICS
+    return tuple(metric for metric in METRICS if metric not in TIME_METRICS)
+
+
+def budget_violations(name, measured, budgets, metrics=None):
+    """
+    Messages for every metric of `measured` that is over the route's budget
+    Only `metrics` are checked (default: enforced_metrics())
+    A route without a budget entry is itself a violation
+    """
+    budget = budgets.get(name)
+    if budget is None:
+        return [f"{name}: no budget in {os.path.basename(BUDGET_FILE)} (measured {measured})"]
+
+    return [
+        f"{name}: {metric} {measured[metric]} > budget {budget[metric]}"
+        for metric in (metrics or enforced_metrics())
+        if metric in budget and measured[metric] > budget[metric]
+    ]
+
+
+def format_report(results):
+    """Fixed-width table of {route name: measured metrics}"""
+    lines = [f"{'route':<45} {'queries':>8} {'sql ms':>9} {'ser. ms':>9}"]
+    for name, measured in sorted(results.items()):
+        lines.append(
+            f"{name:<45} {measured['queries']:>8} {measured['sql_ms']:>9.1f} {measured['serializer_ms']:>9.1f}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,120 @@
+"""
+Query plans for hot lookup paths
+
+HOT_QUERIES lists the ORM queries behind the busiest views together with
+the index that is expected to serve them. The querysets come from the
+views themselves (viewset get_queryset(), the admin changelist, the
+keyset paginator, search_queryset, the outbox worker), so a view that
+changes its query changes the plan that is checked. Function views that
+do a single inline lookup are repeated here as that lookup.
+
+The report_seq_scans management command EXPLAINs each one and reports
+sequential scans; the index tests in main/tests.py use the same list on
+PostgreSQL.
+"""
+import re
+
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from .customer_stats import profile_queryset
+from .email_outbox import due_emails
+from .models import Address, Customer, Order, PasswordResetToken
+from .pagination import OrderCursorPagination
+
+
+def view_queryset(viewset_class, **params):
+    """The queryset a DRF viewset lists for GET ?params (nothing is evaluated)"""
+    request = Request(RequestFactory().get('/', params))
+    view = viewset_class(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+    return view.get_queryset()
+
+
+def admin_queryset(model, **filters):
+    """The admin changelist queryset for `model`, narrowed like its list_filter does"""
+    request = RequestFactory().get('/admin/')
+    return admin.site._registry[model].get_queryset(request).filter(**filters)
+
+
+def order_history_page(page_size=20):
+    """A second keyset page of a customer's orders (OrderViewSet and customer_orders_api)"""
+    from .views import OrderViewSet
+
+    queryset = view_queryset(OrderViewSet, customer_id=1)
+    return OrderCursorPagination.page_queryset(queryset, (timezone.now(), 1))[:page_size + 1]
+
+
+def _product_list(**params):
+    from .views import ProductViewSet
+
+    return view_queryset(ProductViewSet, **params)
+
+
+def _cart_list(**params):
+    from .views import CartViewSet
+
+    return view_queryset(CartViewSet, **params)
+
+
+# (label, expected index or None for "any index", queryset factory)
+HOT_QUERIES = [
+    ('api_login / api_signup: customer by email',
+     'main_customer_email_upper_idx',
+     lambda: Customer.objects.filter(email__iexact='someone@example.com')),
+    ('api_signup: duplicate phone check',
+     'main_customer_phone_idx',
+     lambda: Customer.objects.filter(phone='03001234567')),
+    ('customer_profile_api: customer with stats',
+     None,
+     lambda: profile_queryset().filter(customer_id=1)),
+    ('ProductViewSet: category filter (ids from the catalog index)',
+     None,
+     lambda: _product_list(category='vegetables')),
+    ('ProductViewSet: search',
+     'main_product_name_trgm',
+     lambda: _product_list(search='tamater')),
+    ('CartViewSet: items of a customer',
+     None,
+     lambda: _cart_list(customer_id=1)),
+    ('OrderAdmin: orders by status',
+     'main_order_status_idx',
+     lambda: admin_queryset(Order, status='PENDING')),
+    ('OrderViewSet / customer_orders_api: order history page',
+     'main_order_cust_date_idx',
+     order_history_page),
+    ('password reset: token lookup',
+     None,
+     lambda: PasswordResetToken.objects.filter(token='00000000-0000-0000-0000-000000000000')),
+    ('addresses: addresses of a customer',
+     None,
+     lambda: Address.objects.filter(customer_id=1).order_by('-is_default', '-created_at')),
+    ('email worker: due outbox rows',
+     'main_outbox_due_idx',
+     lambda: due_emails(timezone.now())),
+]
+
+
+# PostgreSQL: "Seq Scan on main_product  (cost=...)"
+# SQLite:     "SCAN main_product" (a full scan) vs "SEARCH main_product USING INDEX ..."
+_POSTGRES_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+_SQLITE_SEQ_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+
+
+def find_seq_scans(plan, vendor=None):
+    """Tables read with a sequential scan in an EXPLAIN plan"""
+    vendor = vendor or connection.vendor
+    pattern = _POSTGRES_SEQ_SCAN if vendor == 'postgresql' else _SQLITE_SEQ_SCAN
+    return sorted(set(pattern.findall(plan)))
+
+
+def disable_seq_scans():
+    """
+    Make PostgreSQL prefer any usable index for the rest of the transaction
+    Small (test/staging) tables are otherwise always seq-scanned
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
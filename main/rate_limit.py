@@ -0,0 +1,311 @@
+"""
+Sliding-window rate limits for the public auth and contact endpoints
+
+Login, signup, password reset, contact and callback requests are limited per
+client IP and per submitted email (phone for callbacks), so credential
+stuffing cannot burn password hashes and database lookups:
+
+    @rate_limit('login')
+    @api_view(['POST'])
+    def api_login(request): ...
+
+The decorator sits outside api_view, so an excess request is answered with
+429 + Retry-After before DRF authentication, parsing, hashing or any query.
+
+Two tiers are used (like the catalog cache, see cache.py):
+- a per-process sliding-window log (deques of timestamps, no locks: deque
+  append/popleft and dict.setdefault are atomic in CPython). Exact, and a
+  client hammering one worker is rejected without any network hop
+- the shared Django cache (RATE_LIMIT_SHARED, on when REDIS_URL is set): a
+  sliding-window counter (current + weighted previous fixed window) over all
+  workers. Cache errors fail open
+
+Every rule of a scope is checked before any hit is recorded, so a request
+rejected by one rule (say the email limit) does not use up the slots of the
+others (its IP). Concurrent requests may overshoot a limit by the few that
+pass the check together.
+
+Rejections are counted per scope and key; see rate_limit_stats_api.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, deque
+from functools import wraps
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+# scope -> ((key, max requests, window in seconds), ...)
+RATE_LIMITS = {
+    'login': (('ip', 30, 60), ('email', 10, 300)),
+    'signup': (('ip', 10, 3600), ('email', 3, 3600)),
+    'password_reset': (('ip', 10, 3600), ('email', 3, 3600)),
+    'contact': (('ip', 5, 600), ('email', 5, 3600)),
+    'callback': (('ip', 5, 600), ('phone', 3, 3600)),
+}
+
+SHARED_PREFIX = 'ratelimit'
+MAX_LOCAL_KEYS = 10000  # Per window; idle keys are swept beyond this
+
+
+# ==================== PER-PROCESS TIER ====================
+
+class SlidingWindow:
+    """
+    Sliding-window log for one (scope, key) rule in this process
+    Each key keeps the timestamps of its last `limit` allowed requests
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._hits = {}
+        self._next_sweep = 0.0
+
+    def retry_after(self, key, now=None):
+        """0 when a request for `key` is allowed now, else seconds until a slot frees up (records nothing)"""
+        now = time.monotonic() if now is None else now
+        hits = self._hits.get(key)
+        if not hits:
+            return 0
+
+        cutoff = now - self.window
+        try:
+            while hits[0] <= cutoff:
+                hits.popleft()
+        except IndexError:
+            pass  # Empty (possibly emptied by a concurrent request)
+
+        if len(hits) >= self.limit:
+            try:
+                return max(hits[0] + self.window - now, 0.001)
+            except IndexError:
+                pass
+        return 0
+
+    def record(self, key, now=None):
+        """Count an allowed request for `key`"""
+        now = time.monotonic() if now is None else now
+        hits = self._hits.get(key)
+        if hits is None:
+            if len(self._hits) >= MAX_LOCAL_KEYS:
+                self._sweep(now)
+            hits = self._hits.setdefault(key, deque(maxlen=self.limit))
+        hits.append(now)
+
+    def hit(self, key, now=None):
+        """Check and record a request; returns 0 when allowed, else seconds until a slot frees up"""
+        retry_after = self.retry_after(key, now)
+        if not retry_after:
+            self.record(key, now)
+        return retry_after
+
+    def _sweep(self, now):
+        """Drop keys without requests in the current window (at most once per window)"""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.window
+        cutoff = now - self.window
+        for key, hits in list(self._hits.items()):
+            if not hits or hits[-1] <= cutoff:
+                self._hits.pop(key, None)
+
+    def clear(self):
+        self._hits.clear()
+
+
+_windows = {
+    (scope, kind): SlidingWindow(limit, window)
+    for scope, rules in RATE_LIMITS.items()
+    for kind, limit, window in rules
+}
+
+_rejections = Counter()
+_rejections_lock = threading.Lock()  # Only taken on the (cheap) rejection path
+
+
+# ==================== SHARED TIER ====================
+
+def _shared_keys(scope, kind, value, window, now):
+    """(current window key, previous window key, seconds into the current window)"""
+    index, offset = divmod(now, window)
+    digest = hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+    prefix = f'{SHARED_PREFIX}:{scope}:{kind}:{digest}'
+    return f'{prefix}:{int(index)}', f'{prefix}:{int(index) - 1}', offset
+
+
+def _shared_retry_after(scope, kind, value, limit, window, now):
+    """
+    Sliding-window counter in the shared cache
+    Returns 0 when one more request fits, else the seconds until the estimate
+    drops below the limit (records nothing)
+    """
+    current_key, previous_key, offset = _shared_keys(scope, kind, value, window, now)
+    counts = cache.get_many([current_key, previous_key])
+
+    # The previous window still covers (window - offset) seconds of the sliding window
+    estimate = counts.get(previous_key, 0) * (1 - offset / window) + counts.get(current_key, 0) + 1
+    if estimate <= limit:
+        return 0
+    return max(window - offset, 1)
+
+
+def _shared_record(scope, kind, value, window, now):
+    """Count an allowed request in the shared cache"""
+    current_key, _, _ = _shared_keys(scope, kind, value, window, now)
+    cache.add(current_key, 0, timeout=window * 2)
+    try:
+        cache.incr(current_key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(current_key, 1, timeout=window * 2)
+
+
+# ==================== KEYS ====================
+
+def client_ip(request):
+    """
+    Client address, taking RATE_LIMIT_TRUSTED_PROXIES reverse proxies into account
+    (each proxy appends the address it received the request from to X-Forwarded-For)
+    """
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+        if addresses:
+            return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _request_field(request, name):
+    """A field from the JSON or form body of a plain Django request (no DRF parsing)"""
+    if request.content_type == 'application/json':
+        try:
+            data = orjson.loads(request.body or b'{}')
+        except orjson.JSONDecodeError:
+            return ''
+        value = data.get(name) if isinstance(data, dict) else None
+    else:
+        value = request.POST.get(name)
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _rule_value(request, kind):
+    if kind == 'ip':
+        return client_ip(request)
+    value = _request_field(request, kind)
+    if kind == 'email':
+        return value.lower()[:254]
+    if kind == 'phone':
+        return ''.join(ch for ch in value if ch.isdigit())[-15:]
+    return value[:254]
+
+
+# ==================== CHECK ====================
+
+def check_rate_limit(scope, request):
+    """
+    Seconds the client has to wait, or 0 when the request may proceed
+    All per-process rules are checked before the shared cache is asked, and
+    the request is only recorded (in both tiers) once every rule allowed it
+    """
+    rules = [(kind, limit, window, _rule_value(request, kind)) for kind, limit, window in RATE_LIMITS[scope]]
+    rules = [rule for rule in rules if rule[3]]
+    now = time.monotonic()
+
+    for kind, limit, window, value in rules:
+        retry_after = _windows[scope, kind].retry_after(value, now)
+        if retry_after:
+            _count_rejection(scope, kind)
+            return retry_after
+
+    shared = settings.RATE_LIMIT_SHARED
+    if shared:
+        shared_now = time.time()
+        try:
+            for kind, limit, window, value in rules:
+                retry_after = _shared_retry_after(scope, kind, value, limit, window, shared_now)
+                if retry_after:
+                    _count_rejection(scope, kind)
+                    return retry_after
+        except Exception as e:
+            print(f"⚠️ Shared rate limit unavailable, allowing request: {str(e)}")
+            shared = False
+
+    for kind, limit, window, value in rules:
+        _windows[scope, kind].record(value, now)
+        if shared:
+            try:
+                _shared_record(scope, kind, value, window, shared_now)
+            except Exception as e:
+                print(f"⚠️ Shared rate limit unavailable, allowing request: {str(e)}")
+                shared = False
+    return 0
+
+
+def _count_rejection(scope, kind):
+    with _rejections_lock:
+        _rejections[f'{scope}:{kind}'] += 1
+    if settings.RATE_LIMIT_SHARED:
+        key = f'{SHARED_PREFIX}:rejected:{scope}:{kind}'
+        try:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key)
+        except Exception:
+            pass
+
+
+def rate_limit_stats():
+    """
+    Rejected requests per 'scope:key'
+    'process' counts this worker since it started; 'shared' all workers
+    (only with RATE_LIMIT_SHARED)
+    """
+    with _rejections_lock:
+        local = dict(_rejections)
+    stats = {'process': local, 'shared': None}
+    if settings.RATE_LIMIT_SHARED:
+        names = [f'{scope}:{kind}' for scope, rules in RATE_LIMITS.items() for kind, _, _ in rules]
+        found = cache.get_many([f'{SHARED_PREFIX}:rejected:{name}' for name in names])
+        stats['shared'] = {name: found.get(f'{SHARED_PREFIX}:rejected:{name}', 0) for name in names}
+    return stats
+
+
+def reset_rate_limits():
+    """Forget this process's request history and counters (tests)"""
+    for window in _windows.values():
+        window.clear()
+    with _rejections_lock:
+        _rejections.clear()
+
+
+def rate_limit(scope):
+    """
+    Limit a view per client IP and submitted email/phone (see RATE_LIMITS)
+    Put it above @api_view so excess requests never reach DRF or the view
+    """
+    if scope not in RATE_LIMITS:
+        raise ValueError(f'Unknown rate limit scope: {scope}')
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED and request.method == 'POST':
+                retry_after = check_rate_limit(scope, request)
+                if retry_after:
+                    seconds = int(retry_after) + (retry_after % 1 > 0)
+                    response = JsonResponse({
+                        'success': False,
+                        'error': f'Too many attempts. Please try again in {seconds} seconds.',
+                        'retry_after': seconds,
+                    }, status=429)
+                    response['Retry-After'] = str(seconds)
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
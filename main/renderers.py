@@ -0,0 +1,80 @@
+"""
+Fast JSON renderer and parser for the REST API
+
+Drop-in replacements for DRF's JSONRenderer/JSONParser built on orjson,
+which serializes dicts, lists, strings and datetimes in C. Decimal prices
+are converted in a default hook (to float, like DRF's JSONEncoder); anything
+else orjson does not know (lazy translation strings, querysets, timedeltas)
+is handed to DRF's own encoder so output stays compatible.
+
+If orjson is not installed both classes fall back to the stock DRF
+implementation.
+"""
+import decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    """Types orjson does not serialize natively"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer using orjson
+    Datetimes are written as ISO 8601 with a 'Z' suffix for UTC, like DRF
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        # orjson only supports 2-space indentation; used by ?indent= and the browsable API
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_default, option=options)
+
+        # Same as DRF: escape U+2028/U+2029 so the output is a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSON parser using orjson"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            body = stream.read() if stream is not None else b''
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,234 @@
+"""
+Product search
+
+Ranked, typo-tolerant search over product names and local (Roman Urdu)
+names. The in-process index below serves the catalog API and the
+autocomplete endpoint; ProductViewSet uses PostgreSQL trigram similarity
+(backed by the pg_trgm GIN indexes from migration 0011) and falls back to
+the in-process index on other databases such as SQLite test runs.
+
+Ranking tiers (higher wins, trigram similarity breaks ties):
+- exact match of the whole name
+- prefix match at the start of any word
+- substring match
+- fuzzy match (trigram similarity >= TRIGRAM_THRESHOLD)
+
+Roman Urdu spellings vary a lot ("tamatar"/"tamater", "aloo"/"aalu",
+"bhindi"/"bindi"), so matching also runs on a folded phonetic key that
+drops aspiration, merges vowel variants and collapses doubled letters.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import BooleanField, Case, Func, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+
+TRIGRAM_THRESHOLD = 0.3  # Same default as pg_trgm.similarity_threshold
+MIN_FUZZY_LENGTH = 3     # Shorter queries only use exact/prefix/substring matching
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_REPEAT_RE = re.compile(r'(.)\1+')
+
+# Spelling variants that sound the same in Roman Urdu / English product names
+_PHONETIC_FOLDS = (
+    ('ph', 'f'), ('kh', 'k'), ('gh', 'g'), ('bh', 'b'), ('dh', 'd'),
+    ('th', 't'), ('jh', 'j'), ('ch', 'c'), ('sh', 's'), ('ck', 'k'),
+    ('q', 'k'), ('w', 'v'), ('e', 'a'), ('o', 'u'), ('y', 'i'),
+)
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_WORD_RE.findall(text.lower()))
+
+
+def phonetic_key(text):
+    """Fold a normalized string into its transliteration-insensitive key"""
+    for source, target in _PHONETIC_FOLDS:
+        text = text.replace(source, target)
+    return _REPEAT_RE.sub(r'\1', text)
+
+
+def trigrams(text):
+    """pg_trgm style trigrams: every word padded with two leading spaces and one trailing"""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(grams_a, grams_b):
+    """Trigram similarity (shared / union), as computed by pg_trgm"""
+    if not grams_a or not grams_b:
+        return 0.0
+    shared = len(grams_a & grams_b)
+    return shared / (len(grams_a) + len(grams_b) - shared)
+
+
+class ProductSearchIndex:
+    """
+    In-process n-gram and prefix index over product names
+    `names` and `local_names` are parallel lists; results refer to their positions (rows)
+    """
+
+    def __init__(self, names, local_names):
+        self.size = len(names)
+        self.names = names
+        # Searchable fields per row: normalized text and its phonetic key
+        self.fields = []
+        self.keys = []
+        self.field_grams = []
+        postings = {}
+        prefixes = []
+
+        for row, (name, local_name) in enumerate(zip(names, local_names)):
+            fields = [field for field in (normalize(name), normalize(local_name)) if field]
+            keys = [phonetic_key(field) for field in fields]
+            grams = [trigrams(key) for key in keys]
+            self.fields.append(fields)
+            self.keys.append(keys)
+            self.field_grams.append(grams)
+
+            for field_grams in grams:
+                for gram in field_grams:
+                    postings.setdefault(gram, set()).add(row)
+
+            # Every word start is a prefix entry, so "onion" also finds "Green Onions"
+            for field in fields:
+                words = field.split(' ')
+                for position in range(len(words)):
+                    prefixes.append((' '.join(words[position:]), position, row))
+
+        self.postings = postings
+        prefixes.sort()
+        self.prefixes = prefixes
+        self.prefix_terms = [term for term, _, _ in prefixes]
+
+    def _score(self, row, query, query_key, query_grams):
+        """Relevance score for a row, 0 when it does not match"""
+        best = 0.0
+        fuzzy = len(query) >= MIN_FUZZY_LENGTH
+        for field, key, grams in zip(self.fields[row], self.keys[row], self.field_grams[row]):
+            sim = similarity(query_grams, grams)
+            if field == query or (fuzzy and key == query_key):
+                score = 3.0 + sim
+            elif field.startswith(query) or f' {query}' in field or (fuzzy and key.startswith(query_key)):
+                score = 2.0 + sim
+            elif query in field or (fuzzy and query_key in key):
+                score = 1.0 + sim
+            elif fuzzy and sim >= TRIGRAM_THRESHOLD:
+                score = sim
+            else:
+                continue
+            best = max(best, score)
+        return best
+
+    def search(self, term, limit=None):
+        """
+        Ranked matches for `term`
+        Returns a list of (row, score), best first
+        """
+        query = normalize(term)
+        if not query:
+            return []
+        query_key = phonetic_key(query)
+        query_grams = trigrams(query_key)
+
+        # Candidates: substring matches plus (for longer queries) rows sharing a trigram
+        fuzzy = len(query) >= MIN_FUZZY_LENGTH
+        candidates = {
+            row for row in range(self.size)
+            if any(query in field for field in self.fields[row])
+            or (fuzzy and any(query_key in key for key in self.keys[row]))
+        }
+        if fuzzy:
+            for gram in query_grams:
+                candidates.update(self.postings.get(gram, ()))
+
+        results = []
+        for row in candidates:
+            score = self._score(row, query, query_key, query_grams)
+            if score > 0:
+                results.append((row, score))
+
+        results.sort(key=lambda result: (-result[1], self.names[result[0]]))
+        return results[:limit] if limit else results
+
+    def suggest(self, prefix, limit=8):
+        """
+        Autocomplete: rows whose name or local name has a word starting with `prefix`
+        Matches at the start of the name rank first, then shorter names.
+        Falls back to fuzzy search when nothing matches the prefix.
+        """
+        query = normalize(prefix)
+        if not query:
+            return []
+
+        matches = {}
+        start = bisect_left(self.prefix_terms, query)
+        for term, position, row in self.prefixes[start:start + limit * 8]:
+            if not term.startswith(query):
+                break
+            rank = (position, len(self.names[row]), self.names[row])
+            if row not in matches or rank < matches[row]:
+                matches[row] = rank
+
+        if matches:
+            return sorted(matches, key=matches.get)[:limit]
+        return [row for row, _ in self.search(query, limit=limit)]
+
+
+class TrigramMatch(Func):
+    """
+    `expression % term`: pg_trgm's similarity operator (similarity above
+    pg_trgm.similarity_threshold, 0.3 by default like TRIGRAM_THRESHOLD)
+    Unlike a filter on similarity() itself, the operator is answered by a
+    GIN gin_trgm_ops index on the same expression
+    """
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def search_queryset(queryset, term):
+    """
+    Filter and rank a Product queryset by `term`
+    PostgreSQL: matches by substring (LIKE) or trigram similarity (%) on
+    UPPER(name)/UPPER(local_name), both served by the pg_trgm GIN indexes from
+    migration 0011; only the matches are ranked by similarity.
+    Other databases: the in-process catalog search index.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        upper_term = Value(term.upper())
+        matches = (
+            Q(name__icontains=term)
+            | Q(local_name__icontains=term)
+            | TrigramMatch(Upper('name'), upper_term)
+            | TrigramMatch(Upper('local_name'), upper_term)
+        )
+        rank = Greatest(
+            TrigramSimilarity(Upper('name'), upper_term),
+            TrigramSimilarity(Upper('local_name'), upper_term),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', 'name')
+
+    from .catalog_index import get_catalog_index
+
+    index = get_catalog_index()
+    ids = [index.ids[row] for row, _ in index.search(term)]
+    if not ids:
+        return queryset.none()
+    ranking = Case(*[When(product_id=product_id, then=position) for position, product_id in enumerate(ids)])
+    return queryset.filter(product_id__in=ids).order_by(ranking)
@@ -1,5 +1,13 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models, transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Customer, Product, Inventory, Order, OrderItem, Cart, Address
+from .stock import reserve_stock
+from .customer_stats import get_customer_stats, growth_percentage, profile_queryset
+from .image_variants import image_manifest, responsive_image
+from .order_summary import format_product_names, line_summary
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -22,60 +30,42 @@ class CustomerProfileSerializer(serializers.ModelSerializer):
     """
     Serializer for Customer Profile with computed statistics
     Returns customer data along with total_spent, total_orders, and growth_percentage
+    Expects a customer from customer_stats.profile_queryset() (stats row and
+    spending windows loaded in one query); other instances fall back to
+    computing the same values
     """
     total_spent = serializers.SerializerMethodField()
     total_orders = serializers.SerializerMethodField()
+    cancelled_orders = serializers.SerializerMethodField()
     growth_percentage = serializers.SerializerMethodField()
     
     class Meta:
         model = Customer
         fields = ['customer_id', 'name', 'email', 'phone', 
-                  'total_spent', 'total_orders', 'growth_percentage']
+                  'total_spent', 'total_orders', 'cancelled_orders', 'growth_percentage']
         read_only_fields = ['customer_id']
     
     def get_total_spent(self, obj):
-        """Calculate total amount spent by customer across all orders"""
-        from django.db.models import Sum
-        total = obj.orders.aggregate(total=Sum('total_amount'))['total']
+        """Total amount spent by customer across all orders"""
+        total = get_customer_stats(obj).total_spent
         return float(total) if total else 0.0
     
     def get_total_orders(self, obj):
-        """Get total number of orders for this customer"""
-        return obj.orders.count()
+        """Total number of orders for this customer"""
+        return get_customer_stats(obj).total_orders
+    
+    def get_cancelled_orders(self, obj):
+        """Number of cancelled orders for this customer"""
+        return get_customer_stats(obj).cancelled_orders
     
     def get_growth_percentage(self, obj):
         """
         Calculate growth percentage based on recent vs older orders
         Compares last 30 days spending vs previous 30 days
-        Returns None if insufficient data
         """
-        from django.utils import timezone
-        from datetime import timedelta
-        from django.db.models import Sum
-        
-        now = timezone.now()
-        last_30_days = now - timedelta(days=30)
-        previous_60_to_30_days = now - timedelta(days=60)
-        
-        # Get spending in last 30 days
-        recent_spending = obj.orders.filter(
-            order_date__gte=last_30_days
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Get spending in previous 30 days (30-60 days ago)
-        previous_spending = obj.orders.filter(
-            order_date__gte=previous_60_to_30_days,
-            order_date__lt=last_30_days
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Calculate percentage change
-        if previous_spending > 0:
-            growth = ((recent_spending - previous_spending) / previous_spending) * 100
-            return round(growth, 1)
-        elif recent_spending > 0:
-            return 100.0  # 100% growth if spending started in last 30 days
-        else:
-            return 0.0  # No growth if no spending in either period
+        if not hasattr(obj, 'recent_spent'):
+            obj = profile_queryset().get(customer_id=obj.customer_id)
+        return growth_percentage(obj.recent_spent, obj.previous_spent)
 
 
 class InventorySerializer(serializers.ModelSerializer):
@@ -88,10 +78,107 @@ class InventorySerializer(serializers.ModelSerializer):
         read_only_fields = ['inventory_id']
 
 
+# ==================== CATALOG FAST PATH ====================
+
+# DB season values -> frontend season values
+CATALOG_SEASON_LABELS = {
+    'SUMMER': 'summer',
+    'WINTER': 'winter',
+    'ALL_YEAR': 'year-round'
+}
+
+_TWO_PLACES = Decimal('0.01')
+
+
+def catalog_season_flags(month=None):
+    """
+    Which seasons are in season for the given month (default: current month)
+    For demo: Summer = May-September, Winter = October-April
+    """
+    if month is None:
+        month = timezone.localdate().month
+    
+    # Summer months: 5-9 (May to September)
+    is_summer = month in (5, 6, 7, 8, 9)
+    return {'ALL_YEAR': True, 'SUMMER': is_summer, 'WINTER': not is_summer}
+
+
+def _decimal_to_string(value):
+    """Format a 2-decimal-place value exactly like DRF's DecimalField"""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value).strip())
+    return '{:f}'.format(value.quantize(_TWO_PLACES, rounding=ROUND_HALF_UP))
+
+
+def bulk_stock_levels(products):
+    """
+    Map product_id -> stock_available for a list of products
+    Uses inventories already loaded by select_related and fetches the rest
+    in a single query; products without inventory are left out (stock 0)
+    """
+    stock = {}
+    missing = []
+    for product in products:
+        if Product.inventory.is_cached(product):
+            # Cached as None when select_related found no inventory row
+            inventory = Product.inventory.related.get_cached_value(product)
+            if inventory is not None:
+                stock[product.product_id] = inventory.stock_available
+        else:
+            missing.append(product.product_id)
+    
+    if missing:
+        stock.update(
+            Inventory.objects.filter(product_id__in=missing).values_list('product_id', 'stock_available')
+        )
+    return stock
+
+
+def build_catalog_row(product, stock_available, season_flags, image_variants):
+    """
+    Build one catalog row as a flat dict
+    Produces exactly the same output as ProductCatalogSerializer
+    """
+    return {
+        'id': product.product_id,
+        'name': product.name,
+        'variety': product.local_name,
+        'price': _decimal_to_string(product.price),
+        'image': responsive_image(product.image, product.category, image_variants),
+        'category': product.category,
+        'season': CATALOG_SEASON_LABELS.get(product.season, 'year-round'),
+        'inStock': stock_available > 0,
+        'inSeasonNow': season_flags.get(product.season, False),
+        'stock_available': stock_available,
+        'discount': _decimal_to_string(product.discount),
+        'slug': product.slug,
+    }
+
+
+class ProductCatalogListSerializer(serializers.ListSerializer):
+    """
+    Fast path for ProductCatalogSerializer(many=True)
+    Computes the current season once per request, resolves all stock levels
+    in bulk and builds rows with build_catalog_row instead of running the
+    field machinery for every product
+    """
+    
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        season_flags = catalog_season_flags()
+        stock = bulk_stock_levels(products)
+        variants = image_manifest()
+        return [
+            build_catalog_row(product, stock.get(product.product_id, 0), season_flags, variants)
+            for product in products
+        ]
+
+
 class ProductCatalogSerializer(serializers.ModelSerializer):
     """
     Enhanced serializer for Product Catalog page
     Matches the frontend data structure for seamless integration
+    Lists (many=True) use ProductCatalogListSerializer's fast path
     """
     # Map database fields to frontend expected fields
     id = serializers.IntegerField(source='product_id', read_only=True)
@@ -103,12 +190,13 @@ class ProductCatalogSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Product
+        list_serializer_class = ProductCatalogListSerializer
         fields = [
             'id',               # Maps to product_id
             'name',             # English name
             'variety',          # Maps to local_name (Urdu/local)
             'price',            # Price per kg
-            'image',            # Image path
+            'image',            # srcset-ready structure (main/image_variants.py)
             'category',         # vegetables/fruits/herbs
             'season',           # SUMMER/WINTER/ALL_YEAR
             'inStock',          # Computed from inventory
@@ -120,11 +208,12 @@ class ProductCatalogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug']
     
     def get_image(self, obj):
-        """Return the image path with static prefix"""
-        if obj.image:
-            return obj.image
-        # Default image based on category
-        return f'/static/images/{obj.category}/default.png'
+        """
+        Return the image as {src, width, height, sizes, sources: [{type, srcset}]}
+        src is the original path (category default when empty); sources lists the
+        AVIF/WebP width variants written by optimize_images
+        """
+        return responsive_image(obj.image, obj.category)
     
     def get_inStock(self, obj):
         """Check if product is in stock"""
@@ -134,24 +223,8 @@ class ProductCatalogSerializer(serializers.ModelSerializer):
             return False
     
     def get_inSeasonNow(self, obj):
-        """
-        Determine if product is in season now
-        For demo: Summer = May-September, Winter = October-April
-        """
-        import datetime
-        current_month = datetime.datetime.now().month
-        
-        # Summer months: 5-9 (May to September)
-        is_summer = current_month in [5, 6, 7, 8, 9]
-        
-        if obj.season == 'ALL_YEAR':
-            return True
-        elif obj.season == 'SUMMER':
-            return is_summer
-        elif obj.season == 'WINTER':
-            return not is_summer
-        
-        return False
+        """Determine if product is in season now"""
+        return catalog_season_flags().get(obj.season, False)
     
     def get_stock_available(self, obj):
         """Get available stock from related inventory"""
@@ -168,12 +241,7 @@ class ProductCatalogSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
         
         # Convert season from SUMMER/WINTER/ALL_YEAR to summer/winter/year-round
-        season_mapping = {
-            'SUMMER': 'summer',
-            'WINTER': 'winter',
-            'ALL_YEAR': 'year-round'
-        }
-        data['season'] = season_mapping.get(data['season'], 'year-round')
+        data['season'] = CATALOG_SEASON_LABELS.get(data['season'], 'year-round')
         
         return data
 
@@ -249,7 +317,9 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['order_id', 'order_date', 'total_amount']
     
     def get_items_count(self, obj):
-        """Get total number of items in order"""
+        """Get total number of items in order (stored on the order when available)"""
+        if obj.items_count is not None:
+            return obj.items_count
         return obj.order_items.count()
 
 
@@ -272,21 +342,13 @@ class OrderSummarySerializer(serializers.ModelSerializer):
         """
         Get product names from order items
         Returns first 2 product names, then '+X more' if more exist
+        Served from the stored preview; older orders fall back to the items
         """
-        order_items = obj.order_items.select_related('product').all()
+        if obj.product_names_preview is not None:
+            return obj.product_names_preview
         
-        if not order_items.exists():
-            return "No items"
-        
-        # Get first 2 product names
-        product_names = [item.product.name for item in order_items[:2]]
-        
-        # Add "+X more" if there are more than 2 items
-        remaining = order_items.count() - 2
-        if remaining > 0:
-            product_names.append(f"+{remaining} more")
-        
-        return ", ".join(product_names)
+        order_items = obj.order_items.select_related('product').order_by('item_id')
+        return format_product_names([item.product.name for item in order_items])
     
     def get_order_date_formatted(self, obj):
         """
@@ -348,8 +410,12 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     def get_items_count(self, obj):
         """
         Get total number of items in this order
+        Uses the stored count; the prefetched items are only counted for
+        orders that have not been summarized yet
         """
-        return obj.order_items.count()
+        if obj.items_count is not None:
+            return obj.items_count
+        return len(obj.order_items.all())
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
@@ -365,7 +431,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         fields = ['customer', 'status', 'payment', 'items']
     
     def validate_items(self, value):
-        """Validate order items"""
+        """Validate order items (one query for all products and inventories)"""
         if not value:
             raise serializers.ValidationError("Order must contain at least one item.")
         
@@ -374,18 +440,24 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     "Each item must have 'product_id', 'quantity', and 'price'."
                 )
-            
+        
+        products = Product.objects.filter(
+            product_id__in=[item['product_id'] for item in value]
+        ).select_related('inventory').in_bulk()
+        self._products = products  # Reused by create() for the line summary
+        
+        for item in value:
             # Check if product exists
-            if not Product.objects.filter(product_id=item['product_id']).exists():
+            product = products.get(item['product_id'])
+            if product is None:
                 raise serializers.ValidationError(
                     f"Product with ID {item['product_id']} does not exist."
                 )
             
             # Check stock availability
             try:
-                inventory = Inventory.objects.get(product_id=item['product_id'])
+                inventory = product.inventory
                 if inventory.stock_available < item['quantity']:
-                    product = Product.objects.get(product_id=item['product_id'])
                     raise serializers.ValidationError(
                         f"Insufficient stock for {product.name}. Available: {inventory.stock_available}"
                     )
@@ -397,31 +469,40 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        """Create order with items and update inventory"""
+        """
+        Create order with items and update inventory
+        Raises InsufficientStockError if stock ran out since validation
+        """
         items_data = validated_data.pop('items')
         
-        # Create the order
-        order = Order.objects.create(**validated_data)
-        
-        # Calculate total amount and create order items
+        # Calculate total amount up front so the order is inserted once
         total = 0
         for item_data in items_data:
-            order_item = OrderItem.objects.create(
-                order=order,
-                product_id=item_data['product_id'],
-                quantity=item_data['quantity'],
-                price=item_data['price']
-            )
-            total += order_item.quantity * order_item.price
-            
-            # Update inventory
-            inventory = Inventory.objects.get(product_id=item_data['product_id'])
-            inventory.stock_available -= item_data['quantity']
-            inventory.save()
+            total += item_data['quantity'] * Decimal(str(item_data['price']))
         
-        # Update order total
-        order.total_amount = total
-        order.save()
+        # Line summary for list views, from the products loaded during validation
+        products = getattr(self, '_products', None)
+        if products is None:
+            products = Product.objects.in_bulk([item['product_id'] for item in items_data])
+        summary = line_summary([products[item['product_id']].name for item in items_data])
+        
+        with transaction.atomic():
+            # Reserve stock for every line in one UPDATE (rolls back on failure)
+            reserve_stock((item['product_id'], item['quantity']) for item in items_data)
+            
+            # Create the order
+            order = Order.objects.create(total_amount=total, **summary, **validated_data)
+            
+            # Create all order items in one bulk insert
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product_id=item_data['product_id'],
+                    quantity=item_data['quantity'],
+                    price=item_data['price']
+                )
+                for item_data in items_data
+            ])
         
         return order
 
@@ -647,7 +728,11 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField(required=False, allow_null=True)
     
     def validate_items(self, value):
-        """Validate cart items"""
+        """
+        Validate cart items
+        All products and their inventories are loaded in one query and kept
+        for create(), so the query count does not grow with the cart size
+        """
         if not value:
             raise serializers.ValidationError("Order must contain at least one item")
         
@@ -656,15 +741,24 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
                 raise serializers.ValidationError(
                     "Each item must have 'product_id' and 'quantity'"
                 )
-            
+        
+        products = Product.objects.filter(
+            product_id__in=[item['product_id'] for item in value],
+            is_active=True
+        ).select_related('inventory').in_bulk()
+        
+        for item in value:
             # Validate product exists and is active
-            try:
-                product = Product.objects.get(product_id=item['product_id'], is_active=True)
-            except Product.DoesNotExist:
+            product = products.get(item['product_id'])
+            if product is None:
                 raise serializers.ValidationError(
                     f"Product with ID {item['product_id']} not found or inactive"
                 )
             
+            # Validate quantity is positive
+            if item['quantity'] <= 0:
+                raise serializers.ValidationError("Item quantity must be greater than 0")
+            
             # Check stock availability
             try:
                 inventory = product.inventory
@@ -677,11 +771,9 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
                 raise serializers.ValidationError(
                     f"No inventory found for {product.name}"
                 )
-            
-            # Validate quantity is positive
-            if item['quantity'] <= 0:
-                raise serializers.ValidationError("Item quantity must be greater than 0")
         
+        # Reused by create() instead of fetching each product again
+        self._products = products
         return value
     
     def validate(self, data):
@@ -701,9 +793,8 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
         """
         Create the complete order with customer, order items, and update inventory
         Returns the created order with all related data
+        Raises InsufficientStockError if a line cannot be reserved
         """
-        from django.db import transaction
-        
         shipping_data = validated_data.pop('shipping')
         billing_data = validated_data.pop('billing')
         items_data = validated_data.pop('items')
@@ -730,7 +821,21 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
                     phone=shipping_data['phone']
                 )
             
-            # Step 2: Create the order
+            # Step 2: Reserve stock for every line in one UPDATE
+            # Validation above ran outside this transaction, so stock may have been
+            # sold since; this raises InsufficientStockError and rolls back if so
+            reserve_stock((item['product_id'], item['quantity']) for item in items_data)
+            
+            # Step 3: Calculate the total from current product prices
+            products = getattr(self, '_products', None)
+            if products is None:
+                products = Product.objects.in_bulk([item['product_id'] for item in items_data])
+            
+            total_amount = 0
+            for item_data in items_data:
+                total_amount += item_data['quantity'] * products[item_data['product_id']].price
+            
+            # Step 4: Create the order (single insert, total already known)
             # Determine payment method from billing data
             card_number = billing_data.get('cardNumber', '').strip()
             if card_number and len(card_number) >= 4:
@@ -741,35 +846,23 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
             order = Order.objects.create(
                 customer=customer,
                 status='PENDING',
-                payment=payment_method
+                payment=payment_method,
+                total_amount=total_amount,
+                **line_summary([products[item['product_id']].name for item in items_data])
             )
             
-            # Step 3: Create order items and calculate total
-            total_amount = 0
-            for item_data in items_data:
-                product = Product.objects.get(product_id=item_data['product_id'])
-                
-                # Create order item
-                order_item = OrderItem.objects.create(
+            # Step 5: Create all order items in one bulk insert
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
-                    product=product,
+                    product=products[item_data['product_id']],
                     quantity=item_data['quantity'],
-                    price=product.price  # Use current product price
+                    price=products[item_data['product_id']].price  # Use current product price
                 )
-                
-                # Add to total
-                total_amount += order_item.quantity * order_item.price
-                
-                # Update inventory
-                inventory = product.inventory
-                inventory.stock_available -= item_data['quantity']
-                inventory.save()
-            
-            # Step 4: Update order total
-            order.total_amount = total_amount
-            order.save()
+                for item_data in items_data
+            ])
             
-            # Step 5: Store shipping info as temporary attribute for email
+            # Step 6: Store shipping info as temporary attribute for email
             # (Not persisted to database, just for passing to email function)
             order.shipping_info = {
                 'name': shipping_data['fullName'],
@@ -779,7 +872,7 @@ class CheckoutOrderCreateSerializer(serializers.Serializer):
                 'phone': shipping_data['phone'],
             }
             
-            # Step 6: Clear customer's cart (always clear, regardless of whether customer was new or existing)
+            # Step 7: Clear customer's cart (always clear, regardless of whether customer was new or existing)
             Cart.objects.filter(customer=customer).delete()
             
             return order
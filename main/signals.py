@@ -0,0 +1,60 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Product, Inventory, Customer, Order, OrderItem
+from .authentication import forget_principal
+from .cache import bump_catalog_version
+from .customer_stats import record_new_order, refresh_customer_stats
+from .order_summary import refresh_order_summaries
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Invalidate cached catalog responses whenever a product or its stock changes"""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_principal(sender, instance, **kwargs):
+    """Drop this worker's cached token principal (profile edit, password change, deletion)"""
+    forget_principal(instance.customer_id)
+
+
+@receiver(post_save, sender=Order)
+def update_customer_stats(sender, instance, created, **kwargs):
+    """Keep the CustomerStats rollup in step with orders"""
+    if created:
+        record_new_order(instance)
+    else:
+        # Status or total edited (admin form, API update) - recompute this customer
+        refresh_customer_stats([instance.customer_id])
+
+
+def deleted_with(origin, *models):
+    """True when a cascade started from one of `models` (instance or queryset delete)"""
+    if isinstance(origin, QuerySet):
+        return origin.model in models
+    return isinstance(origin, models)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_customer_stats(sender, instance, origin=None, **kwargs):
+    # Deleting a customer removes their stats row too; recomputing it here
+    # would re-insert a row for the customer being deleted
+    if deleted_with(origin, Customer):
+        return
+    refresh_customer_stats([instance.customer_id])
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_order_line_summary(sender, instance, origin=None, **kwargs):
+    """Recompute the stored line summary when an order's items are edited (admin inline)"""
+    if deleted_with(origin, Order, Customer):
+        return  # The order itself is being deleted
+    refresh_order_summaries([instance.order_id])
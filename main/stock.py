@@ -0,0 +1,135 @@
+"""
+Stock reservation
+
+Checkout decrements stock for every line of an order in one set-based
+UPDATE that only touches rows with enough stock:
+
+    UPDATE main_inventory
+    SET stock_available = stock_available - CASE product_id WHEN ... END
+    WHERE product_id IN (...) AND stock_available >= CASE product_id WHEN ... END
+
+The database checks and decrements each row atomically, so concurrent
+checkouts can never oversell (under READ COMMITTED, PostgreSQL re-checks
+the WHERE clause after waiting on a row lock) and there is no
+read-modify-write window in Python. If fewer rows were updated than there
+are lines, the reservation is rolled back and the failing lines are
+reported. When no line fails on the re-read (a concurrent cancellation
+restored the stock in between), the reservation is tried once more.
+
+update() sends no post_save signals, so every reservation bumps the
+catalog version itself (after the order commits; a batch of reservations
+inside batch_catalog_invalidation() bumps once). Cached catalog responses
+and the catalog index then never show stock_available from before a sale.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .cache import bump_catalog_version_on_commit
+from .models import Inventory
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when one or more order lines cannot be reserved
+    `failures` is a list of dicts: product_id, product_name, requested, available
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__('; '.join(
+            f"Insufficient stock for {failure['product_name']}. "
+            f"Available: {failure['available']}, Requested: {failure['requested']}"
+            for failure in failures
+        ) or 'Stock changed while placing the order, please try again')
+
+
+class _ReservationFailed(Exception):
+    """Internal: rolls back a partial reservation"""
+
+
+RESERVE_ATTEMPTS = 2  # A reservation that fails while no line is short is retried once
+
+
+def merge_lines(lines):
+    """
+    Combine (product_id, quantity) pairs into {product_id: total quantity}
+    A product listed on several lines is reserved (and checked) once
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return dict(sorted(quantities.items()))
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(product_id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _find_failures(quantities):
+    """Lines that could not be reserved, with the stock currently available"""
+    available = {
+        product_id: (stock, name)
+        for product_id, stock, name in Inventory.objects.filter(
+            product_id__in=quantities
+        ).values_list('product_id', 'stock_available', 'product__name')
+    }
+    failures = []
+    for product_id, quantity in quantities.items():
+        stock, name = available.get(product_id, (0, f'product ID {product_id}'))
+        if stock < quantity:
+            failures.append({
+                'product_id': product_id,
+                'product_name': name,
+                'requested': quantity,
+                'available': stock,
+            })
+    return failures
+
+
+def _reserve(quantities):
+    """Decrement every line in one UPDATE; False (and nothing changed) if any line did not fit"""
+    try:
+        with transaction.atomic():
+            quantity = _quantity_case(quantities)
+            updated = Inventory.objects.filter(
+                product_id__in=quantities,
+                stock_available__gte=quantity,
+            ).update(stock_available=F('stock_available') - quantity)
+
+            if updated != len(quantities):
+                # Leaving the atomic block with an exception undoes the rows that were decremented
+                raise _ReservationFailed
+    except _ReservationFailed:
+        return False
+    return True
+
+
+def reserve_stock(lines):
+    """
+    Decrement stock for all order lines in a single UPDATE
+    `lines` is an iterable of (product_id, quantity). Either every line is
+    reserved or none is: on failure the changes are rolled back and
+    InsufficientStockError is raised. Call inside the order's transaction so
+    a later failure also releases the stock.
+    """
+    quantities = merge_lines(lines)
+    if not quantities:
+        return
+
+    failures = []
+    for _ in range(RESERVE_ATTEMPTS):
+        if _reserve(quantities):
+            break
+        # Look up stock after the rollback so lines that did fit are not reported
+        failures = _find_failures(quantities)
+        if failures:
+            raise InsufficientStockError(failures)
+        # Every line fits now: stock was restored after the UPDATE, try again
+    else:
+        raise InsufficientStockError(failures)
+
+    # update() bypasses the Inventory post_save signal that invalidates the catalog
+    bump_catalog_version_on_commit()
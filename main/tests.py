@@ -1,3 +1,1572 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import stripe
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from . import http_client, urls as main_urls
+from .cache import batch_catalog_invalidation, bump_catalog_version, get_catalog_version
+from .catalog_index import CatalogIndex
+from .catalog_sync import DEFAULT_STOCK, read_feed, sync_products
+from .customer_stats import refresh_customer_stats
+from .data_transfer import export_all, import_all
+from .email_outbox import (
+    BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS, FileTransport, ResendTransport, backoff_delay, claim_due_emails,
+    drain_outbox, enqueue_emails,
+)
+from .image_variants import build_variants, image_manifest, responsive_image
+from .models import (
+    Product, Inventory, Order, OrderItem, Customer, CustomerStats, Cart, Address, PasswordResetToken, EmailOutbox,
+    CatalogVersion,
+)
+from .order_summary import line_summary
+from .query_budget import (
+    TIME_METRICS, EndpointRecorder, budget_from_measurement, budget_violations, enforced_metrics, format_report,
+    load_budgets, save_budgets,
+)
+from .pagination import OrderCursorPagination
+from .query_plans import HOT_QUERIES, disable_seq_scans, find_seq_scans, order_history_page
+from .rate_limit import RATE_LIMITS, SlidingWindow, client_ip, rate_limit_stats, reset_rate_limits
+from .renderers import ORJSONParser, ORJSONRenderer
+from .serializers import CheckoutOrderCreateSerializer, OrderSummarySerializer
+from .stock import InsufficientStockError, reserve_stock
+from .utils import send_order_confirmation_email
+
+
+# ==================== ORDER CREATION ====================
+
+class CheckoutOrderCreateQueryCountTests(TestCase):
+    """
+    Checkout order creation must use a constant number of queries,
+    no matter how many lines the cart has
+    """
+
+    # validate_items: products + inventories (1)
+    # create: savepoint (1), customer insert (1), stock reservation with its savepoint (3),
+    # order insert (1), customer stats increment (1), order items bulk insert (1),
+    # cart delete (1), release savepoint (1); the catalog bump runs after commit
+    EXPECTED_QUERIES = 11
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = []
+        for i in range(40):
+            product = Product.objects.create(
+                name=f'Product {i}',
+                category='vegetables',
+                price=10 + i,
+                slug=f'product-{i}',
+            )
+            Inventory.objects.create(product=product, stock_available=100)
+            cls.products.append(product)
+
+    def checkout_data(self, products, email):
+        return {
+            'shipping': {
+                'fullName': 'Test Customer',
+                'email': email,
+                'phone': '03001234567',
+                'address': '12 Mall Road',
+                'city': 'Lahore',
+                'zipCode': '54000',
+            },
+            'billing': {
+                'cardName': 'Test Customer',
+                'cardNumber': '',
+                'expiryDate': '',
+                'cvv': '',
+                'billingAddress': '12 Mall Road',
+                'billingCity': 'Lahore',
+                'billingZip': '54000',
+            },
+            'items': [{'product_id': product.product_id, 'quantity': 2} for product in products],
+        }
+
+    def create_order(self, products, email='customer@example.com'):
+        serializer = CheckoutOrderCreateSerializer(data=self.checkout_data(products, email))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as single:
+            self.create_order(self.products[:1], email='single@example.com')
+        with CaptureQueriesContext(connection) as large:
+            self.create_order(self.products, email='large@example.com')
+
+        self.assertEqual(len(single), len(large))
+
+    def test_large_order_query_count(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            order = self.create_order(self.products)
+
+        order.refresh_from_db()
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 40)
+        self.assertEqual(order.total_amount, sum(2 * product.price for product in self.products))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(
+            set(Inventory.objects.values_list('stock_available', flat=True)),
+            {98}
+        )
+
+    def test_line_summary_follows_item_edits(self):
+        order = self.create_order(self.products[:3])
+
+        def summary():
+            order.refresh_from_db()
+            return order.items_count, order.product_names_preview, OrderSummarySerializer(order).data['product_names']
+
+        self.assertEqual(summary(), (3, 'Product 0, Product 1, +1 more', 'Product 0, Product 1, +1 more'))
+
+        # Admin inline edits: delete a line, change a line's product, add a line
+        order.order_items.get(product=self.products[0]).delete()
+        self.assertEqual(summary(), (2, 'Product 1, Product 2', 'Product 1, Product 2'))
+
+        line = order.order_items.get(product=self.products[1])
+        line.product = self.products[5]
+        line.save()
+        self.assertEqual(summary()[1], 'Product 5, Product 2')
+
+        OrderItem.objects.create(order=order, product=self.products[7], quantity=1, price=self.products[7].price)
+        self.assertEqual(summary(), (3, 'Product 5, Product 2, +1 more', 'Product 5, Product 2, +1 more'))
+
+        # Deleting the order does not try to summarize it again
+        order.delete()
+        self.assertFalse(Order.objects.exists())
+
+
+class StockReservationTests(TestCase):
+    """reserve_stock never oversells and reports exactly the lines that do not fit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tomato = Product.objects.create(name='Tomato', category='vegetables', price=100)
+        cls.onion = Product.objects.create(name='Onion', category='vegetables', price=80)
+        Inventory.objects.create(product=cls.tomato, stock_available=5)
+        Inventory.objects.create(product=cls.onion, stock_available=2)
+
+    def stock(self):
+        return dict(Inventory.objects.values_list('product__name', 'stock_available'))
+
+    def test_never_oversells(self):
+        reserve_stock([(self.tomato.pk, 2), (self.onion.pk, 1)])
+        # The same product on two lines is checked against its total
+        with self.assertRaises(InsufficientStockError):
+            reserve_stock([(self.tomato.pk, 2), (self.tomato.pk, 2)])
+        reserve_stock([(self.tomato.pk, 3)])
+        with self.assertRaises(InsufficientStockError):
+            reserve_stock([(self.tomato.pk, 1)])
+        self.assertEqual(self.stock(), {'Tomato': 0, 'Onion': 1})
+
+    def test_insufficient_stock_report_and_rollback(self):
+        missing_id = self.onion.pk + 100
+        with self.assertRaises(InsufficientStockError) as raised:
+            reserve_stock([(self.tomato.pk, 4), (self.onion.pk, 3), (missing_id, 1)])
+
+        # The tomato line fitted: it is rolled back but not reported
+        self.assertEqual(self.stock(), {'Tomato': 5, 'Onion': 2})
+        self.assertEqual(raised.exception.failures, [
+            {'product_id': self.onion.pk, 'product_name': 'Onion', 'requested': 3, 'available': 2},
+            {'product_id': missing_id, 'product_name': f'product ID {missing_id}', 'requested': 1, 'available': 0},
+        ])
+        self.assertIn('Insufficient stock for Onion. Available: 2, Requested: 3', str(raised.exception))
+
+    def test_retries_when_stock_returns_before_the_report(self):
+        from . import stock
+
+        find_failures = stock._find_failures
+
+        def cancel_then_find(quantities):
+            # A concurrent cancellation restores the onions between the UPDATE and the re-read
+            Inventory.objects.filter(product=self.onion).update(stock_available=5)
+            return find_failures(quantities)
+
+        with mock.patch.object(stock, '_find_failures', side_effect=cancel_then_find) as find:
+            reserve_stock([(self.tomato.pk, 1), (self.onion.pk, 3)])
+        self.assertEqual(find.call_count, 1)
+        self.assertEqual(self.stock(), {'Tomato': 4, 'Onion': 2})
+
+        # Still no failing line after the retry: a generic error instead of an empty one
+        with mock.patch.object(stock, '_reserve', return_value=False):
+            with self.assertRaises(InsufficientStockError) as raised:
+                reserve_stock([(self.tomato.pk, 1)])
+        self.assertEqual(raised.exception.failures, [])
+        self.assertIn('please try again', str(raised.exception))
+
+    def test_every_reservation_invalidates_catalog(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock([(self.onion.pk, 1)])
+        self.assertEqual(get_catalog_version(), version + 1)
+
+        # Reservations inside a batch bump once
+        with self.captureOnCommitCallbacks(execute=True), batch_catalog_invalidation():
+            reserve_stock([(self.tomato.pk, 1)])
+            reserve_stock([(self.tomato.pk, 1), (self.onion.pk, 1)])
+        self.assertEqual(get_catalog_version(), version + 2)
+
+
+# ==================== CUSTOMER STATS ====================
+
+class CustomerStatsTests(TestCase):
+    """The CustomerStats rollup matches the orders table through creates, edits and deletes"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Stats Customer', email='stats@example.com', phone='03001112222')
+
+    def profile(self):
+        response = self.client.get(reverse('main:customer_profile_api'), {'customer_id': self.customer.customer_id})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        return data['total_orders'], data['total_spent'], data['cancelled_orders'], data['growth_percentage']
+
+    def order(self, amount, status='PENDING', days_ago=0):
+        order = Order.objects.create(customer=self.customer, total_amount=amount, status=status)
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(order_date=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_stats_follow_order_changes(self):
+        self.order(200, status='DELIVERED', days_ago=40)
+        self.order(100, status='CANCELLED', days_ago=45)
+        # First visit backfills the row from the orders table; nothing spent in the last 30 days
+        self.assertEqual(self.profile(), (2, 300.0, 1, -100.0))
+        self.assertTrue(CustomerStats.objects.filter(customer=self.customer).exists())
+
+        # New orders increment the row; 450 in the last 30 days vs 300 before: +50%
+        recent = self.order(150)
+        self.order(300)
+        self.assertEqual(self.profile(), (4, 750.0, 1, 50.0))
+
+        recent.status = 'CANCELLED'
+        recent.save()
+        self.assertEqual(self.profile()[:3], (4, 750.0, 2))
+
+        recent.delete()
+        self.assertEqual(self.profile(), (3, 600.0, 1, 0.0))
+
+    def test_customer_delete_does_not_refresh_stats_per_order(self):
+        for amount in range(10, 110, 10):
+            self.order(amount)
+        refresh_customer_stats([self.customer.customer_id])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.customer.delete()
+
+        self.assertFalse(CustomerStats.objects.exists())
+        self.assertFalse(Order.objects.exists())
+        stats_writes = [q['sql'] for q in queries if 'main_customerstats' in q['sql'] and not q['sql'].startswith('DELETE')]
+        self.assertEqual(stats_writes, [])
+
+
+# ==================== ORDER PAGING ====================
+
+class OrderCursorPaginationTests(TestCase):
+    """Keyset pages of order history cover every order exactly once, newest first"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Paging Customer', email='paging@example.com', phone='03001113333')
+        other = Customer.objects.create(name='Other Customer', email='other@example.com', phone='03001114444')
+        Order.objects.create(customer=other, total_amount=10)
+
+        # Orders 2-4 share one timestamp, so page boundaries fall inside a tie
+        base = timezone.now() - timedelta(days=10)
+        stamps = [base, base + timedelta(hours=1), base + timedelta(hours=1), base + timedelta(hours=1),
+                  base + timedelta(hours=2), base + timedelta(hours=3), base + timedelta(hours=4)]
+        for stamp in stamps:
+            order = Order.objects.create(customer=self.customer, total_amount=50)
+            Order.objects.filter(pk=order.pk).update(order_date=stamp)
+
+        self.expected = list(
+            Order.objects.filter(customer=self.customer)
+            .order_by('-order_date', '-order_id')
+            .values_list('order_id', flat=True)
+        )
+
+    def test_customer_orders_api_pages(self):
+        url = reverse('main:customer_orders_api')
+        seen, cursor = [], None
+        for _ in range(len(self.expected)):
+            params = {'customer_id': self.customer.customer_id, 'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get(url, params).json()
+            self.assertEqual(body['count'], len(self.expected))
+            seen += [order['order_id'] for order in body['data']]
+            cursor = body['next_cursor']
+            self.assertEqual(body['has_more'], cursor is not None)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.expected)
+
+    def test_order_viewset_follows_next_links(self):
+        url = reverse('main:order-list') + f'?customer_id={self.customer.customer_id}&limit=3'
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual(set(body), {'next', 'next_cursor', 'results'})
+            seen += [order['order_id'] for order in body['results']]
+            url, pages = body['next'], pages + 1
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 3)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_exact_page_has_no_next_cursor(self):
+        url = reverse('main:customer_orders_api')
+        body = self.client.get(url, {'customer_id': self.customer.customer_id, 'limit': len(self.expected)}).json()
+        self.assertEqual(len(body['data']), len(self.expected))
+        self.assertIsNone(body['next_cursor'])
+        self.assertFalse(body['has_more'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(
+            reverse('main:customer_orders_api'),
+            {'customer_id': self.customer.customer_id, 'limit': 2, 'cursor': 'not-a-cursor'},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse('main:order-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+# ==================== ADMIN BULK ACTIONS ====================
+
+class AdminBulkActionTests(TestCase):
+    """
+    Admin actions are set-based: the number of queries does not depend on
+    the selection size, notifications are queued in one INSERT and the
+    catalog version is bumped once per submission
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-password')
+        cls.customers = Customer.objects.bulk_create([
+            Customer(name=f'Customer {i}', email=f'bulk{i}@example.com', phone=f'0311{i:07d}')
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post_action(self, model, action, selected, query='', **extra):
+        return self.client.post(
+            reverse(f'admin:main_{model}_changelist') + query,
+            {'action': action, '_selected_action': [str(pk) for pk in selected], **extra},
+        )
+
+    def create_orders(self, count):
+        return Order.objects.bulk_create([
+            Order(customer=self.customers[i % len(self.customers)], total_amount=100)
+            for i in range(count)
+        ])
+
+    def test_mark_shipped_is_set_based(self):
+        small, large = self.create_orders(3), self.create_orders(30)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.post_action('order', 'mark_shipped', [order.pk for order in small])
+        with CaptureQueriesContext(connection) as large_queries:
+            self.post_action('order', 'mark_shipped', [order.pk for order in large])
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(Order.objects.filter(status='SHIPPED').count(), 33)
+        self.assertEqual(EmailOutbox.objects.filter(category='order_shipped').count(), 33)
+
+        # Already shipped orders are not notified again
+        self.post_action('order', 'mark_shipped', [order.pk for order in large])
+        self.assertEqual(EmailOutbox.objects.filter(category='order_shipped').count(), 33)
+
+    def test_status_actions_notify_from_filtered_changelist(self):
+        confirmed = self.create_orders(3)
+        Order.objects.filter(pk__in=[order.pk for order in confirmed]).update(status='CONFIRMED')
+        self.create_orders(2)  # Pending, not selected
+
+        # The changelist queryset is filtered on the status the action changes
+        self.post_action('order', 'mark_shipped', [order.pk for order in confirmed], query='?status__exact=CONFIRMED')
+        shipped = EmailOutbox.objects.filter(category='order_shipped')
+        self.assertEqual(
+            {(email.to_email, email.subject) for email in shipped},
+            {(order.customer.email, f'Your Order #{order.order_id} Has Been Shipped! 🚚') for order in confirmed},
+        )
+        for email in shipped:
+            self.assertIn(email.subject.split()[2], email.html_content)  # '#<order id>'
+
+        self.post_action('order', 'mark_delivered', [order.pk for order in confirmed], query='?status__exact=SHIPPED')
+        self.assertEqual(EmailOutbox.objects.filter(category='order_delivered').count(), 3)
+        self.assertEqual(Order.objects.filter(status='DELIVERED').count(), 3)
+
+    def test_bulk_delete_bumps_catalog_version_once(self):
+        products = Product.objects.bulk_create([
+            Product(name=f'Bulk {i}', category='fruits', slug=f'bulk-{i}') for i in range(10)
+        ])
+        Inventory.objects.bulk_create([Inventory(product=product, stock_available=5) for product in products])
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_action('product', 'delete_selected', [product.pk for product in products], post='yes')
+
+        self.assertFalse(Product.objects.filter(slug__startswith='bulk-').exists())
+        self.assertEqual(get_catalog_version(), version + 1)
+
+    def test_set_as_default_keeps_one_default_per_customer(self):
+        customer = self.customers[0]
+        addresses = [
+            Address.objects.create(customer=customer, label=label, address_line='1 Main Road',
+                                   city='Lahore', postal_code='54000', phone='03001234567',
+                                   is_default=label == 'HOME')
+            for label in ('HOME', 'WORK', 'OTHER')
+        ]
+
+        self.post_action('address', 'set_as_default', [addresses[1].pk])
+
+        self.assertEqual(
+            list(Address.objects.filter(customer=customer, is_default=True).values_list('pk', flat=True)),
+            [addresses[1].pk],
+        )
+
+    def test_retry_now_leaves_emails_being_sent_alone(self):
+        now = timezone.now()
+        failed, expired, leased = [
+            EmailOutbox.objects.create(to_email=f'retry{i}@example.com', subject='Hi', html_content='<p>Hi</p>',
+                                       status=status, attempts=2, next_attempt_at=when)
+            for i, (status, when) in enumerate([
+                ('FAILED', now - timedelta(hours=1)),
+                ('SENDING', now - timedelta(minutes=1)),  # Lease expired: the worker died
+                ('SENDING', now + timedelta(minutes=4)),  # A worker is sending it now
+            ])
+        ]
+        response = self.post_action('emailoutbox', 'retry_now', [failed.pk, expired.pk, leased.pk])
+        self.assertEqual(response.status_code, 302)
+
+        statuses = dict(EmailOutbox.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {failed.pk: 'PENDING', expired.pk: 'PENDING', leased.pk: 'SENDING'})
+        self.assertEqual(EmailOutbox.objects.get(pk=leased.pk).attempts, 2)
+
+
+# ==================== CATALOG CACHE ====================
+
+class CatalogCacheTests(TestCase):
+    """Cached catalog responses, ETags and the catalog version they are keyed on"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('main:catalog_products_api')
+        for i, name in enumerate(['Tamatar', 'Aloo', 'Pyaz']):
+            product = Product.objects.create(name=name, category='vegetables', price=10 + i, slug=name.lower())
+            Inventory.objects.create(product=product, stock_available=5)
+
+    def setUp(self):
+        cache.clear()
+        bump_catalog_version()
+
+    def names(self, response):
+        return sorted(product['name'] for product in response.json())
+
+    @override_settings(CATALOG_VERSION_TTL=0)
+    def test_bump_from_another_process_invalidates_cached_response(self):
+        self.assertEqual(self.names(self.client.get(self.url)), ['Aloo', 'Pyaz', 'Tamatar'])
+
+        # What another worker or a management command leaves behind: the row
+        # changed in the database, nothing cleared in this process
+        Product.objects.filter(slug='aloo').update(name='Aloo Desi')
+        CatalogVersion.objects.update(version=F('version') + 1)
+
+        self.assertEqual(self.names(self.client.get(self.url)), ['Aloo Desi', 'Pyaz', 'Tamatar'])
+
+    def test_if_none_match_gets_304_until_catalog_changes(self):
+        response = self.client.get(self.url, {'category': 'vegetables'})
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'category': 'vegetables'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # Another query string has its own ETag
+        other = self.client.get(self.url, {'category': 'fruits'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, 200)
+
+        Inventory.objects.filter(product__slug='aloo').update(stock_available=0)
+        bump_catalog_version()
+        response = self.client.get(self.url, {'category': 'vegetables'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_version_is_reused_within_ttl(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+
+class CatalogIndexTests(TestCase):
+    """The in-memory CatalogIndex answers filters and sorts exactly like the ORM"""
+
+    ORDERINGS = {
+        'featured': ('category', 'name'),
+        'price_low': ('price', 'name'),
+        'price_high': ('-price', 'name'),
+        'name_asc': ('name',),
+        'name_desc': ('-name',),
+        'date_new': ('-product_id',),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = [
+            ('Tamatar', 'vegetables', '120.00', 'SUMMER', 5),
+            ('Aloo', 'vegetables', '80.00', 'ALL_YEAR', 0),
+            ('Pyaz', 'vegetables', '80.00', 'WINTER', 12),
+            ('Aam', 'fruits', '250.50', 'SUMMER', 3),
+            ('Kinnow', 'fruits', '180.00', 'WINTER', 0),
+            ('Kela', 'fruits', '150.00', 'ALL_YEAR', 40),
+            ('Pudina', 'herbs', '30.00', 'ALL_YEAR', 9),
+            ('Dhania', 'herbs', '30.00', 'WINTER', 1),
+            ('adrak', 'herbs', '30.00', 'WINTER', 2),  # Lowercase: sorts by collation, not code point
+        ]
+        for name, category, price, season, stock in rows:
+            product = Product.objects.create(name=name, category=category, price=price, season=season)
+            if name != 'Pudina':  # A product without an Inventory row counts as out of stock
+                Inventory.objects.create(product=product, stock_available=stock)
+        Product.objects.create(name='Hidden', category='fruits', price='99.00', is_active=False)
+
+    def test_filters_and_sorts_match_orm(self):
+        index = CatalogIndex.build()
+        filters = [
+            {},
+            {'category': 'Vegetables'},
+            {'season': 'WINTER'},
+            {'in_stock': True},
+            {'price_min': 80.0, 'price_max': 180.0},
+            {'category': 'fruits', 'in_stock': True, 'price_min': 160.0},
+            {'category': 'herbs', 'season': 'SUMMER'},
+        ]
+        for kwargs in filters:
+            queryset = Product.objects.filter(is_active=True)
+            if 'category' in kwargs:
+                queryset = queryset.filter(category__iexact=kwargs['category'])
+            if 'season' in kwargs:
+                queryset = queryset.filter(season=kwargs['season'])
+            if kwargs.get('in_stock'):
+                queryset = queryset.filter(inventory__stock_available__gt=0)
+            if 'price_min' in kwargs:
+                queryset = queryset.filter(price__gte=kwargs['price_min'])
+            if 'price_max' in kwargs:
+                queryset = queryset.filter(price__lte=kwargs['price_max'])
+
+            mask = index.filter(**kwargs)
+            self.assertEqual(index.count(mask), queryset.count(), kwargs)
+            for sort, ordering in self.ORDERINGS.items():
+                with self.subTest(filters=kwargs, sort=sort):
+                    self.assertEqual(
+                        index.ids_for(mask, sort=sort),
+                        list(queryset.order_by(*ordering).values_list('product_id', flat=True)),
+                    )
+
+
+class ProductSearchTests(TestCase):
+    """Typo-tolerant catalog search and autocomplete"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, local_name in [
+            ('Tomato', 'Tamatar'), ('Potato', 'Aloo'), ('Onion', 'Pyaz'),
+            ('Green Onions', 'Hari Pyaz'), ('Lady Finger', 'Bhindi'), ('Spinach', 'Palak'),
+        ]:
+            product = Product.objects.create(name=name, local_name=local_name, category='vegetables', price=50)
+            Inventory.objects.create(product=product, stock_available=10)
+
+    def setUp(self):
+        cache.clear()
+        bump_catalog_version()
+
+    def search(self, term):
+        response = self.client.get(reverse('main:catalog_products_api'), {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()]
+
+    def suggest(self, prefix):
+        response = self.client.get(reverse('main:catalog_autocomplete_api'), {'q': prefix})
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['name'] for suggestion in response.json()['suggestions']]
+
+    def test_search_tolerates_roman_urdu_spellings(self):
+        self.assertEqual(self.search('tamater')[0], 'Tomato')
+        self.assertEqual(self.search('Tamatar')[0], 'Tomato')
+        self.assertEqual(self.search('bindi'), ['Lady Finger'])
+        self.assertEqual(self.search('aalu'), ['Potato'])
+        self.assertEqual(self.search('pyaz'), ['Onion', 'Green Onions'])
+        self.assertEqual(self.search('qwzx'), [])
+
+        # ProductViewSet ranks the same way
+        response = self.client.get(reverse('main:product-list'), {'search': 'tamater'})
+        results = response.json()
+        results = results.get('results', results) if isinstance(results, dict) else results
+        self.assertEqual(results[0]['name'], 'Tomato')
+
+    def test_autocomplete(self):
+        self.assertEqual(self.suggest('tam'), ['Tomato'])
+        # Word prefixes match too; matches at the start of the name first
+        self.assertEqual(self.suggest('oni'), ['Onion', 'Green Onions'])
+        self.assertEqual(self.suggest('pal'), ['Spinach'])
+        # No prefix match: fuzzy fallback
+        self.assertEqual(self.suggest('tamater'), ['Tomato'])
+        self.assertEqual(self.suggest(''), [])
+
+
+# ==================== API JSON ====================
+
+class ORJSONTests(TestCase):
+    """The orjson renderer/parser are byte-compatible with DRF's JSON classes"""
+
+    def test_round_trip_matches_drf(self):
+        data = {
+            'price': Decimal('249.50'),
+            'discounts': [Decimal('0.10'), Decimal('15')],
+            'created_at': datetime(2026, 10, 17, 8, 5, 3, 123456, tzinfo=dt_timezone.utc),
+            'local_time': datetime(2026, 10, 17, 13, 5, 3, tzinfo=ZoneInfo('Asia/Karachi')),
+            'delivery_date': date(2026, 10, 20),
+            'note': 'line\u2028separator',
+            7: 'int key',
+            'missing': None,
+        }
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+
+        parsed = ORJSONParser().parse(io.BytesIO(rendered))
+        self.assertEqual(parsed, {
+            'price': 249.5,
+            'discounts': [0.1, 15.0],
+            'created_at': '2026-10-17T08:05:03.123456Z',
+            'local_time': '2026-10-17T13:05:03+05:00',
+            'delivery_date': '2026-10-20',
+            'note': 'line\u2028separator',
+            '7': 'int key',
+            'missing': None,
+        })
+
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"price": '))
+
+
+# ==================== EMAIL OUTBOX ====================
+
+class FlakyFileTransport(FileTransport):
+    """FileTransport that fails for the addresses in `failing`"""
+    failing = set()
+
+    def send(self, email):
+        if email.to_email in self.failing:
+            raise ConnectionError(f'{email.to_email} unreachable')
+        super().send(email)
+
+
+class FlakyBatchTransport(FlakyFileTransport):
+    """Batch-capable FlakyFileTransport: a batch fails as a whole, like Resend's"""
+    batch_size = 50
+    batches = []
+
+    def send_batch(self, emails):
+        self.batches.append(len(emails))
+        for email in emails:
+            if email.to_email in self.failing:
+                raise ConnectionError(f'batch rejected: {email.to_email}')
+        for email in emails:
+            super().send(email)
+
+
+class EmailOutboxTests(TestCase):
+    """run_email_worker's drain loop: delivery, retries with backoff, giving up"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.sent_dir = directory.name
+        FlakyFileTransport.failing = {'down@example.com'}
+        self.addCleanup(setattr, FlakyFileTransport, 'failing', set())
+        FlakyBatchTransport.batches = []
+
+    def drain(self, transport='main.tests.FlakyFileTransport'):
+        with override_settings(
+            EMAIL_OUTBOX_TRANSPORT=transport,
+            EMAIL_OUTBOX_FILE_PATH=self.sent_dir,
+            EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+        ):
+            return drain_outbox(workers=2)
+
+    def test_drain_retries_with_backoff_then_gives_up(self):
+        enqueue_emails([(f'{name}@example.com', f'Hi {name}', '<p>Hi</p>') for name in ('ali', 'sara', 'down')],
+                       category='welcome')
+
+        start = timezone.now()
+        self.assertEqual(self.drain(), {'sent': 2, 'retried': 1, 'failed': 0})
+        self.assertEqual(len(os.listdir(self.sent_dir)), 2)
+
+        retry = EmailOutbox.objects.get(to_email='down@example.com')
+        self.assertEqual((retry.status, retry.attempts), ('PENDING', 1))
+        self.assertIn('unreachable', retry.last_error)
+        # First retry after BACKOFF_BASE_SECONDS, +-20% jitter
+        delay = (retry.next_attempt_at - start).total_seconds()
+        self.assertTrue(0.8 * BACKOFF_BASE_SECONDS <= delay <= 1.2 * BACKOFF_BASE_SECONDS + 5, delay)
+        self.assertLess(backoff_delay(1), backoff_delay(3))
+        self.assertLessEqual(backoff_delay(50), 1.2 * BACKOFF_MAX_SECONDS)
+
+        # Not due yet
+        self.assertEqual(self.drain(), {'sent': 0, 'retried': 0, 'failed': 0})
+
+        EmailOutbox.objects.filter(pk=retry.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(self.drain(), {'sent': 0, 'retried': 0, 'failed': 1})
+        retry.refresh_from_db()
+        self.assertEqual((retry.status, retry.attempts), ('FAILED', 2))
+        self.assertEqual(EmailOutbox.objects.filter(status='SENT').count(), 2)
+
+    def test_failed_batch_falls_back_to_single_sends(self):
+        enqueue_emails([(f'user{i}@example.com', 'Shipped', '<p>Shipped</p>') for i in range(4)])
+        self.assertEqual(self.drain('main.tests.FlakyBatchTransport'), {'sent': 4, 'retried': 0, 'failed': 0})
+        self.assertEqual(FlakyBatchTransport.batches, [4])
+
+        enqueue_emails([('ali@example.com', 'Hi', '<p>Hi</p>'), ('down@example.com', 'Hi', '<p>Hi</p>'),
+                        ('sara@example.com', 'Hi', '<p>Hi</p>')])
+        # The batch is rejected; each email then gets its own result
+        self.assertEqual(self.drain('main.tests.FlakyBatchTransport'), {'sent': 2, 'retried': 1, 'failed': 0})
+        self.assertEqual(FlakyBatchTransport.batches, [4, 3])
+        self.assertEqual(
+            dict(EmailOutbox.objects.filter(subject='Hi').values_list('to_email', 'status')),
+            {'ali@example.com': 'SENT', 'down@example.com': 'PENDING', 'sara@example.com': 'SENT'},
+        )
+        self.assertIn('down@example.com unreachable', EmailOutbox.objects.get(to_email='down@example.com').last_error)
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue_emails([('ali@example.com', 'Hi', '<p>Hi</p>')])
+        claimed = claim_due_emails()
+        self.assertEqual([email.status for email in claimed], ['SENDING'])
+        self.assertEqual(self.drain()['sent'], 0)  # Leased to the (crashed) first worker
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(self.drain()['sent'], 1)
+        self.assertEqual(EmailOutbox.objects.get().attempts, 2)
+
+    def test_order_confirmation_formats_items_in_template(self):
+        customer = Customer.objects.create(name='Mail Customer', email='mail@example.com', phone='03001116666')
+        product = Product.objects.create(name='Mango', category='fruits', price=Decimal('1234.50'))
+        order = Order.objects.create(customer=customer, total_amount=Decimal('2469.00'))
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal('1234.50'))
+
+        self.assertTrue(send_order_confirmation_email(order))
+        html = EmailOutbox.objects.get(category='order_confirmation').html_content
+        self.assertIn('Rs. 1,234.50/kg', html)
+        self.assertIn('Rs. 2,469.00', html)
+
+
+# ==================== DATA EXPORT ====================
+
+class DataTransferTests(TestCase):
+    """export_data/import_data round trip, including resuming a partial import"""
+
+    def test_round_trip_keeps_keys_and_timestamps(self):
+        customer = Customer.objects.create(name='Export Customer', email='export@example.com', phone='03001234567')
+        orders = [Order.objects.create(customer=customer, total_amount=10 + i) for i in range(5)]
+        order_dates = {order.pk: order.order_date for order in Order.objects.all()}
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = export_all(directory, compression='gzip', chunk_size=2)
+            self.assertEqual(
+                {entry['model']: entry['count'] for entry in manifest['models']}['main.order'], 5
+            )
+
+            Order.objects.filter(pk__in=[order.pk for order in orders[2:]]).delete()
+            # Pretend an earlier run stopped after the first two orders
+            progress = {entry['model']: entry['count'] for entry in manifest['models']}
+            progress['main.order'] = 2
+            with open(os.path.join(directory, '.import-progress.json'), 'w') as f:
+                json.dump(progress, f)
+
+            loaded = import_all(directory, chunk_size=2)
+
+        self.assertEqual(loaded['main.order'], 3)
+        self.assertEqual({order.pk: order.order_date for order in Order.objects.all()}, order_dates)
+
+    def test_counts_only_inserted_rows_and_new_export_resets_progress(self):
+        customer = Customer.objects.create(name='Export Customer', email='export@example.com', phone='03001234567')
+        orders = [Order.objects.create(customer=customer, total_amount=10 + i) for i in range(4)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            export_all(directory, chunk_size=3)
+            progress_path = os.path.join(directory, '.import-progress.json')
+            with open(progress_path, 'w') as f:
+                json.dump({'main.order': 4}, f)
+
+            # A fresh export must not be skipped because of the old progress file
+            export_all(directory, chunk_size=3)
+            self.assertFalse(os.path.exists(progress_path))
+
+            # Chunks mixing existing and missing rows count only the rows written
+            Order.objects.filter(pk__in=[orders[1].pk, orders[3].pk]).delete()
+            loaded = import_all(directory, chunk_size=3)
+            self.assertEqual(loaded['main.order'], 2)
+            self.assertEqual(loaded['main.customer'], 0)
+
+            loaded = import_all(directory, chunk_size=3, restart=True)
+            self.assertEqual(sum(loaded.values()), 0)
+
+        self.assertEqual(Order.objects.count(), 4)
+
+
+class CatalogSyncTests(TestCase):
+    """sync_catalog upserts on slug: re-running a feed never creates duplicates"""
+
+    FEED = (
+        'name,local_name,category,price,season,stock\n'
+        'Tomato,Tamatar,vegetables,120,SUMMER,40\n'
+        'Mango,Aam,fruits,300,SUMMER,\n'
+        'Tomato,Tamatar,vegetables,999,SUMMER,1\n'
+        'Rock,,minerals,5,SUMMER,1\n'
+    )
+
+    def sync(self, feed):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feed.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(feed)
+            return sync_products(read_feed(path), chunk_size=1)
+
+    def test_resync_is_idempotent_and_reports_diff(self):
+        report = self.sync(self.FEED)
+        self.assertEqual(sorted(report.created), ['mango', 'tomato'])
+        self.assertEqual(report.duplicates, [[4, 'tomato']])
+        self.assertEqual([line for line, message in report.errors], [5])
+        self.assertEqual(Inventory.objects.get(product__slug='tomato').stock_available, 40)
+        self.assertEqual(Inventory.objects.get(product__slug='mango').stock_available, DEFAULT_STOCK)
+
+        report = self.sync(self.FEED)
+        self.assertEqual((report.created, report.updated, report.unchanged), ([], {}, 2))
+        self.assertEqual(Product.objects.count(), 2)
+
+        report = self.sync(self.FEED.replace('Mango,Aam,fruits,300', 'Mango,Aam,fruits,350'))
+        self.assertEqual(report.updated, {'mango': {'price': ['300.00', '350.00']}})
+        self.assertEqual(Product.objects.get(slug='mango').price, 350)
+        self.assertEqual(Inventory.objects.count(), 2)
+
+
+class ResponsiveImageTests(TestCase):
+    """optimize_images variants and the srcset structure of the catalog API"""
+
+    def test_catalog_image_lists_variants_from_manifest(self):
+        manifest = {'images/vegetables/tomato.png': {
+            'width': 500, 'height': 400,
+            'variants': {
+                'avif': [[160, 'images/optimized/vegetables/tomato.abcd1234.160.avif']],
+                'webp': [[160, 'images/optimized/vegetables/tomato.abcd1234.160.webp'],
+                         [320, 'images/optimized/vegetables/tomato.abcd1234.320.webp']],
+            },
+        }}
+        image = responsive_image('images/vegetables/tomato.png', 'vegetables', manifest)
+        self.assertEqual(image['src'], 'images/vegetables/tomato.png')
+        self.assertEqual((image['width'], image['height']), (500, 400))
+        self.assertEqual(image['sources'], [
+            {'type': 'image/avif', 'srcset': '/static/images/optimized/vegetables/tomato.abcd1234.160.avif 160w'},
+            {'type': 'image/webp', 'srcset': (
+                '/static/images/optimized/vegetables/tomato.abcd1234.160.webp 160w, '
+                '/static/images/optimized/vegetables/tomato.abcd1234.320.webp 320w'
+            )},
+        ])
+        # No variants yet: a plain <img src>
+        self.assertEqual(responsive_image('', 'herbs', manifest)['src'], '/static/images/herbs/default.png')
+        self.assertEqual(responsive_image('images/herbs/basil.png', 'herbs', manifest)['sources'], [])
+
+    @skipUnless(importlib.util.find_spec('PIL'), 'optimize_images needs Pillow')
+    def test_build_variants_skips_unchanged_images(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as static_dir:
+            os.makedirs(os.path.join(static_dir, 'images', 'fruits'))
+            source = os.path.join(static_dir, 'images', 'fruits', 'mango.png')
+            Image.new('RGBA', (400, 200), (255, 160, 0, 255)).save(source)
+
+            summary = build_variants(static_dir, workers=1, formats=('webp',), widths=(160, 320, 640))
+            self.assertEqual(summary['processed'], ['images/fruits/mango.png'])
+            entry = image_manifest(static_dir)['images/fruits/mango.png']
+            # 640 is wider than the source and collapses into the original width
+            self.assertEqual([width for width, path in entry['variants']['webp']], [160, 320, 400])
+
+            os.utime(source, (1, 1))  # Touched but unchanged: hash check, no re-encode
+            self.assertEqual(build_variants(static_dir, workers=1, formats=('webp',), widths=(160, 320, 640))['skipped'], 1)
+
+            Image.new('RGBA', (400, 200), (0, 128, 0, 255)).save(source)
+            summary = build_variants(static_dir, workers=1, formats=('webp',), widths=(160, 320, 640))
+            self.assertEqual(summary['processed'], ['images/fruits/mango.png'])
+            # Variants of the old content are removed
+            self.assertEqual(len(os.listdir(os.path.join(static_dir, 'images', 'optimized', 'fruits'))), 3)
+
+
+class TokenAuthTests(TestCase):
+    """Signed bearer tokens from api_login replace the customer_id lookup"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(
+            name='Token Customer', email='token@example.com', phone='03001234567',
+            password=make_password('secret123'),
+        )
+        cls.other = Customer.objects.create(name='Other', email='other@example.com', phone='03007654321')
+
+    def login(self):
+        response = self.client.post(
+            reverse('main:api_login'), {'email': 'token@example.com', 'password': 'secret123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['token']
+
+    def test_token_request_skips_customer_lookup(self):
+        token = self.login()
+        url = reverse('main:customer_addresses_api')
+
+        with CaptureQueriesContext(connection) as legacy:
+            response = self.client.get(url, {'customer_id': self.customer.customer_id})
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as authenticated:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(authenticated), len(legacy) - 1)
+
+        # Someone else's customer_id with this token is refused
+        response = self.client.get(url, {'customer_id': self.other.customer_id}, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_and_revoked_tokens_are_rejected(self):
+        token = self.login()
+        url = reverse('main:customer_addresses_api')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}x').status_code, 401)
+
+        # Changing the password revokes tokens issued before
+        response = self.client.post(
+            reverse('main:change_password_api'),
+            {'customer_id': self.customer.customer_id, 'current_password': 'secret123', 'new_password': 'changed123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}').status_code, 401)
+
+
+# Cheap costs so the tests do not spend seconds hashing
+FAST_HASH_COST = {
+    'argon2_time_cost': 1, 'argon2_memory_cost': 1024, 'argon2_parallelism': 1,
+    'scrypt_work_factor': 2 ** 10, 'scrypt_block_size': 8, 'scrypt_parallelism': 1,
+    'pbkdf2_iterations': 1000,
+}
+
+
+@override_settings(PASSWORD_HASH_COST=FAST_HASH_COST)
+class PasswordRehashTests(TestCase):
+    """Hashes made under an older algorithm/cost are upgraded on the next login"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            name='Legacy Hash', email='legacy@example.com', phone='03001112222',
+            password=make_password('secret123', hasher='pbkdf2_sha256'),
+        )
+
+    def login(self):
+        response = self.client.post(
+            reverse('main:api_login'), {'email': 'legacy@example.com', 'password': 'secret123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.customer.refresh_from_db()
+        return response.json()['token']
+
+    def test_login_upgrades_algorithm_and_cost(self):
+        token = self.login()
+        self.assertTrue(self.customer.password.startswith('scrypt$1024$'))
+        # The token is issued for the new hash
+        response = self.client.get(reverse('main:customer_addresses_api'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+        # Up to date: no rehash
+        upgraded = self.customer.password
+        self.login()
+        self.assertEqual(self.customer.password, upgraded)
+
+        with override_settings(PASSWORD_HASH_COST={**FAST_HASH_COST, 'scrypt_work_factor': 2 ** 11}):
+            self.login()
+        self.assertTrue(self.customer.password.startswith('scrypt$2048$'))
+
+        # Rehashing keeps the customer logged in
+        response = self.client.get(reverse('main:customer_addresses_api'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_customer_passwords_is_one_update(self):
+        Customer.objects.create(name='No Password', email='nopass@example.com', phone='03003334444')
+        with CaptureQueriesContext(connection) as queries:
+            call_command('update_customer_passwords', stdout=io.StringIO())
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertTrue(check_password('user123', Customer.objects.get(email='nopass@example.com').password))
+        self.customer.refresh_from_db()
+        self.assertTrue(check_password('secret123', self.customer.password))
+
+
+class RateLimitTests(TestCase):
+    """Excess login attempts are rejected before any query or password hash"""
+
+    def setUp(self):
+        reset_rate_limits()
+        self.addCleanup(reset_rate_limits)
+
+    def login(self, email, **extra):
+        return self.client.post(
+            reverse('main:api_login'), {'email': email, 'password': 'wrong-password'},
+            content_type='application/json', **extra,
+        )
+
+    def test_rejects_per_email_without_queries(self):
+        _, limit, window = next(rule for rule in RATE_LIMITS['login'] if rule[0] == 'email')
+        for _ in range(limit):
+            self.assertEqual(self.login('victim@example.com').status_code, 404)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.login('Victim@Example.com ')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(0 < int(response['Retry-After']) <= window)
+
+        # Another email from the same client still goes through
+        self.assertEqual(self.login('someone@example.com').status_code, 404)
+        self.assertEqual(rate_limit_stats()['process'], {'login:email': 1})
+
+    def test_rejected_attempts_do_not_use_up_ip_slots(self):
+        _, ip_limit, _ = next(rule for rule in RATE_LIMITS['login'] if rule[0] == 'ip')
+        _, email_limit, _ = next(rule for rule in RATE_LIMITS['login'] if rule[0] == 'email')
+        for shared in (False, True):
+            reset_rate_limits()
+            cache.clear()
+            with self.subTest(shared=shared), override_settings(RATE_LIMIT_SHARED=shared):
+                for _ in range(email_limit):
+                    self.assertEqual(self.login('victim@example.com').status_code, 404)
+                for _ in range(ip_limit):
+                    self.assertEqual(self.login('victim@example.com').status_code, 429)
+                # Only the allowed attempts count against the IP
+                self.assertEqual(self.login('someone@example.com').status_code, 404)
+
+    def test_sliding_window_and_client_ip(self):
+        window = SlidingWindow(limit=2, window=10)
+        self.assertEqual(window.hit('a', now=100), 0)
+        self.assertEqual(window.hit('a', now=105), 0)
+        self.assertEqual(window.hit('a', now=108), 2)  # Oldest hit leaves the window at 110
+        self.assertEqual(window.hit('a', now=110.5), 0)
+
+        # One trusted proxy: its X-Forwarded-For entry is the client
+        request = RequestFactory().post('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4', REMOTE_ADDR='10.0.0.1')
+        with override_settings(RATE_LIMIT_TRUSTED_PROXIES=1):
+            self.assertEqual(client_ip(request), '1.2.3.4')
+        with override_settings(RATE_LIMIT_TRUSTED_PROXIES=0):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+
+class AsyncStripeViewTests(TestCase):
+    """Stripe views await the network, so slow Stripe calls overlap instead of queueing"""
+
+    async def test_slow_stripe_calls_run_concurrently(self):
+        async def slow_retrieve(payment_method_id):
+            await asyncio.sleep(0.2)
+            return SimpleNamespace(card=SimpleNamespace(last4='4242', brand='visa', exp_month=1, exp_year=2030))
+
+        url = reverse('main:get_stripe_payment_method', args=['pm_test'])
+        with mock.patch('stripe.PaymentMethod.retrieve_async', side_effect=slow_retrieve):
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[self.async_client.get(url) for _ in range(5)])
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        self.assertEqual(json.loads(responses[0].content)['card']['last4'], '4242')
+        self.assertLess(elapsed, 0.6)
+
+    def test_validation_needs_no_stripe_call(self):
+        response = self.client.post(
+            reverse('main:create_payment_intent'), {'currency': 'usd'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('main:create_payment_intent')).status_code, 405)
+
+    def test_form_encoded_body_is_accepted(self):
+        intent = SimpleNamespace(client_secret='pi_secret', id='pi_test')
+        with mock.patch('stripe.PaymentIntent.create_async', new=mock.AsyncMock(return_value=intent)) as create:
+            response = self.client.post(
+                reverse('main:create_payment_intent'), {'amount': '12.50', 'customer_id': '7'},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['paymentIntentId'], 'pi_test')
+        self.assertEqual(create.call_args.kwargs['amount'], 1250)
+        self.assertEqual(create.call_args.kwargs['metadata'], {'customer_id': '7'})
+
+
+class StubAPIServer:
+    """
+    Local HTTP/1.1 server standing in for Stripe/Resend in tests
+    `routes` maps (method, path) to (status, JSON payload). Every request and
+    every TCP connection (client port) is recorded, so keep-alive reuse is visible
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        self.connections = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive
+
+            def _respond(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                path = self.path.split('?', 1)[0]
+                server.requests.append((self.command, path, dict(self.headers), body))
+                server.connections.add(self.client_address)
+                status, payload = server.routes.get((self.command, path), (404, {'error': 'not found'}))
+                content = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class OutboundHTTPTests(TestCase):
+    """Stripe and Resend calls share pooled keep-alive connections and a circuit breaker"""
+
+    PAYMENT_INTENT = {'id': 'pi_123', 'object': 'payment_intent', 'status': 'succeeded', 'amount': 4500, 'currency': 'usd'}
+
+    def setUp(self):
+        http_client.reset_outbound_state()
+        self.addCleanup(http_client.reset_outbound_state)
+        self.server = StubAPIServer({
+            ('POST', '/emails'): (200, {'id': 'email_1'}),
+            ('POST', '/emails/batch'): (200, {'data': [{'id': 'email_2'}, {'id': 'email_3'}]}),
+            ('GET', '/v1/payment_intents/pi_123'): (200, self.PAYMENT_INTENT),
+            ('GET', '/unavailable'): (503, {'error': 'down'}),
+        })
+        self.addCleanup(self.server.stop)
+
+    def test_resend_and_stripe_reuse_connections(self):
+        emails = [EmailOutbox(email_id=i, to_email=f'c{i}@example.com', subject='Hi', html_content='<p>Hi</p>') for i in range(3)]
+        with mock.patch('resend.api_url', self.server.url), self.settings(RESEND_API_KEY='re_test'):
+            transport = ResendTransport()
+            self.assertEqual(transport.send(emails[0]), {'id': 'email_1'})
+            transport.send(emails[0])
+            transport.send_batch(emails[1:])
+        with mock.patch('stripe.api_base', self.server.url):
+            self.assertEqual(stripe.PaymentIntent.retrieve('pi_123').status, 'succeeded')
+            stripe.PaymentIntent.retrieve('pi_123')
+
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(self.server.requests[0][2]['Authorization'], 'Bearer re_test')
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_async_stripe_view_uses_pooled_client(self):
+        with mock.patch('stripe.api_base', self.server.url):
+            response = self.client.post(
+                reverse('main:confirm_stripe_payment'), {'payment_intent_id': 'pi_123'}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['amount'], 45.0)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        policies = {'default': {
+            'max_concurrency': 2, 'connect_timeout': 1, 'timeout': 2, 'failure_threshold': 2, 'reset_timeout': 60,
+        }}
+        with self.settings(OUTBOUND_HTTP=policies):
+            for _ in range(2):
+                self.assertEqual(http_client.request('GET', f'{self.server.url}/unavailable').status_code, 503)
+            with self.assertRaises(http_client.CircuitOpenError):
+                http_client.request('GET', f'{self.server.url}/v1/payment_intents/pi_123')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(http_client.outbound_stats()['127.0.0.1']['state'], 'open')
+
+
+# ==================== INDEXES ====================
+
+class HotQueryIndexTests(TestCase):
+    """
+    Every hot-path query in main/query_plans.py must be answerable from an index
+    Sequential scans are disabled so the tiny test tables do not hide a missing index
+    """
+
+    @skipUnless(connection.vendor == 'postgresql', 'Index plans are checked on PostgreSQL')
+    def test_hot_queries_use_expected_index(self):
+        disable_seq_scans()
+        for label, expected_index, make_queryset in HOT_QUERIES:
+            with self.subTest(label):
+                plan = make_queryset().explain()
+                self.assertEqual(find_seq_scans(plan), [], plan)
+                if expected_index:
+                    self.assertIn(expected_index, plan)
+
+    def test_hot_queries_come_from_the_views(self):
+        # Every factory builds (and EXPLAINs) on any backend
+        cache.clear()
+        product = Product.objects.create(name='Tomato', local_name='Tamatar', category='vegetables', price=100)
+        Inventory.objects.create(product=product, stock_available=5)
+        bump_catalog_version()
+        for label, _, make_queryset in HOT_QUERIES:
+            with self.subTest(label):
+                self.assertTrue(make_queryset().explain())
+
+        # The order history entry is the query the paginated API actually runs
+        customer = Customer.objects.create(name='Plan Customer', email='plan@example.com', phone='03001115555')
+        for _ in range(3):
+            Order.objects.create(customer=customer, total_amount=10)
+        cursor = OrderCursorPagination.encode_cursor(Order.objects.order_by('-order_id').first())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('main:order-list'), {'customer_id': customer.customer_id, 'cursor': cursor, 'limit': 2})
+        page_sql = next(q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "main_order"' in q['sql'])
+        self.assertIn('"main_order"."order_date" <', page_sql)
+        self.assertIn('ORDER BY "main_order"."order_date" DESC, "main_order"."order_id" DESC', page_sql)
+        self.assertIn('ORDER BY "main_order"."order_date" DESC, "main_order"."order_id" DESC', str(order_history_page().query))
+
+    def test_find_seq_scans_parses_plans(self):
+        self.assertEqual(
+            find_seq_scans('Seq Scan on main_product  (cost=0.00..1.01 rows=1 width=4)', 'postgresql'),
+            ['main_product'],
+        )
+        self.assertEqual(
+            find_seq_scans('Index Scan using main_order_status_idx on main_order', 'postgresql'),
+            [],
+        )
+        self.assertEqual(find_seq_scans('SCAN main_customer', 'sqlite'), ['main_customer'])
+        self.assertEqual(find_seq_scans('SCAN main_cart USING INDEX main_cart_customer_id', 'sqlite'), [])
+
+
+# ==================== QUERY BUDGETS ====================
+
+# Routes answering 201 Created; every other measured route must answer 200
+CREATED_ROUTES = {'cart-add-item', 'create_checkout_order', 'api_signup', 'add_address_api'}
+
+# Fixture sizes for the route harness (QUERY_BUDGET_SCALE=0.1 for a quick local run)
+BUDGET_SCALE = float(os.environ.get('QUERY_BUDGET_SCALE', '1'))
+BUDGET_PRODUCTS = max(int(1000 * BUDGET_SCALE), 10)
+BUDGET_ORDERS = max(int(10000 * BUDGET_SCALE), 10)
+BUDGET_CUSTOMERS = max(int(500 * BUDGET_SCALE), 2)
+BUDGET_CART_LINES = min(100, BUDGET_PRODUCTS - 1)  # The last product is never in the cart (cart-add-item)
+BUDGET_LINES_PER_ORDER = 3
+
+# Routes that are not exercised here
+UNMEASURED_ROUTES = {
+    'account_new': 'template account/index-new.html does not exist',
+    'product_detail': 'template prod-catalog/product_detail.html does not exist',
+    'create_payment_intent': 'calls the Stripe API',
+    'confirm_stripe_payment': 'calls the Stripe API',
+    'get_stripe_payment_method': 'calls the Stripe API',
+}
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Call every route in main/urls.py (and the busiest admin changelists)
+    against a realistically sized dataset and compare query count, SQL time
+    and serializer time with main/query_budgets.json
+    """
+
+    PASSWORD = 'secret123'
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password(cls.PASSWORD)
+        customers = Customer.objects.bulk_create([
+            Customer(name=f'Customer {i}', email=f'customer{i}@example.com',
+                     phone=f'0300{i:07d}', password=password)
+            for i in range(BUDGET_CUSTOMERS)
+        ])
+        cls.customer = customers[0]
+
+        categories = ['vegetables', 'fruits', 'herbs']
+        seasons = ['SUMMER', 'WINTER', 'ALL_YEAR']
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', category=categories[i % 3], season=seasons[i % 3],
+                    price=10 + i % 90, slug=f'product-{i}', image=f'images/vegetables/product-{i}.jpg')
+            for i in range(BUDGET_PRODUCTS)
+        ])
+        Inventory.objects.bulk_create([Inventory(product=product, stock_available=1000) for product in products])
+        cls.products = products
+
+        # Orders spread over all customers; the measured customer gets every 5th order
+        order_products = [
+            [products[(i * BUDGET_LINES_PER_ORDER + line) % len(products)] for line in range(BUDGET_LINES_PER_ORDER)]
+            for i in range(BUDGET_ORDERS)
+        ]
+        orders = Order.objects.bulk_create([
+            Order(
+                customer=customers[0] if i % 5 == 0 else customers[i % len(customers)],
+                status=Order.STATUS_CHOICES[i % len(Order.STATUS_CHOICES)][0],
+                total_amount=sum(product.price for product in lines),
+                payment='Cash on Delivery',
+                **line_summary([product.name for product in lines]),
+            )
+            for i, lines in enumerate(order_products)
+        ], batch_size=1000)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for order, lines in zip(orders, order_products)
+            for product in lines
+        ], batch_size=2000)
+        cls.order = orders[0]
+        refresh_customer_stats(customer.customer_id for customer in customers)
+
+        Cart.objects.bulk_create([
+            Cart(customer=cls.customer, product=product, quantity=2)
+            for product in products[:BUDGET_CART_LINES]
+        ])
+        cls.cart_item = Cart.objects.filter(customer=cls.customer).first()
+
+        cls.address = Address.objects.create(
+            customer=cls.customer, label='HOME', address_line='12 Mall Road',
+            city='Lahore', postal_code='54000', phone='03001234567', is_default=True,
+        )
+        cls.other_address = Address.objects.create(
+            customer=cls.customer, label='WORK', address_line='1 Canal Bank',
+            city='Lahore', postal_code='54000', phone='03001234567',
+        )
+        cls.reset_token = PasswordResetToken.objects.create(customer=cls.customer)
+
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-password')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = {}  # Not in setUpTestData, which hands each test a copy
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.environ.get('QUERY_BUDGET_UPDATE') and cls.results:
+            budgets = load_budgets()
+            # Routes not measured in this run (the test stopped early) keep their budget
+            save_budgets({
+                **budgets,
+                **{name: budget_from_measurement(measured, budgets.get(name)) for name, measured in cls.results.items()},
+            })
+        super().tearDownClass()
+
+    def routes(self):
+        """(budget name, url name, method, path, data) for every measured request"""
+        customer_id = self.customer.customer_id
+        product = self.products[0]
+        checkout = {
+            'customer_id': customer_id,
+            'shipping': {
+                'fullName': 'Customer 0', 'email': self.customer.email, 'phone': '03001234567',
+                'address': '12 Mall Road', 'city': 'Lahore', 'zipCode': '54000',
+            },
+            'billing': {
+                'cardName': 'Customer 0', 'cardNumber': '', 'expiryDate': '', 'cvv': '',
+                'billingAddress': '12 Mall Road', 'billingCity': 'Lahore', 'billingZip': '54000',
+            },
+            'items': [{'product_id': p.product_id, 'quantity': 1} for p in self.products[:BUDGET_CART_LINES]],
+        }
+        new_address = {
+            'customer_id': customer_id, 'label': 'OTHER', 'address_line': '5 Gulberg',
+            'city': 'Lahore', 'postal_code': '54660', 'phone': '03001234567',
+        }
+
+        return [
+            # REST API (router)
+            ('api-root', 'api-root', 'get', reverse('main:api-root'), None),
+            ('product-list', 'product-list', 'get', reverse('main:product-list'), None),
+            ('product-list:category', 'product-list', 'get', reverse('main:product-list') + '?category=fruits', None),
+            ('product-detail', 'product-detail', 'get', reverse('main:product-detail', args=[product.product_id]), None),
+            ('product-categories', 'product-categories', 'get', reverse('main:product-categories'), None),
+            ('product-count', 'product-count', 'get', reverse('main:product-count'), None),
+            ('cart-list', 'cart-list', 'get', reverse('main:cart-list') + f'?customer_id={customer_id}', None),
+            ('cart-detail', 'cart-detail', 'get', reverse('main:cart-detail', args=[self.cart_item.cart_id]), None),
+            ('cart-add-item', 'cart-add-item', 'post', reverse('main:cart-add-item'),
+             {'customer_id': customer_id, 'product_id': self.products[-1].product_id, 'quantity': 1}),
+            ('cart-clear', 'cart-clear', 'delete', reverse('main:cart-clear') + f'?customer_id={customer_id}', None),
+            ('cart-summary', 'cart-summary', 'get', reverse('main:cart-summary') + f'?customer_id={customer_id}', None),
+            ('order-list', 'order-list', 'get', reverse('main:order-list'), None),
+            ('order-list:customer', 'order-list', 'get',
+             reverse('main:order-list') + f'?customer_id={customer_id}&limit=20', None),
+            ('order-detail', 'order-detail', 'get', reverse('main:order-detail', args=[self.order.order_id]), None),
+            ('customer-list', 'customer-list', 'get', reverse('main:customer-list'), None),
+            ('customer-detail', 'customer-detail', 'get', reverse('main:customer-detail', args=[customer_id]), None),
+            ('customer-orders', 'customer-orders', 'get', reverse('main:customer-orders', args=[customer_id]), None),
+            ('inventory-list', 'inventory-list', 'get', reverse('main:inventory-list'), None),
+            ('inventory-detail', 'inventory-detail', 'get',
+             reverse('main:inventory-detail', args=[product.inventory.inventory_id]), None),
+
+            # Catalog
+            ('catalog_products_api', 'catalog_products_api', 'get', reverse('main:catalog_products_api'), None),
+            ('catalog_products_api:search', 'catalog_products_api', 'get',
+             reverse('main:catalog_products_api') + '?search=product 1&category=vegetables', None),
+            ('catalog_autocomplete_api', 'catalog_autocomplete_api', 'get',
+             reverse('main:catalog_autocomplete_api') + '?q=prod', None),
+
+            # Checkout
+            ('checkout_cart_api', 'checkout_cart_api', 'get',
+             reverse('main:checkout_cart_api') + f'?customer_id={customer_id}', None),
+            ('create_checkout_order', 'create_checkout_order', 'post', reverse('main:create_checkout_order'), checkout),
+            ('get_order_confirmation', 'get_order_confirmation', 'get',
+             reverse('main:get_order_confirmation', args=[self.order.order_id]), None),
+
+            # Auth
+            ('api_login', 'api_login', 'post', reverse('main:api_login'),
+             {'email': self.customer.email, 'password': self.PASSWORD}),
+            ('api_signup', 'api_signup', 'post', reverse('main:api_signup'),
+             {'name': 'New Customer', 'email': 'new@example.com', 'phone': '03119999999', 'password': 'secret123'}),
+            ('api_request_password_reset', 'api_request_password_reset', 'post',
+             reverse('main:api_request_password_reset'), {'email': self.customer.email}),
+            ('api_validate_reset_token', 'api_validate_reset_token', 'get',
+             reverse('main:api_validate_reset_token') + f'?token={self.reset_token.token}', None),
+            ('api_reset_password', 'api_reset_password', 'post', reverse('main:api_reset_password'),
+             {'token': str(self.reset_token.token), 'new_password': 'newsecret123', 'confirm_password': 'newsecret123'}),
+
+            # Customer account
+            ('customer_profile_api', 'customer_profile_api', 'get',
+             reverse('main:customer_profile_api') + f'?customer_id={customer_id}', None),
+            ('update_customer_profile_api', 'update_customer_profile_api', 'patch',
+             reverse('main:update_customer_profile_api'),
+             {'customer_id': customer_id, 'name': 'Renamed Customer', 'email': self.customer.email,
+              'phone': self.customer.phone}),
+            ('change_password_api', 'change_password_api', 'post', reverse('main:change_password_api'),
+             {'customer_id': customer_id, 'current_password': self.PASSWORD, 'new_password': 'newsecret123'}),
+            ('delete_customer_account_api', 'delete_customer_account_api', 'delete',
+             reverse('main:delete_customer_account_api'), {'customer_id': customer_id}),
+            ('customer_orders_summary_api', 'customer_orders_summary_api', 'get',
+             reverse('main:customer_orders_summary_api') + f'?customer_id={customer_id}', None),
+            ('customer_orders_api', 'customer_orders_api', 'get',
+             reverse('main:customer_orders_api') + f'?customer_id={customer_id}', None),
+            ('customer_orders_api:page', 'customer_orders_api', 'get',
+             reverse('main:customer_orders_api') + f'?customer_id={customer_id}&limit=20', None),
+
+            # Addresses
+            ('customer_addresses_api', 'customer_addresses_api', 'get',
+             reverse('main:customer_addresses_api') + f'?customer_id={customer_id}', None),
+            ('add_address_api', 'add_address_api', 'post', reverse('main:add_address_api'), new_address),
+            ('update_address_api', 'update_address_api', 'put',
+             reverse('main:update_address_api', args=[self.address.address_id]),
+             {'customer_id': customer_id, 'city': 'Karachi'}),
+            ('delete_address_api', 'delete_address_api', 'delete',
+             reverse('main:delete_address_api', args=[self.other_address.address_id]) + f'?customer_id={customer_id}',
+             None),
+            ('set_default_address_api', 'set_default_address_api', 'post',
+             reverse('main:set_default_address_api', args=[self.other_address.address_id]),
+             {'customer_id': customer_id}),
+
+            # Contact
+            ('api_contact_form', 'api_contact_form', 'post', reverse('main:api_contact_form'),
+             {'name': 'Visitor', 'email': 'visitor@example.com', 'message': 'Do you deliver to Multan?'}),
+            ('api_callback_request', 'api_callback_request', 'post', reverse('main:api_callback_request'),
+             {'name': 'Visitor', 'phone': '03001234567', 'time': 'morning', 'message': 'Call me'}),
+
+            # Operations
+            ('rate_limit_stats_api', 'rate_limit_stats_api', 'get', reverse('main:rate_limit_stats_api'), None),
+
+            # HTML pages
+            *[(name, name, 'get', reverse(f'main:{name}'), None) for name in (
+                'home', 'landing', 'catalog', 'account_home', 'account_addresses',
+                'account_orders', 'account_settings', 'login', 'signup', 'logout', 'forgot_password',
+                'reset_password', 'checkout', 'checkout_payment', 'checkout_confirmation', 'test_order',
+            )],
+
+            # Admin changelists (not in main/urls.py, but the slowest pages in ops)
+            *[(f'admin:{model}', None, 'get', reverse(f'admin:main_{model}_changelist'), None) for model in (
+                'customer', 'order', 'orderitem', 'cart', 'product', 'inventory', 'address', 'emailoutbox',
+            )],
+        ]
+
+    def measure(self, method, path, data):
+        """Run one request with cold caches and roll back whatever it wrote"""
+        cache.clear()
+        bump_catalog_version()
+        self.client.force_login(self.admin)
+
+        kwargs = {} if data is None else {'data': json.dumps(data), 'content_type': 'application/json'}
+        with transaction.atomic():
+            with EndpointRecorder() as recorder:
+                response = getattr(self.client, method)(path, **kwargs)
+            transaction.set_rollback(True)
+        return response, recorder.as_dict()
+
+    def test_every_route_is_measured(self):
+        measured = {url_name for _, url_name, *_ in self.routes()}
+        missing = set(_url_names(main_urls.urlpatterns)) - measured - set(UNMEASURED_ROUTES)
+        self.assertEqual(missing, set(), 'Add these routes to QueryBudgetTests.routes()')
+
+    def test_routes_within_budget(self):
+        budgets = load_budgets()
+        violations = []
+        slow = []
+
+        for name, _, method, path, data in self.routes():
+            response, measured = self.measure(method, path, data)
+            # A budget only means something for the request's normal, successful path
+            expected_status = 201 if name in CREATED_ROUTES else 200
+            self.assertEqual(response.status_code, expected_status, f'{name}: {response.content[:300]!r}')
+            self.results[name] = measured
+            violations.extend(budget_violations(name, measured, budgets))
+            if 'sql_ms' not in enforced_metrics():
+                slow.extend(budget_violations(name, measured, budgets, metrics=TIME_METRICS))
+
+        if slow:
+            print('\n'.join(['⚠️ Over time budget (report only, QUERY_BUDGET_TIMING=1 to enforce):', *slow]))
+        if violations and not os.environ.get('QUERY_BUDGET_UPDATE'):
+            self.fail('\n'.join(['Query budget exceeded:', *violations, '', format_report(self.results)]))
+
+    def test_time_budgets_are_opt_in(self):
+        budgets = {'route': {'queries': 3, 'sql_ms': 50, 'serializer_ms': 50}}
+        measured = {'queries': 3, 'sql_ms': 80.0, 'serializer_ms': 10.0}
+        with mock.patch.dict(os.environ, {'QUERY_BUDGET_TIMING': ''}):
+            self.assertEqual(budget_violations('route', measured, budgets), [])
+            self.assertEqual(budget_violations('route', {**measured, 'queries': 4}, budgets),
+                             ['route: queries 4 > budget 3'])
+        with mock.patch.dict(os.environ, {'QUERY_BUDGET_TIMING': '1'}):
+            self.assertEqual(budget_violations('route', measured, budgets), ['route: sql_ms 80.0 > budget 50'])
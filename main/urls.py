@@ -22,6 +22,7 @@ urlpatterns = [
     # Product catalog API endpoint
     # Returns products in the exact format expected by script.js on catalog page
     path('api/catalog/products/', views.catalog_products_api, name='catalog_products_api'),
+    path('api/catalog/autocomplete/', views.catalog_autocomplete_api, name='catalog_autocomplete_api'),
     
     # Checkout API endpoints
     # These endpoints handle the complete checkout flow from cart to order confirmation
@@ -65,6 +66,9 @@ urlpatterns = [
     path('api/contact/', views.api_contact_form, name='api_contact_form'),
     path('api/callback/', views.api_callback_request, name='api_callback_request'),
     
+    # Rate limiter counters (staff only)
+    path('api/admin/rate-limits/', views.rate_limit_stats_api, name='rate_limit_stats_api'),
+    
     
     # ==================== HTML PAGE ROUTES ====================
     
@@ -1,28 +1,12 @@
-from django.template.loader import render_to_string
 from django.conf import settings
-import resend
+from .email_outbox import enqueue_email, enqueue_emails
+from .email_rendering import render_email, render_email_batch
 
 
-def send_email_via_resend(to_email, subject, html_content):
-    """
-    Send email using Resend API directly
-    """
-    try:
-        resend.api_key = settings.RESEND_API_KEY
-        
-        params = {
-            "from": settings.DEFAULT_FROM_EMAIL,
-            "to": [to_email],
-            "subject": subject,
-            "html": html_content,
-        }
-        
-        result = resend.Emails.send(params)
-        print(f"📧 Email sent via Resend API: {result}")
-        return True
-    except Exception as e:
-        print(f"❌ Resend API error: {str(e)}")
-        return False
+# All emails below are queued in the EmailOutbox table and delivered by the
+# run_email_worker management command, so no request waits on the email API.
+# The send_* helpers return True once the email is queued.
+# Templates are rendered through the cached renderer in main/email_rendering.py.
 
 
 def send_welcome_email(customer):
@@ -33,7 +17,7 @@ def send_welcome_email(customer):
         customer: Customer model instance
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         subject = 'Welcome to Farm2Home! 🌾'
@@ -44,14 +28,12 @@ def send_welcome_email(customer):
         }
         
         # Render HTML email template
-        html_message = render_to_string('emails/welcome.html', context)
-        
-        # Send via Resend API
-        result = send_email_via_resend(customer.email, subject, html_message)
+        html_message = render_email('emails/welcome.html', context)
         
-        if result:
-            print(f"✅ Welcome email sent successfully to {customer.email}")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(customer.email, subject, html_message, category='welcome')
+        print(f"✅ Welcome email queued to {customer.email}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send welcome email to {customer.email}: {str(e)}")
@@ -66,21 +48,11 @@ def send_order_confirmation_email(order):
         order: Order model instance with related customer and order_items
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         subject = f'Order Confirmation #{order.order_id} - Farm2Home'
         
-        # Calculate item subtotals
-        items_with_subtotal = []
-        for item in order.order_items.all():
-            items_with_subtotal.append({
-                'product': item.product,
-                'quantity': item.quantity,
-                'price': f"{item.price:,.2f}",
-                'subtotal': f"{(item.quantity * item.price):,.2f}"
-            })
-        
         # Get shipping info from order's temporary attribute if available
         # Otherwise use customer's default information
         if hasattr(order, 'shipping_info'):
@@ -103,9 +75,10 @@ def send_order_confirmation_email(order):
             'customer_name': order.customer.name,
             'order_id': order.order_id,
             'order_date': order.order_date.strftime('%B %d, %Y at %I:%M %p'),
-            'total_amount': f"{order.total_amount:,.2f}",
+            'total_amount': order.total_amount,
             'payment_method': order.payment if order.payment else 'Cash on Delivery',
-            'items': items_with_subtotal,
+            # Prices and subtotals are formatted by the cached template (floatformat)
+            'items': order.order_items.all(),
             # Shipping/Delivery information
                     'shipping_name': shipping_name,
             'shipping_phone': shipping_phone,
@@ -115,17 +88,12 @@ def send_order_confirmation_email(order):
         }
         
         # Render HTML email template
-        html_message = render_to_string('emails/order_confirmation.html', context)
-        
-        # Send email via Resend API
-        print(f"📧 Order confirmation for: {order.customer.email}")
+        html_message = render_email('emails/order_confirmation.html', context)
         
-        # Send via Resend API
-        result = send_email_via_resend(order.customer.email, subject, html_message)
-        
-        if result:
-            print(f"✅ Order confirmation email sent successfully to {order.customer.email} for Order #{order.order_id}")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(order.customer.email, subject, html_message, category='order_confirmation')
+        print(f"✅ Order confirmation email queued to {order.customer.email} for Order #{order.order_id}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send order confirmation email for Order #{order.order_id}: {str(e)}")
@@ -143,7 +111,7 @@ def send_password_reset_email(customer, reset_link):
         reset_link: String URL for password reset
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         subject = 'Password Reset Request - Farm2Home'
@@ -155,20 +123,27 @@ def send_password_reset_email(customer, reset_link):
         }
         
         # Render HTML email template
-        html_message = render_to_string('emails/password_reset.html', context)
+        html_message = render_email('emails/password_reset.html', context)
         
-        # Send via Resend API
-        result = send_email_via_resend(customer.email, subject, html_message)
-        
-        if result:
-            print(f"✅ Password reset email sent successfully to {customer.email}")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(customer.email, subject, html_message, category='password_reset')
+        print(f"✅ Password reset email queued to {customer.email}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send password reset email to {customer.email}: {str(e)}")
         return False
 
 
+def _order_status_context(order, tracking_number=None):
+    """Template context shared by the order shipped/delivered emails"""
+    return {
+        'customer_name': order.customer.name,
+        'order_id': order.order_id,
+        'tracking_number': tracking_number,
+    }
+
+
 def send_order_shipped_email(order, tracking_number=None):
     """
     Send notification when order is shipped (for future use)
@@ -178,32 +153,20 @@ def send_order_shipped_email(order, tracking_number=None):
         tracking_number: Optional tracking number string
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         subject = f'Your Order #{order.order_id} Has Been Shipped! 🚚'
         
-        # Simple HTML message for now
-        html_message = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif;">
-            <h2>Hi {order.customer.name},</h2>
-            <p>Great news! Your order #{order.order_id} has been shipped and is on its way to you!</p>
-            {f'<p><strong>Tracking Number:</strong> {tracking_number}</p>' if tracking_number else ''}
-            <p>You should receive your fresh produce within 24-48 hours.</p>
-            <p>Thank you for choosing Farm2Home!</p>
-            <br>
-            <p style="color: #666;">Farm2Home - Fresh Organic Produce</p>
-        </body>
-        </html>
-        """
+        # Body template wrapped in the shared email layout
+        html_message = render_email(
+            'emails/order_shipped.html', _order_status_context(order, tracking_number), layout=True
+        )
         
-        # Send via Resend API
-        result = send_email_via_resend(order.customer.email, subject, html_message)
-        
-        if result:
-            print(f"✅ Shipping notification email sent successfully to {order.customer.email}")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(order.customer.email, subject, html_message, category='order_shipped')
+        print(f"✅ Shipping notification email queued to {order.customer.email}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send shipping notification email: {str(e)}")
@@ -218,38 +181,66 @@ def send_order_delivered_email(order):
         order: Order model instance
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         subject = f'Your Order #{order.order_id} Has Been Delivered! ✅'
         
-        # Simple HTML message for now
-        html_message = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif;">
-            <h2>Hi {order.customer.name},</h2>
-            <p>Your order #{order.order_id} has been successfully delivered!</p>
-            <p>We hope you enjoy your fresh, organic produce from Farm2Home.</p>
-            <p>If you have any questions or concerns about your order, please don't hesitate to contact us.</p>
-            <p><strong>We'd love to hear your feedback!</strong> Please consider leaving a review.</p>
-            <br>
-            <p style="color: #666;">Thank you for choosing Farm2Home!</p>
-        </body>
-        </html>
-        """
-        
-        # Send via Resend API
-        result = send_email_via_resend(order.customer.email, subject, html_message)
+        # Body template wrapped in the shared email layout
+        html_message = render_email('emails/order_delivered.html', _order_status_context(order), layout=True)
         
-        if result:
-            print(f"✅ Delivery confirmation email sent successfully to {order.customer.email}")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(order.customer.email, subject, html_message, category='order_delivered')
+        print(f"✅ Delivery confirmation email queued to {order.customer.email}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send delivery confirmation email: {str(e)}")
         return False
 
 
+def send_order_status_emails(orders, status, tracking_numbers=None):
+    """
+    Queue shipped/delivered notifications for many orders at once
+    Used by the admin bulk actions: all messages are rendered in one batch and
+    queued with a single INSERT; the worker then sends them through the
+    transport's batch API
+    
+    Args:
+        orders: Order instances (use select_related('customer'))
+        status: 'SHIPPED' or 'DELIVERED'
+        tracking_numbers: Optional dict of order_id -> tracking number
+    
+    Returns:
+        int: Number of emails queued
+    """
+    templates = {
+        'SHIPPED': ('emails/order_shipped.html', 'Your Order #{} Has Been Shipped! 🚚', 'order_shipped'),
+        'DELIVERED': ('emails/order_delivered.html', 'Your Order #{} Has Been Delivered! ✅', 'order_delivered'),
+    }
+    template_name, subject, category = templates[status]
+    orders = list(orders)
+    if not orders:
+        return 0
+    
+    tracking_numbers = tracking_numbers or {}
+    html_messages = render_email_batch(
+        template_name,
+        [_order_status_context(order, tracking_numbers.get(order.order_id)) for order in orders],
+        layout=True
+    )
+    
+    queued = enqueue_emails(
+        [
+            (order.customer.email, subject.format(order.order_id), html_message)
+            for order, html_message in zip(orders, html_messages)
+        ],
+        category=category
+    )
+    print(f"✅ {len(queued)} {category.replace('_', ' ')} email(s) queued")
+    return len(queued)
+
+
 def send_contact_form_email(sender_name, sender_email, message):
     """
     Send contact form submission to admin email
@@ -260,7 +251,7 @@ def send_contact_form_email(sender_name, sender_email, message):
         message: Message content from the form
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         from datetime import datetime
@@ -276,15 +267,13 @@ def send_contact_form_email(sender_name, sender_email, message):
         }
         
         # Render HTML email template
-        html_message = render_to_string('emails/contact_form.html', context)
+        html_message = render_email('emails/contact_form.html', context)
         
-        # Send via Resend API to admin email
         admin_email = getattr(settings, 'ADMIN_EMAIL', 'muskan4606406@cloud.neduet.edu.pk')
-        result = send_email_via_resend(admin_email, subject, html_message)
-        
-        if result:
-            print(f"✅ Contact form email sent successfully from {sender_email}")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(admin_email, subject, html_message, category='contact_form')
+        print(f"✅ Contact form email queued from {sender_email}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send contact form email: {str(e)}")
@@ -302,7 +291,7 @@ def send_callback_request_email(client_name, phone_number, preferred_time, messa
         message: Optional additional message
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     try:
         from datetime import datetime
@@ -319,15 +308,13 @@ def send_callback_request_email(client_name, phone_number, preferred_time, messa
         }
         
         # Render HTML email template
-        html_message = render_to_string('emails/callback_request.html', context)
+        html_message = render_email('emails/callback_request.html', context)
         
-        # Send via Resend API to admin email
         admin_email = getattr(settings, 'ADMIN_EMAIL', 'muskan4606406@cloud.neduet.edu.pk')
-        result = send_email_via_resend(admin_email, subject, html_message)
-        
-        if result:
-            print(f"✅ Callback request email sent successfully for {client_name} ({phone_number})")
-        return result
+        # Queue for the background email worker (run_email_worker)
+        enqueue_email(admin_email, subject, html_message, category='callback_request')
+        print(f"✅ Callback request email queued for {client_name} ({phone_number})")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send callback request email: {str(e)}")
@@ -2,8 +2,10 @@ from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
-from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from django.db.models import prefetch_related_objects
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
 from .models import Product, Inventory, Customer, Order, OrderItem, Cart, Address, PasswordResetToken
 from .serializers import (
     ProductSerializer, ProductListSerializer, 
@@ -15,10 +17,21 @@ from .serializers import (
     AddressSerializer
 )
 from .utils import send_welcome_email, send_order_confirmation_email, send_password_reset_email, send_contact_form_email, send_callback_request_email
+from .cache import get_cached_catalog_response, set_cached_catalog_response, catalog_conditional
+from .catalog_index import get_catalog_index
+from .search import search_queryset
+from .stock import InsufficientStockError
+from .customer_stats import profile_queryset, get_customer_stats
+from .pagination import OrderCursorPagination
+from .authentication import (
+    get_request_customer, get_request_customer_id, issue_token, revoke_tokens, TOKEN_KEYWORD, TOKEN_MAX_AGE,
+)
+from .rate_limit import rate_limit, rate_limit_stats
 
 # ==================== API VIEWS ====================
 
 @api_view(['GET'])
+@catalog_conditional
 def catalog_products_api(request):
     """
     API endpoint specifically for product catalog page
@@ -28,24 +41,35 @@ def catalog_products_api(request):
     - category: Filter by category (vegetables, fruits, herbs)
     - season: Filter by season (summer, winter, year-round)
     - in_stock: Filter only in-stock items (true/false)
-    - search: Search by name or local name
+    - search: Search by name or local name (typo-tolerant, ranked by relevance)
     - price_min: Minimum price filter
     - price_max: Maximum price filter
-    - sort: Sort order (price_low, price_high, name_asc, name_desc, featured)
+    - sort: Sort order (price_low, price_high, name_asc, name_desc, date_new,
+      relevance, featured). Defaults to relevance when searching, else featured.
     
     Returns: JSON array of products matching frontend structure
+    
+    Responses are cached per normalized query string and invalidated
+    whenever the catalog version changes (see main/cache.py).
+    Sends ETag/Last-Modified headers; If-None-Match requests get a 304.
     """
-    # Start with active products and optimize query with select_related
-    products = Product.objects.filter(is_active=True).select_related('inventory')
+    # ===== CACHE LOOKUP =====
+    cache_key, cached_data = get_cached_catalog_response(request.GET)
+    if cached_data is not None:
+        return Response(cached_data, status=status.HTTP_200_OK)
+    
+    # Filtering and sorting are answered by the in-memory catalog index
+    index = get_catalog_index()
     
     # ===== CATEGORY FILTER =====
     category = request.GET.get('category')
-    if category and category != 'all':
-        products = products.filter(category__iexact=category)
+    if category == 'all':
+        category = None
     
     # ===== SEASON FILTER =====
     # Convert frontend format (summer, winter, year-round) to DB format (SUMMER, WINTER, ALL_YEAR)
     season = request.GET.get('season')
+    db_season = None
     if season:
         season_mapping = {
             'summer': 'SUMMER',
@@ -53,62 +77,94 @@ def catalog_products_api(request):
             'year-round': 'ALL_YEAR'
         }
         db_season = season_mapping.get(season.lower())
-        if db_season:
-            products = products.filter(season=db_season)
     
     # ===== IN STOCK FILTER =====
     in_stock = request.GET.get('in_stock')
-    if in_stock and in_stock.lower() == 'true':
-        products = products.filter(inventory__stock_available__gt=0)
+    in_stock = bool(in_stock and in_stock.lower() == 'true')
     
     # ===== SEARCH FILTER =====
     # Search in both English name and local name (variety)
     search = request.GET.get('search')
-    if search:
-        search_term = search.strip()
-        if search_term:
-            products = products.filter(
-                Q(name__icontains=search_term) | Q(local_name__icontains=search_term)
-            )
+    search_term = search.strip() if search else None
     
     # ===== PRICE RANGE FILTERS =====
     price_min = request.GET.get('price_min')
-    if price_min:
-        try:
-            products = products.filter(price__gte=float(price_min))
-        except (ValueError, TypeError):
-            pass  # Ignore invalid price values
+    try:
+        price_min = float(price_min) if price_min else None
+    except (ValueError, TypeError):
+        price_min = None  # Ignore invalid price values
     
     price_max = request.GET.get('price_max')
-    if price_max:
-        try:
-            products = products.filter(price__lte=float(price_max))
-        except (ValueError, TypeError):
-            pass
+    try:
+        price_max = float(price_max) if price_max else None
+    except (ValueError, TypeError):
+        price_max = None
+    
+    mask = index.filter(
+        category=category,
+        season=db_season,
+        in_stock=in_stock,
+        search=search_term,
+        price_min=price_min,
+        price_max=price_max,
+    )
     
     # ===== SORTING =====
-    sort_by = request.GET.get('sort', 'featured')
-    
-    if sort_by == 'price_low':
-        products = products.order_by('price', 'name')
-    elif sort_by == 'price_high':
-        products = products.order_by('-price', 'name')
-    elif sort_by == 'name_asc':
-        products = products.order_by('name')
-    elif sort_by == 'name_desc':
-        products = products.order_by('-name')
-    elif sort_by == 'date_new':
-        # Sort by newest first (using product_id as proxy for creation order)
-        products = products.order_by('-product_id')
-    else:  # featured or default
-        # Default sorting: by category and name
-        products = products.order_by('category', 'name')
+    # price_low, price_high, name_asc, name_desc, date_new (newest first),
+    # relevance (search rank), anything else falls back to featured (category, then name)
+    sort_by = request.GET.get('sort') or ('relevance' if search_term else 'featured')
+    products = index.products_for(mask, sort=sort_by, search=search_term)
     
     # ===== SERIALIZE AND RETURN =====
     serializer = ProductCatalogSerializer(products, many=True)
+    data = list(serializer.data)
+    set_cached_catalog_response(cache_key, data)
     
     # Return the data with proper JSON response
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@catalog_conditional
+def catalog_autocomplete_api(request):
+    """
+    API endpoint for search-as-you-type suggestions on the catalog page
+    Answered entirely from the in-memory search index (no database query)
+    
+    Query Parameters:
+    - q: Text typed so far (English or local name, typos tolerated)
+    - limit: Maximum number of suggestions (default 8, max 20)
+    
+    Returns:
+    {
+        "query": "tama",
+        "suggestions": [
+            {"id": 1, "name": "Tomato", "variety": "Tamatar", "slug": "tomato", "category": "vegetables"}
+        ]
+    }
+    """
+    query = request.GET.get('q', '').strip()
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except (ValueError, TypeError):
+        limit = 8
+    
+    suggestions = []
+    if query:
+        for product in get_catalog_index().suggest(query, limit=limit):
+            suggestions.append({
+                'id': product.product_id,
+                'name': product.name,
+                'variety': product.local_name,
+                'slug': product.slug,
+                'category': product.category,
+            })
+    
+    return Response({
+        'query': query,
+        'suggestions': suggestions
+    }, status=status.HTTP_200_OK)
 
 
 class ProductViewSet(viewsets.ModelViewSet):
@@ -130,30 +186,37 @@ class ProductViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset().filter(is_active=True)
         
-        # Filter by category
         category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__iexact=category)
-        
-        # Filter by season
         season = self.request.query_params.get('season', None)
-        if season:
-            queryset = queryset.filter(season=season)
-        
-        # Search by name
         search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(local_name__icontains=search)
+        in_stock = self.request.query_params.get('in_stock', None)
+        
+        # Filters are answered by the in-memory catalog index; the database
+        # only receives a primary key lookup for the matching products
+        if category or season or in_stock == 'true':
+            index = get_catalog_index()
+            mask = index.filter(
+                category=category,
+                season=season,
+                in_stock=in_stock == 'true',
             )
+            queryset = queryset.filter(product_id__in=index.ids_for(mask))
         
-        # Filter by stock availability
-        in_stock = self.request.query_params.get('in_stock', None)
-        if in_stock == 'true':
-            queryset = queryset.filter(inventory__stock_available__gt=0)
+        # Search results are ordered by relevance
+        if search and search.strip():
+            return search_queryset(queryset, search)
         
         return queryset.order_by('category', 'name')
     
+    @method_decorator(catalog_conditional)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @method_decorator(catalog_conditional)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @method_decorator(catalog_conditional)
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """Get all unique categories"""
@@ -162,8 +225,14 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def count(self, request):
-        """Get total product count"""
-        count = self.get_queryset().count()
+        """Get total product count (answered from the catalog index)"""
+        index = get_catalog_index()
+        count = index.count(index.filter(
+            category=request.query_params.get('category'),
+            season=request.query_params.get('season'),
+            in_stock=request.query_params.get('in_stock') == 'true',
+            search=request.query_params.get('search'),
+        ))
         return Response({'count': count})
 
 
@@ -171,6 +240,7 @@ class CartViewSet(viewsets.ModelViewSet):
     """
     API endpoint for shopping cart
     GET /api/cart/?customer_id=1 - Get cart items
+    (with a bearer token, customer_id may be omitted: the token's customer is used)
     POST /api/cart/ - Add item to cart
     PUT /api/cart/{id}/ - Update cart item
     DELETE /api/cart/{id}/ - Remove cart item
@@ -179,7 +249,7 @@ class CartViewSet(viewsets.ModelViewSet):
     lookup_field = 'cart_id'
     
     def get_queryset(self):
-        customer_id = self.request.query_params.get('customer_id')
+        customer_id = get_request_customer_id(self.request, self.request.query_params.get('customer_id'))
         if customer_id:
             return Cart.objects.filter(customer_id=customer_id).select_related('product', 'product__inventory')
         return Cart.objects.all().select_related('product', 'product__inventory')
@@ -187,7 +257,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Add item to cart or update quantity"""
-        customer_id = request.data.get('customer_id')
+        customer_id = get_request_customer_id(request, request.data.get('customer_id'))
         product_id = request.data.get('product_id')
         quantity = request.data.get('quantity', 1)
         
@@ -210,7 +280,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """Clear entire cart for customer"""
-        customer_id = request.query_params.get('customer_id')
+        customer_id = get_request_customer_id(request, request.query_params.get('customer_id'))
         if customer_id:
             deleted_count = Cart.objects.filter(customer_id=customer_id).delete()[0]
             return Response({'message': f'Cart cleared. {deleted_count} items removed.'})
@@ -219,16 +289,18 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get cart summary with total"""
-        customer_id = request.query_params.get('customer_id')
+        customer_id = get_request_customer_id(request, request.query_params.get('customer_id'))
         if not customer_id:
             return Response({'error': 'Customer ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        cart_items = Cart.objects.filter(customer_id=customer_id).select_related('product')
+        cart_items = list(
+            Cart.objects.filter(customer_id=customer_id).select_related('product', 'product__inventory')
+        )
         total = sum(item.quantity * item.product.price for item in cart_items)
         
         return Response({
             'items': CartSerializer(cart_items, many=True).data,
-            'total_items': cart_items.count(),
+            'total_items': len(cart_items),
             'estimated_total': total
         })
 
@@ -238,22 +310,36 @@ class OrderViewSet(viewsets.ModelViewSet):
     API endpoint for orders
     GET /api/orders/ - List all orders
     GET /api/orders/?customer_id=1 - Get customer orders
+    GET /api/orders/?cursor=...&limit=20 - Next page (keyset pagination, newest first)
+        List responses are {next, next_cursor, results}: no count or previous,
+        see main/pagination.py
     POST /api/orders/ - Create new order
     GET /api/orders/{id}/ - Get order details
     """
-    queryset = Order.objects.all().prefetch_related('order_items__product')
+    queryset = Order.objects.all().select_related('customer').prefetch_related('order_items__product')
+    pagination_class = OrderCursorPagination  # ?cursor=...&limit=... (newest first)
     
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
         return OrderSerializer
     
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except InsufficientStockError as e:
+            return Response({
+                'error': 'Insufficient stock',
+                'detail': str(e),
+                'failed_items': e.failures
+            }, status=status.HTTP_409_CONFLICT)
+    
     def get_queryset(self):
         queryset = super().get_queryset()
         customer_id = self.request.query_params.get('customer_id')
         if customer_id:
             queryset = queryset.filter(customer_id=customer_id)
-        return queryset.order_by('-order_date')
+        return queryset.order_by('-order_date', '-order_id')
 
 
 class CustomerViewSet(viewsets.ModelViewSet):
@@ -272,7 +358,9 @@ class CustomerViewSet(viewsets.ModelViewSet):
     def orders(self, request, pk=None):
         """Get all orders for a customer"""
         customer = self.get_object()
-        orders = customer.orders.all().order_by('-order_date')
+        orders = customer.orders.all().select_related('customer').prefetch_related(
+            'order_items__product'
+        ).order_by('-order_date')
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
 
@@ -296,7 +384,7 @@ def checkout_cart_api(request):
     Returns cart items in the exact structure expected by checkout.js
     
     Query Parameters:
-    - customer_id (required): The ID of the customer whose cart to retrieve
+    - customer_id (required without a bearer token): The ID of the customer whose cart to retrieve
     
     Returns:
     {
@@ -319,8 +407,21 @@ def checkout_cart_api(request):
     """
     customer_id = request.GET.get('customer_id')
     
+    # Token principal (no query) or legacy customer_id parameter
+    try:
+        customer = get_request_customer(request, customer_id)
+    except Customer.DoesNotExist:
+        return Response({
+            'error': f'Customer with ID {customer_id} not found',
+            'items': [],
+            'total': 0,
+            'count': 0
+        }, status=status.HTTP_404_NOT_FOUND)
+    except ValueError:
+        customer = None
+    
     # Validate customer_id parameter
-    if not customer_id:
+    if customer is None:
         return Response({
             'error': 'Customer ID is required',
             'items': [],
@@ -329,20 +430,9 @@ def checkout_cart_api(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Verify customer exists
-        try:
-            customer = Customer.objects.get(customer_id=customer_id)
-        except Customer.DoesNotExist:
-            return Response({
-                'error': f'Customer with ID {customer_id} not found',
-                'items': [],
-                'total': 0,
-                'count': 0
-            }, status=status.HTTP_404_NOT_FOUND)
-        
         # Fetch cart items with related product and inventory data
         cart_items = Cart.objects.filter(
-            customer_id=customer_id
+            customer_id=customer.customer_id
         ).select_related('product', 'product__inventory')
         
         # Check if cart is empty
@@ -447,6 +537,9 @@ def create_checkout_order(request):
             # order items creation, inventory updates, and cart clearing
             order = serializer.save()
             
+            # Load all lines with their products once for the email and the response
+            prefetch_related_objects([order], 'order_items__product')
+            
             # Send order confirmation email
             try:
                 send_order_confirmation_email(order)
@@ -467,6 +560,14 @@ def create_checkout_order(request):
                 status=status.HTTP_201_CREATED
             )
         
+        except InsufficientStockError as e:
+            # Stock ran out between validation and reservation (e.g. flash sale)
+            return Response({
+                'error': 'Insufficient stock',
+                'detail': str(e),
+                'failed_items': e.failures
+            }, status=status.HTTP_409_CONFLICT)
+        
         except Inventory.DoesNotExist as e:
             # Handle case where product has no inventory record
             return Response({
@@ -546,6 +647,7 @@ def get_order_confirmation(request, order_id):
 
 # ==================== AUTHENTICATION API VIEWS ====================
 
+@rate_limit('login')
 @api_view(['POST'])
 def api_login(request):
     """
@@ -563,7 +665,10 @@ def api_login(request):
         "message": "Login successful",
         "customer_id": 1,
         "name": "John Doe",
-        "email": "user@example.com"
+        "email": "user@example.com",
+        "token": "1:3f9a...",        // send as "Authorization: Bearer <token>"
+        "token_type": "Bearer",
+        "expires_in": 1209600
     }
     
     Returns on failure:
@@ -574,7 +679,7 @@ def api_login(request):
     
     Use Case: Called from modal login form to authenticate user
     """
-    from django.contrib.auth.hashers import check_password
+    from .passwords import check_password, rehash_customer_password
     
     # Extract email and password from request
     email = request.data.get('email', '').strip()
@@ -591,8 +696,9 @@ def api_login(request):
         # Find customer by email
         customer = Customer.objects.get(email__iexact=email)
         
-        # Verify password using Django's check_password
-        if check_password(password, customer.password):
+        # Verify password (runs on the hashing pool); a hash made under an
+        # older algorithm/cost is upgraded before the token is issued
+        if check_password(password, customer.password, setter=rehash_customer_password(customer)):
             # Password is correct - return customer data
             return Response({
                 'success': True,
@@ -600,7 +706,10 @@ def api_login(request):
                 'customer_id': customer.customer_id,
                 'name': customer.name,
                 'email': customer.email,
-                'phone': customer.phone
+                'phone': customer.phone,
+                'token': issue_token(customer),
+                'token_type': TOKEN_KEYWORD,
+                'expires_in': TOKEN_MAX_AGE
             }, status=status.HTTP_200_OK)
         else:
             # Password is incorrect
@@ -625,6 +734,7 @@ def api_login(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@rate_limit('signup')
 @api_view(['POST'])
 def api_signup(request):
     """
@@ -645,7 +755,10 @@ def api_signup(request):
         "message": "Account created successfully",
         "customer_id": 1,
         "name": "John Doe",
-        "email": "user@example.com"
+        "email": "user@example.com",
+        "token": "1:3f9a...",        // same bearer token as api_login
+        "token_type": "Bearer",
+        "expires_in": 1209600
     }
     
     Returns on failure:
@@ -656,7 +769,7 @@ def api_signup(request):
     
     Use Case: Called from modal signup form to register new user
     """
-    from django.contrib.auth.hashers import make_password
+    from .passwords import make_password
     
     # Extract data from request
     name = request.data.get('name', '').strip()
@@ -706,7 +819,7 @@ def api_signup(request):
                 'error': 'Phone number already registered. Please use a different number or login.'
             }, status=status.HTTP_409_CONFLICT)
         
-        # Hash password using Django's make_password
+        # Hash password under the configured policy (see passwords.py)
         hashed_password = make_password(password)
         
         # Create new customer
@@ -731,7 +844,10 @@ def api_signup(request):
             'customer_id': customer.customer_id,
             'name': customer.name,
             'email': customer.email,
-            'phone': customer.phone
+            'phone': customer.phone,
+            'token': issue_token(customer),
+            'token_type': TOKEN_KEYWORD,
+            'expires_in': TOKEN_MAX_AGE
         }, status=status.HTTP_201_CREATED)
     
     except Exception as e:
@@ -743,6 +859,7 @@ def api_signup(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@rate_limit('password_reset')
 @api_view(['POST'])
 def api_request_password_reset(request):
     """
@@ -933,7 +1050,7 @@ def api_reset_password(request):
     
     Use Case: Called from reset password form when user submits new password
     """
-    from django.contrib.auth.hashers import make_password
+    from .passwords import make_password
     
     # Extract data from request
     token = request.data.get('token', '').strip()
@@ -985,8 +1102,9 @@ def api_reset_password(request):
         # Hash new password
         hashed_password = make_password(new_password)
         
-        # Update customer password
+        # Update customer password and revoke tokens issued for the old one
         customer.password = hashed_password
+        revoke_tokens(customer)
         customer.save()
         
         # Mark token as used
@@ -1031,6 +1149,7 @@ def customer_profile_api(request):
         "address": "123 Farm Road",
         "total_spent": 15420.50,
         "total_orders": 12,
+        "cancelled_orders": 1,
         "growth_percentage": 15.5
     }
     
@@ -1046,8 +1165,8 @@ def customer_profile_api(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Get customer with prefetch for optimization
-        customer = Customer.objects.prefetch_related('orders').get(customer_id=customer_id)
+        # Customer, stats rollup and 30-day spending windows in a single query
+        customer = profile_queryset().get(customer_id=customer_id)
         
         # Serialize customer data with statistics
         from .serializers import CustomerProfileSerializer
@@ -1129,12 +1248,11 @@ def customer_orders_summary_api(request):
                 'message': f'Customer with ID {customer_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Get recent orders with prefetch for optimization
+        # Get recent orders; item count and product names are stored on the order,
+        # so only orders placed before the summary columns existed touch OrderItem
         orders = Order.objects.filter(
             customer_id=customer_id
-        ).prefetch_related(
-            'order_items__product'
-        ).order_by('-order_date')[:limit]
+        ).order_by('-order_date', '-order_id')[:limit]
         
         # Serialize orders
         from .serializers import OrderSummarySerializer
@@ -1160,7 +1278,7 @@ def customer_orders_api(request):
     API endpoint to get ALL orders for customer (for Orders page)
     
     Query Parameters:
-    - customer_id (required): The ID of the customer
+    - customer_id (required without a bearer token): The ID of the customer
     
     Returns:
     {
@@ -1196,35 +1314,66 @@ def customer_orders_api(request):
     
     Use Case: Called by orders page to display complete order history with all details
     Difference from orders-summary: Returns ALL orders (not just 3) with complete order_items data
+    
+    Pagination (optional):
+    - limit: Page size (max 100); enables keyset pagination
+    - cursor: `next_cursor` from the previous page
+    Paginated responses add "next_cursor" (null on the last page) and "has_more";
+    "count" is still the customer's total number of orders.
     """
     customer_id = request.GET.get('customer_id')
     
+    # Token principal (no query) or legacy customer_id parameter
+    try:
+        customer = get_request_customer(request, customer_id, Customer.objects.select_related('stats'))
+    except Customer.DoesNotExist:
+        return Response({
+            'status': 'error',
+            'message': f'Customer with ID {customer_id} not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except ValueError:
+        customer = None
+    
     # Validate customer_id parameter
-    if not customer_id:
+    if customer is None:
         return Response({
             'status': 'error',
             'message': 'Customer ID is required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Verify customer exists
-        try:
-            customer = Customer.objects.get(customer_id=customer_id)
-        except Customer.DoesNotExist:
+        from .serializers import OrderDetailSerializer
+        orders = Order.objects.filter(customer_id=customer.customer_id)
+        
+        if 'limit' in request.GET or 'cursor' in request.GET:
+            # Keyset page: WHERE (order_date, order_id) < cursor, no OFFSET scan
+            paginator = OrderCursorPagination()
+            try:
+                page = paginator.paginate_queryset(orders, request)
+            except NotFound:
+                return Response({
+                    'status': 'error',
+                    'message': 'Invalid cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Prefetch items for this page only
+            prefetch_related_objects(page, 'order_items__product')
+            serializer = OrderDetailSerializer(page, many=True)
+            
             return Response({
-                'status': 'error',
-                'message': f'Customer with ID {customer_id} not found'
-            }, status=status.HTTP_404_NOT_FOUND)
+                'status': 'success',
+                'data': serializer.data,
+                'count': get_customer_stats(customer).total_orders,
+                'next_cursor': paginator.get_next_cursor(),
+                'has_more': paginator.has_next
+            }, status=status.HTTP_200_OK)
         
         # Get ALL orders for this customer with prefetch for optimization
-        orders = Order.objects.filter(
-            customer_id=customer_id
-        ).prefetch_related(
+        orders = orders.prefetch_related(
             'order_items__product'
-        ).order_by('-order_date')  # Most recent first
+        ).order_by('-order_date', '-order_id')  # Most recent first
         
         # Serialize orders with complete details
-        from .serializers import OrderDetailSerializer
         serializer = OrderDetailSerializer(orders, many=True)
         
         return Response({
@@ -1374,7 +1523,7 @@ def change_password_api(request):
     
     Use Case: Called from settings page when user changes password
     """
-    from django.contrib.auth.hashers import check_password, make_password
+    from .passwords import check_password, make_password
     
     customer_id = request.data.get('customer_id')
     current_password = request.data.get('current_password', '')
@@ -1411,8 +1560,9 @@ def change_password_api(request):
                 'error': 'Current password is incorrect'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Hash and save new password
+        # Hash and save new password (tokens issued for the old one stop working)
         customer.password = make_password(new_password)
+        revoke_tokens(customer)
         customer.save()
         
         # Return success response
@@ -1543,6 +1693,7 @@ def customer_addresses_api(request):
     """
     Get all addresses for a customer
     GET /api/customer/addresses/?customer_id=1
+    (customer_id is optional with a bearer token)
     
     Returns:
         - 200: Success with addresses list
@@ -1552,15 +1703,15 @@ def customer_addresses_api(request):
     """
     customer_id = request.query_params.get('customer_id')
     
-    if not customer_id:
+    if get_request_customer_id(request, customer_id) is None:
         return Response({
             'status': 'error',
             'message': 'customer_id is required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Verify customer exists
-        customer = Customer.objects.get(customer_id=customer_id)
+        # Token principal (no query) or legacy customer_id parameter
+        customer = get_request_customer(request, customer_id)
         
         # Get all addresses for this customer
         addresses = Address.objects.filter(customer=customer).order_by('-is_default', '-created_at')
@@ -1972,15 +2123,37 @@ def get_customer_addresses_api(request):
 
 
 # ==================== STRIPE PAYMENT APIS ====================
+# Plain Django async views (DRF views are sync): the Stripe calls are awaited
+# over httpx, so under ASGI a slow Stripe response does not hold a worker.
+# See main/payments.py and gunicorn.conf.py.
 
+import orjson
 import stripe
 from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from .payments import configure_stripe
+
+configure_stripe()
+
+
+def _request_data(request):
+    """
+    Body fields of a POST, like DRF's default parsers: JSON, or form-encoded /
+    multipart fields ({} when empty or invalid)
+    """
+    if request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return request.POST.dict()
+    try:
+        data = orjson.loads(request.body or b'{}')
+    except orjson.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
-@api_view(['POST'])
 @csrf_exempt
-def create_payment_intent(request):
+@require_POST
+async def create_payment_intent(request):
     """
     Create a Stripe Payment Intent for processing card payments
     POST /api/stripe/create-payment-intent/
@@ -1997,13 +2170,14 @@ def create_payment_intent(request):
         - 500: Server error
     """
     try:
-        amount = request.data.get('amount')
-        currency = request.data.get('currency', 'usd')
-        customer_id = request.data.get('customer_id')
-        description = request.data.get('description', 'Farm2Home Order')
+        data = _request_data(request)
+        amount = data.get('amount')
+        currency = data.get('currency', 'usd')
+        customer_id = data.get('customer_id')
+        description = data.get('description', 'Farm2Home Order')
         
         if not amount or not customer_id:
-            return Response({
+            return JsonResponse({
                 'status': 'error',
                 'message': 'amount and customer_id are required'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -2012,7 +2186,7 @@ def create_payment_intent(request):
         amount_cents = int(float(amount) * 100)
         
         # Create Payment Intent
-        payment_intent = stripe.PaymentIntent.create(
+        payment_intent = await stripe.PaymentIntent.create_async(
             amount=amount_cents,
             currency=currency,
             description=description,
@@ -2025,27 +2199,27 @@ def create_payment_intent(request):
             },
         )
         
-        return Response({
+        return JsonResponse({
             'status': 'success',
             'clientSecret': payment_intent.client_secret,
             'paymentIntentId': payment_intent.id
         }, status=status.HTTP_200_OK)
         
-    except stripe.error.StripeError as e:
-        return Response({
+    except stripe.StripeError as e:
+        return JsonResponse({
             'status': 'error',
             'message': f'Stripe error: {str(e)}'
         }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'status': 'error',
             'message': f'Failed to create payment intent: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
 @csrf_exempt
-def confirm_stripe_payment(request):
+@require_POST
+async def confirm_stripe_payment(request):
     """
     Confirm that a Stripe payment was successful
     POST /api/stripe/confirm-payment/
@@ -2059,19 +2233,19 @@ def confirm_stripe_payment(request):
         - 500: Server error
     """
     try:
-        payment_intent_id = request.data.get('payment_intent_id')
+        payment_intent_id = _request_data(request).get('payment_intent_id')
         
         if not payment_intent_id:
-            return Response({
+            return JsonResponse({
                 'status': 'error',
                 'message': 'payment_intent_id is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Retrieve payment intent from Stripe
-        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        payment_intent = await stripe.PaymentIntent.retrieve_async(payment_intent_id)
         
         if payment_intent.status == 'succeeded':
-            return Response({
+            return JsonResponse({
                 'status': 'success',
                 'message': 'Payment confirmed successfully',
                 'payment_status': payment_intent.status,
@@ -2079,26 +2253,26 @@ def confirm_stripe_payment(request):
                 'currency': payment_intent.currency
             }, status=status.HTTP_200_OK)
         else:
-            return Response({
+            return JsonResponse({
                 'status': 'error',
                 'message': f'Payment status: {payment_intent.status}',
                 'payment_status': payment_intent.status
             }, status=status.HTTP_400_BAD_REQUEST)
         
-    except stripe.error.StripeError as e:
-        return Response({
+    except stripe.StripeError as e:
+        return JsonResponse({
             'status': 'error',
             'message': f'Stripe error: {str(e)}'
         }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'status': 'error',
             'message': f'Failed to confirm payment: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def get_stripe_payment_method(request, payment_method_id):
+@require_GET
+async def get_stripe_payment_method(request, payment_method_id):
     """
     Retrieve payment method details from Stripe
     GET /api/stripe/payment-method/<payment_method_id>/
@@ -2110,9 +2284,9 @@ def get_stripe_payment_method(request, payment_method_id):
     """
     try:
         # Retrieve payment method from Stripe
-        payment_method = stripe.PaymentMethod.retrieve(payment_method_id)
+        payment_method = await stripe.PaymentMethod.retrieve_async(payment_method_id)
         
-        return Response({
+        return JsonResponse({
             'status': 'success',
             'card': {
                 'last4': payment_method.card.last4,
@@ -2122,13 +2296,13 @@ def get_stripe_payment_method(request, payment_method_id):
             }
         }, status=status.HTTP_200_OK)
         
-    except stripe.error.StripeError as e:
-        return Response({
+    except stripe.StripeError as e:
+        return JsonResponse({
             'status': 'error',
             'message': f'Stripe error: {str(e)}'
         }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'status': 'error',
             'message': f'Failed to retrieve payment method: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2137,6 +2311,7 @@ def get_stripe_payment_method(request, payment_method_id):
 # ==================== CONTACT & CALLBACK API ENDPOINTS ====================
 
 @csrf_exempt
+@rate_limit('contact')
 @api_view(['POST'])
 def api_contact_form(request):
     """
@@ -2178,12 +2353,11 @@ def api_contact_form(request):
         # Log the contact request
         print(f"📧 Contact form: {sender_name} ({sender_email}): {message}")
         
-        # Email sending disabled due to timeout issues
-        # TODO: Configure proper SMTP or use background tasks
-        # try:
-        #     send_contact_form_email(sender_name, sender_email, message)
-        # except Exception as email_error:
-        #     print(f"⚠️ Email failed but form logged: {str(email_error)}")
+        # Queue notification email for the admin (sent by run_email_worker)
+        try:
+            send_contact_form_email(sender_name, sender_email, message)
+        except Exception as email_error:
+            print(f"⚠️ Email failed but form logged: {str(email_error)}")
         
         # Always return success
         return Response({
@@ -2201,6 +2375,7 @@ def api_contact_form(request):
 
 
 @csrf_exempt
+@rate_limit('callback')
 @api_view(['POST'])
 def api_callback_request(request):
     """
@@ -2237,17 +2412,16 @@ def api_callback_request(request):
         # Log the callback request
         print(f"📞 Callback: {client_name} ({phone_number}) at {preferred_time}")
         
-        # Email sending disabled due to timeout issues
-        # TODO: Configure proper SMTP or use background tasks
-        # try:
-        #     send_callback_request_email(
-        #         client_name, 
-        #         phone_number, 
-        #         preferred_time, 
-        #         message if message else None
-        #     )
-        # except Exception as email_error:
-        #     print(f"⚠️ Email failed but request logged: {str(email_error)}")
+        # Queue notification email for the admin (sent by run_email_worker)
+        try:
+            send_callback_request_email(
+                client_name, 
+                phone_number, 
+                preferred_time, 
+                message if message else None
+            )
+        except Exception as email_error:
+            print(f"⚠️ Email failed but request logged: {str(email_error)}")
         
         # Always return success
         return Response({
@@ -2264,4 +2438,24 @@ def api_callback_request(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# ==================== OPERATIONS ====================
 
+@api_view(['GET'])
+def rate_limit_stats_api(request):
+    """
+    Rejected request counters of the rate limiter (staff only)
+    GET /api/admin/rate-limits/
+    
+    Response:
+    {
+        "process": {"login:email": 12, ...},   // this worker since it started
+        "shared": {"login:email": 40, ...}     // all workers (null without RATE_LIMIT_SHARED)
+    }
+    """
+    if not getattr(request.user, 'is_staff', False):
+        return Response({
+            'success': False,
+            'error': 'Staff access required'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(rate_limit_stats(), status=status.HTTP_200_OK)
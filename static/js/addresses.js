@@ -246,11 +246,12 @@ function updateOrdersCount() {
     const customerId = localStorage.getItem('customer_id');
     if (!el || !customerId) return;
     
-    fetch(`/api/customer/orders/?customer_id=${customerId}`)
+    // One-row page: the response still carries the total order count
+    fetch(`/api/customer/orders/?customer_id=${customerId}&limit=1`)
         .then(r => r.json())
         .then(data => {
             if (data.status === 'success' && data.data) {
-                const count = data.data.length;
+                const count = data.count;
                 el.textContent = `${count} ${count === 1 ? 'Order' : 'Orders'}`;
             }
         })
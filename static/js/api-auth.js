@@ -0,0 +1,66 @@
+/**
+ * Bearer token for API requests
+ *
+ * api_login / api_signup return a signed token (see main/authentication.py).
+ * This script wraps fetch() so that:
+ * - the token from a login/signup response is stored in localStorage
+ * - every same-origin /api/ request carries "Authorization: Bearer <token>"
+ * - the token is dropped on logout (customer_id removed) or when the server
+ *   rejects it, so the request falls back to the customer_id parameter
+ *
+ * Load it before any script that calls the API.
+ */
+(function () {
+    const TOKEN_KEY = 'auth_token';
+    const AUTH_ENDPOINTS = ['/api/auth/login/', '/api/auth/signup/'];
+    const originalFetch = window.fetch.bind(window);
+
+    function requestPath(input) {
+        try {
+            const url = new URL(typeof input === 'string' ? input : input.url, window.location.href);
+            return url.origin === window.location.origin ? url.pathname : null;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function currentToken() {
+        // Logging out removes customer_id; the token goes with it
+        if (!localStorage.getItem('customer_id')) {
+            localStorage.removeItem(TOKEN_KEY);
+            return null;
+        }
+        return localStorage.getItem(TOKEN_KEY);
+    }
+
+    window.fetch = async function (input, init = {}) {
+        const path = requestPath(input);
+        const isApi = path !== null && path.startsWith('/api/');
+        const isAuthEndpoint = AUTH_ENDPOINTS.includes(path);
+        const token = isApi && !isAuthEndpoint ? currentToken() : null;
+
+        if (token) {
+            const headers = new Headers(init.headers || (input instanceof Request ? input.headers : undefined));
+            if (!headers.has('Authorization')) {
+                headers.set('Authorization', `Bearer ${token}`);
+            }
+            init = { ...init, headers };
+        }
+
+        const response = await originalFetch(input, init);
+
+        if (isAuthEndpoint && response.ok) {
+            // Store the token of a successful login/signup
+            response.clone().json().then(data => {
+                if (data && data.token) {
+                    localStorage.setItem(TOKEN_KEY, data.token);
+                }
+            }).catch(() => {});
+        } else if (token && response.status === 401) {
+            // Expired or revoked: forget it; later requests use customer_id
+            localStorage.removeItem(TOKEN_KEY);
+        }
+
+        return response;
+    };
+})();
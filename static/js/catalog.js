@@ -514,7 +514,7 @@ function createProductCard(product) {
                 ${stockBadge}
                 ${seasonBadge}
             </div>
-            <img src="/static/${product.image}" alt="${product.name}" class="product-image" onerror="this.src='https://via.placeholder.com/200/6b8e23/ffffff?text=${product.name}'">
+            ${productPicture(product, 'product-image', 120)}
         </div>
         <div class="product-price">Rs. ${Math.round(product.price)}/kg</div>
         <div class="quantity-selector">
@@ -553,6 +553,26 @@ function createProductCard(product) {
     return card;
 }
 
+/**
+ * Product image as <picture> with AVIF/WebP width variants
+ * product.image is {src, width, height, sizes, sources: [{type, srcset}]}
+ * (sources is empty until `python manage.py optimize_images` has run)
+ * displayWidth is the rendered CSS width, so the browser picks the right variant
+ */
+function productPicture(product, className, displayWidth) {
+    const image = product.image || {};
+    const src = image.src && image.src.startsWith('/') ? image.src : `/static/${image.src}`;
+    const sources = (image.sources || []).map(source =>
+        `<source type="${source.type}" srcset="${source.srcset}" sizes="${displayWidth}px">`
+    ).join('');
+    const dimensions = image.width ? `width="${image.width}" height="${image.height}"` : '';
+    
+    return `<picture>
+        ${sources}
+        <img src="${src}" alt="${product.name}" class="${className}" ${dimensions} loading="lazy" decoding="async" onerror="this.onerror=null; this.parentElement.querySelectorAll('source').forEach(s => s.remove()); this.src='https://via.placeholder.com/${displayWidth}/6b8e23/ffffff?text=${product.name}'">
+    </picture>`;
+}
+
 function getSeasonBadge(season) {
     const badges = {
         'summer': '<span class="badge season">☀️ Summer</span>',
@@ -1281,7 +1301,7 @@ function createProductListItem(product) {
     const stockBadge = product.inStock ? '<span class="badge stock">In Stock</span>' : '';
     
     item.innerHTML = `
-        <img src="/static/${product.image}" alt="${product.name}" class="product-list-image" onerror="this.src='https://via.placeholder.com/150/6b8e23/ffffff?text=${product.name}'">
+        ${productPicture(product, 'product-list-image', 150)}
         
         <div class="product-list-middle">
             <div class="product-list-name">${product.name}</div>
@@ -44,14 +44,34 @@ document.addEventListener('DOMContentLoaded', function() {
         initializeFilterTabs();
         initializeSearchFunctionality();
         initializeOrderActions();
+        
+        const loadMoreBtn = document.getElementById('loadMoreOrdersBtn');
+        if (loadMoreBtn) {
+            loadMoreBtn.addEventListener('click', loadMoreOrders);
+        }
     }).catch(() => {
         hideLoadingState();
     });
 });
 
 /**
- * Step 7: Fetch all customer orders from API
+ * Step 7: Fetch customer orders from API
+ * Orders come in pages (keyset pagination, newest first): the first page is
+ * rendered right away and older pages are fetched when "Load more" is clicked
  */
+const ORDERS_PAGE_SIZE = 20;
+let totalOrdersCount = 0;
+let nextOrdersCursor = null;
+let loadingMoreOrders = false;
+
+function ordersPageUrl(customerId, cursor) {
+    let url = `/api/customer/orders/?customer_id=${customerId}&limit=${ORDERS_PAGE_SIZE}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    return url;
+}
+
 async function fetchCustomerOrders() {
     const customerId = localStorage.getItem('customer_id');
     
@@ -61,7 +81,7 @@ async function fetchCustomerOrders() {
     }
     
     try {
-        const response = await fetch(`/api/customer/orders/?customer_id=${customerId}`);
+        const response = await fetch(ordersPageUrl(customerId));
         
         if (response.status === 404) {
             handleAuthError('Customer not found');
@@ -77,12 +97,16 @@ async function fetchCustomerOrders() {
         if (data.status === 'success') {
             // Store orders data globally
             allOrdersData = data.data || [];
+            totalOrdersCount = data.count || allOrdersData.length;
             
             // Render orders UI
             renderOrdersUI(allOrdersData);
             
             // Update orders count in sidebar
             updateOrdersCount();
+            
+            // Older orders are fetched one page at a time on request
+            setNextOrdersCursor(data.next_cursor);
         } else {
             throw new Error(data.message || 'Failed to fetch orders');
         }
@@ -102,6 +126,68 @@ async function fetchCustomerOrders() {
     }
 }
 
+/**
+ * Remember where the next page starts and show "Load more" only while one exists
+ */
+function setNextOrdersCursor(cursor) {
+    nextOrdersCursor = cursor || null;
+    const loadMore = document.getElementById('loadMoreOrders');
+    if (loadMore) {
+        loadMore.style.display = nextOrdersCursor ? 'block' : 'none';
+    }
+}
+
+/**
+ * Fetch the next (older) page of orders and add it to the list
+ */
+async function loadMoreOrders() {
+    const customerId = localStorage.getItem('customer_id');
+    const button = document.getElementById('loadMoreOrdersBtn');
+    if (!customerId || !nextOrdersCursor || loadingMoreOrders) return;
+    
+    loadingMoreOrders = true;
+    if (button) button.disabled = true;
+    
+    try {
+        const response = await fetch(ordersPageUrl(customerId, nextOrdersCursor));
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        if (data.status !== 'success') {
+            throw new Error(data.message || 'Failed to fetch orders');
+        }
+        
+        allOrdersData = allOrdersData.concat(data.data || []);
+        setNextOrdersCursor(data.next_cursor);
+        refreshOrdersView();
+    } catch (error) {
+        console.error('Error loading more orders:', error);
+        if (typeof notifications !== 'undefined') {
+            notifications.error('Failed to load more orders. Please try again.');
+        }
+    } finally {
+        loadingMoreOrders = false;
+        if (button) button.disabled = false;
+    }
+}
+
+/**
+ * Re-apply the active tab and search after a page of older orders was loaded
+ */
+function refreshOrdersView() {
+    const searchInput = document.querySelector('.search-input');
+    if (searchInput && searchInput.value.trim() !== '') {
+        searchInput.dispatchEvent(new Event('input'));
+        updateFilterTabCounts();
+        return;
+    }
+    
+    const activeTab = document.querySelector('.tab-btn.active');
+    filterOrders(activeTab ? activeTab.getAttribute('data-filter') : 'all');
+}
+
 /**
  * Step 8: Render orders UI
  */
@@ -255,7 +341,7 @@ function updateSidebarProfile() {
 function updateOrdersCount() {
     const sidebarTotalOrdersElement = document.getElementById('sidebarTotalOrders');
     if (sidebarTotalOrdersElement) {
-        const count = allOrdersData.length;
+        const count = totalOrdersCount || allOrdersData.length;
         sidebarTotalOrdersElement.textContent = `${count} ${count === 1 ? 'Order' : 'Orders'}`;
     }
 }